@@ -4,8 +4,9 @@ package.name = cwlrechner
 package.domain = org.clan.cwlrechner
 source.dir = .
 source.include_exts = py,png,jpg,kv,atlas,json
+source.exclude_patterns = cwl_api.py,cwl_archive.py,cwl_batch.py,cwl_bench.py,cwl_bench_golden.json,bench_results.json,cwl_explorer.py,cwl_live.py,cwl_rechner.py,cwl_store.py
 version = 1.0
-requirements = python3,kivy,pandas,plyer,xlsxwriter,openpyxl
+requirements = python3,kivy,numpy,plyer,xlsxwriter,sqlite3
 orientation = portrait
 permissions = WRITE_EXTERNAL_STORAGE, READ_EXTERNAL_STORAGE
 fullscreen = 0
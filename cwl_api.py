@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from cwl_engine import DAYS, DEFAULT_POINTS, WarData, WarScore, add_scoring_arguments, goliath_result, load_scoring, rule_hits
+
+# ----------------------------
+# Lokale Wertungs-API: HTTP/JSON über asyncio, gleichzeitige Anfragen werden zu Batches zusammengefasst
+# ----------------------------
+# POST /score    {"war": {"names": [...], "columns": {...}}} oder {"rows": [{"Name": ..., "Tag1_Sterne": ...}, ...]}
+#                optional "point_system" (Abweichungen vom Server-Punktesystem); {"wars": [...]} wertet mehrere Kriege auf einmal
+#                -> {"ranking": [{"name", "points", "attacks"}], "awards": {"mvp": ..., "goliath": ...}}
+# GET  /metrics  Latenzen, Durchsatz, Batchgrößen, Warteschlange;  GET /health
+# Beispiel:
+#   python cwl_api.py serve --port 8080 --workers 4
+#   python cwl_api.py load --port 8080 --requests 5000 --concurrency 64 --players 30
+MAX_BODY = 8 << 20
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+WORKER = None  # (Punktesystem, Regeltabelle) im Worker-Prozess
+
+def init_worker(point_system, rules):
+    global WORKER
+    WORKER = (point_system, rules)
+
+CELL_LIMIT = 1 << 15  # größer passt in keine WarData-Spalte und ist sicher ein Tippfehler
+
+def parse_war(payload):
+    if "war" in payload: war = payload["war"]
+    elif "rows" in payload:
+        rows = payload["rows"]
+        war = {"names": [str(row.get("Name", "")) for row in rows], "columns": {column: [row.get(column) for row in rows] for column in WarData.COLUMNS}}
+    else: raise ValueError("'war' oder 'rows' fehlt")
+    # Vor WarData.from_dict prüfen: falsche Spaltenlängen würden sonst still verteilt, riesige Zahlen liefen über
+    names, columns = war.get("names"), war.get("columns", {})
+    if not isinstance(names, list) or not isinstance(columns, dict): raise ValueError("'names' muss eine Liste und 'columns' ein Objekt sein")
+    for column, values in columns.items():
+        if column not in WarData.COLUMNS: continue
+        if not isinstance(values, list) or len(values) != len(names): raise ValueError(f"Spalte {column}: {len(names)} Werte erwartet")
+        for value in values:
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or not -CELL_LIMIT < value < CELL_LIMIT):
+                raise ValueError(f"Spalte {column}: ungültiger Wert {value!r}")
+    return WarData.from_dict(war)
+
+def parse_points(base_points, overrides):
+    # Abweichende Punkte als ganze Zahlen; sonst schlüge erst die Wertung im Batch fehl und träfe alle Anfragen darin
+    if not isinstance(overrides, dict): raise ValueError("'point_system' muss ein Objekt sein")
+    unknown = sorted(set(overrides) - set(DEFAULT_POINTS))
+    if unknown: raise ValueError(f"Unbekannte Punkte: {', '.join(unknown)}")
+    return {**base_points, **{key: int(value) for key, value in overrides.items()}}
+
+def war_result(score, goliath_points, names, lo, hi):
+    # Ergebnis eines Kriegs aus seinem Zeilenbereich im Batch; gleiche Reihenfolge und Award-Regeln wie WarScore.ranking()/awards()
+    totals, attacks, goliath = score.totals[lo:hi].tolist(), score.attacks[lo:hi].tolist(), goliath_points[lo:hi]
+    order = sorted(range(hi - lo), key=lambda i: (-totals[i], names[i]))
+    ranking = [{"name": names[i], "points": totals[i], "attacks": attacks[i]} for i in order]
+    if not ranking: return {"ranking": [], "awards": {"mvp": {"name": "N/A", "score": ""}, "goliath": {"name": "N/A", "score": ""}}}
+    awards = {"mvp": {"name": ranking[0]["name"], "score": f'{ranking[0]["points"]} Punkte'}}
+    winner = int(goliath.argmax()); awards["goliath"] = goliath_result(names[winner], int(goliath[winner]), goliath.sum())
+    return {"ranking": ranking, "awards": awards}
+
+def score_batch(bodies):
+    # Im Worker: alle Kriege aller Anfragen in einem Tensor werten (eine Treffermatrix), dann eine Matrixmultiplikation je Punktesystem
+    # -> ([(status, json-bytes)], Anzahl Kriege, Anzahl Spielerzeilen)
+    base_points, rules = WORKER
+    replies, multi, wars = [None] * len(bodies), [False] * len(bodies), []  # wars: (anfrage, position, WarData, punktesystem)
+    for i, body in enumerate(bodies):
+        try:
+            payload = json.loads(body); multi[i] = isinstance(payload, dict) and "wars" in payload
+            parsed = [(parse_war(item), parse_points(base_points, item.get("point_system", {}))) for item in (payload["wars"] if multi[i] else [payload])]
+        except (ValueError, KeyError, TypeError, AttributeError, OverflowError) as e: replies[i] = (400, {"error": f"Ungültige Anfrage: {e}"}); continue
+        replies[i] = [None] * len(parsed); wars += [(i, n, data, point_system) for n, (data, point_system) in enumerate(parsed)]
+    bounds = np.cumsum([0] + [len(data) for _, _, data, _ in wars])
+    if wars:
+        tensors = [data.tensor() for _, _, data, _ in wars]
+        made, diff, hits = rule_hits(np.concatenate([own for own, _ in tensors]), np.concatenate([war for _, war in tensors]), rules)
+        groups = {}
+        for w, (_, _, _, point_system) in enumerate(wars): groups.setdefault(json.dumps(point_system, sort_keys=True), []).append(w)
+        for members in groups.values():
+            # Jede Punktesystem-Gruppe für sich: ein Fehler hier trifft nur deren Anfragen, nicht den ganzen Batch
+            try:
+                rows = np.concatenate([np.arange(bounds[w], bounds[w + 1], dtype=np.intp) for w in members])
+                names = [str(name) for w in members for name in wars[w][2].names]
+                score = WarScore(names, made[rows], made[rows] & (diff[rows] >= 2), hits[rows], wars[members[0]][3], rules); goliath_points = score.goliath_points(); lo = 0
+                for w in members:
+                    hi = lo + len(wars[w][2]); i, n = wars[w][:2]
+                    if isinstance(replies[i], list): replies[i][n] = war_result(score, goliath_points, names[lo:hi], lo, hi)
+                    lo = hi
+            except Exception as e:
+                for w in members: replies[wars[w][0]] = (500, {"error": f"Interner Fehler: {e}"})
+    encoded = []
+    for i, reply in enumerate(replies):
+        status, payload = reply if isinstance(reply, tuple) else (200, {"wars": reply} if multi[i] else reply[0])
+        encoded.append((status, json.dumps(payload, ensure_ascii=False).encode()))
+    return encoded, len(wars), int(bounds[-1])
+
+class Metrics:
+    # Zähler, Latenzen der letzten 10000 Anfragen, Durchsatz über die letzte Minute und Histogramm der Batchgrößen
+    def __init__(self, window=60):
+        self.started = time.monotonic(); self.window = window
+        self.requests = self.errors = self.batches = self.wars = self.players = 0; self.worker_seconds = 0.0
+        self.latencies = deque(maxlen=10000); self.finished = deque(); self.batch_sizes = {}
+
+    def request(self, latency, ok):
+        now = time.monotonic(); self.requests += 1; self.errors += not ok; self.latencies.append(latency); self.finished.append(now)
+        while self.finished and self.finished[0] < now - self.window: self.finished.popleft()
+
+    def batch(self, size, wars, players, seconds):
+        bucket = 1 << (size - 1).bit_length()  # 1, 2, 4, 8, ...
+        self.batches += 1; self.wars += wars; self.players += players; self.worker_seconds += seconds; self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
+
+    def snapshot(self, queued, in_flight):
+        uptime = time.monotonic() - self.started; latencies = np.array(self.latencies) * 1000
+        percentiles = dict(zip(("p50", "p90", "p99", "max"), np.percentile(latencies, [50, 90, 99, 100]).round(3).tolist())) if len(latencies) else {}
+        return {"uptime_s": round(uptime, 1), "requests": self.requests, "errors": self.errors, "wars": self.wars, "players": self.players,
+                "throughput_rps": round(len(self.finished) / min(self.window, max(uptime, 1e-9)), 1), "latency_ms": percentiles,
+                "batches": self.batches, "avg_batch": round(self.requests / self.batches, 2) if self.batches else 0,
+                "batch_sizes": {f"<={size}": count for size, count in sorted(self.batch_sizes.items())},
+                "worker_seconds": round(self.worker_seconds, 3), "queued": queued, "in_flight_batches": in_flight}
+
+class ScoringService:
+    # Sammelt Anfragen in einer Warteschlange; ein Batch startet, sobald ein Worker frei ist -> unter Last wachsen die Batches von selbst
+    def __init__(self, pool, workers, max_batch=256, max_wait=0.002):
+        self.pool, self.max_batch, self.max_wait = pool, max_batch, max_wait
+        self.queue = asyncio.Queue(); self.slots = asyncio.Semaphore(workers); self.metrics = Metrics(); self.in_flight = 0
+
+    async def score(self, body):
+        future = asyncio.get_running_loop().create_future(); await self.queue.put((body, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            await self.slots.acquire()
+            # Kurz auf Nachzügler warten, dann alles Wartende mitnehmen
+            if self.queue.empty() and self.max_wait: await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch and not self.queue.empty(): batch.append(self.queue.get_nowait())
+            loop.create_task(self.dispatch(batch))
+
+    async def dispatch(self, batch):
+        started = time.perf_counter(); self.in_flight += 1
+        try:
+            results, wars, players = await asyncio.get_running_loop().run_in_executor(self.pool, score_batch, [body for body, _ in batch])
+            self.metrics.batch(len(batch), wars, players, time.perf_counter() - started)
+            for (_, future), result in zip(batch, results):
+                if not future.done(): future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done(): future.set_result((500, json.dumps({"error": f"Interner Fehler: {e}"}).encode()))
+        finally: self.in_flight -= 1; self.slots.release()
+
+    async def route(self, method, path, body):
+        path = path.split("?", 1)[0]
+        if path == "/score":
+            if method != "POST": return 405, b'{"error": "POST erwartet"}'
+            started = time.perf_counter(); status, payload = await self.score(body)
+            self.metrics.request(time.perf_counter() - started, status == 200)
+            return status, payload
+        if path == "/metrics": return 200, json.dumps(self.metrics.snapshot(self.queue.qsize(), self.in_flight)).encode()
+        if path == "/health": return 200, b'{"status": "ok"}'
+        return 404, b'{"error": "Unbekannter Pfad"}'
+
+    async def handle(self, reader, writer):
+        # Minimales HTTP/1.1 mit Keep-Alive: Anfragezeile, Header, Body nach Content-Length
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                try: method, path, version = line.decode('latin-1').split()
+                except ValueError: await self.respond(writer, 400, b'{"error": "Ungueltige Anfragezeile"}', False); break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""): break
+                    key, _, value = header.decode('latin-1').partition(":"); headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY: await self.respond(writer, 413, b'{"error": "Anfrage zu gross"}', False); break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                status, payload = await self.route(method, path, body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive: break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError): pass
+        finally: writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: {len(payload)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+        await writer.drain()
+
+async def serve(host, port, workers, point_system, rules, max_batch, max_wait):
+    # workers=0: Wertung in einem Thread dieses Prozesses (z.B. zum Debuggen), sonst ein Pool aus Prozessen
+    executor = ThreadPoolExecutor if workers == 0 else ProcessPoolExecutor
+    with executor(max(workers, 1), initializer=init_worker, initargs=(point_system, rules)) as pool:
+        service = ScoringService(pool, max(workers, 1), max_batch, max_wait)
+        server = await asyncio.start_server(service.handle, host, port, backlog=1024)
+        print(f"Wertungs-API auf http://{host}:{port} ({workers or 'ein Thread'} Worker, Batch bis {max_batch})")
+        batcher = asyncio.ensure_future(service.run())
+        try:
+            async with server: await server.serve_forever()
+        finally: batcher.cancel()
+
+# ----------------------------
+# Lasttest: synthetische Kriege, viele parallele Keep-Alive-Verbindungen
+# ----------------------------
+def synthetic_war(players, rng):
+    # Zufälliger, plausibler Krieg in der WarData.to_dict()-Form
+    own = [rng.randint(10, 17) for _ in range(players)]; columns = {"Eigenes_Rathaus": own}
+    for day in range(1, DAYS + 1):
+        attacked = [rng.random() < 0.9 for _ in range(players)]; stars = [rng.choice((0, 1, 2, 2, 3, 3)) for _ in range(players)]
+        columns[f"Tag{day}_Rathaus_Gegner"] = [max(1, min(17, th + rng.randint(-3, 3))) for th in own]
+        columns[f"Tag{day}_Sterne"] = [s if a else None for s, a in zip(stars, attacked)]
+        columns[f"Tag{day}_Prozent"] = [(100 if s == 3 else rng.randint(0, 99)) if a else None for s, a in zip(stars, attacked)]
+    return {"names": [f"Spieler {i}" for i in range(1, players + 1)], "columns": columns}
+
+async def request(reader, writer, host, method, path, body=b""):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1]); length = 0
+    while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b""): break
+        if header.lower().startswith(b"content-length:"): length = int(header.split(b":")[1])
+    return status, await reader.readexactly(length)
+
+async def load_test(host, port, total, concurrency, players, seed, check):
+    rng = random.Random(seed); bodies = [json.dumps({"war": synthetic_war(players, rng)}).encode() for _ in range(min(total, 200))]
+    latencies, failures, counter = [], 0, iter(range(total))
+    async def client():
+        nonlocal failures
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for n in counter:
+                started = time.perf_counter(); status, payload = await request(reader, writer, host, "POST", "/score", bodies[n % len(bodies)])
+                latencies.append(time.perf_counter() - started); failures += status != 200
+                if check and n < len(bodies): verify(bodies[n], payload)
+        finally: writer.close()
+    started = time.perf_counter(); await asyncio.gather(*(client() for _ in range(concurrency))); elapsed = time.perf_counter() - started
+    reader, writer = await asyncio.open_connection(host, port); _, metrics = await request(reader, writer, host, "GET", "/metrics"); writer.close()
+    ms = np.array(latencies) * 1000
+    print(f"{total} Anfragen ({players} Spieler) in {elapsed:.2f}s: {total / elapsed:.0f} Anfragen/s, {failures} Fehler")
+    print("Latenz ms: p50 {:.2f}  p90 {:.2f}  p99 {:.2f}  max {:.2f}".format(*np.percentile(ms, [50, 90, 99, 100])))
+    print(f"Server: {metrics.decode()}")
+    return failures
+
+def verify(body, payload):
+    # Stichprobe gegen die direkte Wertung (score_war) mit dem Standard-Punktesystem
+    from cwl_engine import score_war
+    score = score_war(WarData.from_dict(json.loads(body)["war"]), DEFAULT_POINTS); result = json.loads(payload)
+    if [(row["name"], row["points"]) for row in result["ranking"]] != score.ranking() or result["awards"] != score.awards():
+        raise AssertionError("API-Ergebnis weicht von score_war ab")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokale HTTP/JSON-Wertungs-API mit Batching und Lasttest.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    server = commands.add_parser("serve", help="API starten")
+    server.add_argument("--host", default="127.0.0.1"); server.add_argument("--port", type=int, default=8080)
+    server.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker-Prozesse (0 = ein Thread im Server-Prozess)")
+    add_scoring_arguments(server)
+    server.add_argument("--max-batch", type=int, default=256); server.add_argument("--max-wait-ms", type=float, default=2.0)
+    load = commands.add_parser("load", help="Lasttest gegen eine laufende API")
+    load.add_argument("--host", default="127.0.0.1"); load.add_argument("--port", type=int, default=8080)
+    load.add_argument("--requests", type=int, default=2000); load.add_argument("--concurrency", type=int, default=32)
+    load.add_argument("--players", type=int, default=30); load.add_argument("--seed", type=int, default=1)
+    load.add_argument("--check", action="store_true", help="Antworten stichprobenartig gegen score_war prüfen (nur Standard-Punktesystem)")
+    args = parser.parse_args(argv)
+
+    if args.command == "load":
+        return 1 if asyncio.run(load_test(args.host, args.port, args.requests, args.concurrency, args.players, args.seed, args.check)) else 0
+    point_system, rules = load_scoring(args.points, args.rules)
+    try: asyncio.run(serve(args.host, args.port, args.workers, point_system, rules, args.max_batch, args.max_wait_ms / 1000))
+    except KeyboardInterrupt: pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
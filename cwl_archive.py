@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from cwl_engine import DAYS, DEFAULT_RULE_TABLE, OPP, PCT, STARS, WarData, add_scoring_arguments, iter_war_files, load_scoring, read_war_file, row_totals, war_tensor
+
+# ----------------------------
+# Saison-Archiv: spaltenweise Arrays in einer Datei, direkt per Memory-Map gewertet
+# ----------------------------
+# Aufbau: MAGIC | uint32 Headerlänge | JSON-Header (Spieler, Kriege, Spalten mit dtype/shape/offset) | 64-Byte-ausgerichtete Arrays.
+# Jede Zeile ist ein Spieler in einem Krieg; die Zeilen eines Kriegs liegen zusammenhängend.
+# Beispiel:
+#   python cwl_archive.py pack saison_2026.cwls "archiv/2026-*/*.csv"
+#   python cwl_archive.py score clans/*.cwls --points point_system.json --top 20
+
+MAGIC = b"CWLSEAS1"
+ALIGN = 64
+COLUMNS = {"war_id": np.int32, "player_id": np.int32, "own_th": np.int16, "opp_th": np.int16, "stars": np.int16, "pct": np.int16}
+
+def write_season(path, wars):
+    # wars: Iterable aus (label, WarData oder DataFrame); schreibt atomar über eine temporäre Datei
+    players, labels, blocks = {}, [], []
+    for label, data in wars:
+        own, war = war_tensor(data)
+        names = data.names if isinstance(data, WarData) else data["Name"].astype(str).tolist()
+        ids = np.array([players.setdefault(str(name), len(players)) for name in names], dtype=np.int32)
+        blocks.append((np.full(len(ids), len(labels), np.int32), ids, own, war[..., OPP], war[..., STARS], war[..., PCT])); labels.append(label)
+    parts = list(zip(*blocks)); arrays = []
+    for n, (name, dtype) in enumerate(COLUMNS.items()):
+        if parts: arrays.append(np.ascontiguousarray(np.concatenate(parts[n]), dtype=dtype))
+        else: arrays.append(np.zeros((0, DAYS) if name in ("opp_th", "stars", "pct") else (0,), dtype))
+    columns, offset = {}, 0
+    for name, array in zip(COLUMNS, arrays):
+        columns[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}; offset += -(-array.nbytes // ALIGN) * ALIGN
+    header = json.dumps({"version": 1, "rows": len(arrays[0]), "days": DAYS, "players": list(players), "wars": labels, "columns": columns}).encode()
+    start = -(-(len(MAGIC) + 4 + len(header)) // ALIGN) * ALIGN
+    directory = os.path.dirname(path) or "."; fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header); f.write(b"\0" * (start - f.tell()))
+            for name, array in zip(COLUMNS, arrays):
+                f.seek(start + columns[name]["offset"]); f.write(array.tobytes())
+            f.truncate(start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.unlink(tmp_path)
+        raise
+    return len(arrays[0])
+
+class SeasonArchive:
+    # Nur-Lese-Sicht auf eine .cwls-Datei; alle Spalten sind Views auf dieselbe Memory-Map (kein Parsen, keine Kopien)
+    def __init__(self, path):
+        self.path = path; self.buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self.buffer[:len(MAGIC)]) != MAGIC: raise ValueError(f"{path}: kein CWL-Saison-Archiv")
+        size = struct.unpack("<I", bytes(self.buffer[len(MAGIC):len(MAGIC) + 4]))[0]
+        header = json.loads(bytes(self.buffer[len(MAGIC) + 4:len(MAGIC) + 4 + size]))
+        if header.get("version") != 1 or header.get("days") != DAYS: raise ValueError(f"{path}: nicht unterstützte Archiv-Version")
+        start = -(-(len(MAGIC) + 4 + size) // ALIGN) * ALIGN
+        self.players, self.wars, self.rows = header["players"], header["wars"], header["rows"]
+        for name, spec in header["columns"].items():
+            dtype = np.dtype(spec["dtype"]); count = int(np.prod(spec["shape"]))
+            setattr(self, name, np.frombuffer(self.buffer, dtype=dtype, count=count, offset=start + spec["offset"]).reshape(spec["shape"]))
+
+    def __len__(self): return self.rows
+
+    def totals(self, point_system, rules=DEFAULT_RULE_TABLE, chunk=1 << 16):
+        # Gesamtpunkte je Zeile; in Blöcken, damit Zwischenergebnisse im Cache bleiben
+        totals = np.empty(self.rows, dtype=np.int64); attacks = np.empty(self.rows, dtype=np.int64)
+        for lo in range(0, self.rows, chunk):
+            hi = lo + chunk
+            totals[lo:hi], attacks[lo:hi] = row_totals(self.own_th[lo:hi], self.opp_th[lo:hi], self.stars[lo:hi], self.pct[lo:hi], point_system, rules)
+        return totals, attacks
+
+    def player_totals(self, point_system, rules=DEFAULT_RULE_TABLE):
+        # Punkte, Kriege und Angriffe je Spieler über die ganze Datei
+        totals, attacks = self.totals(point_system, rules)
+        n = len(self.players)
+        return (np.bincount(self.player_id, weights=totals, minlength=n).astype(np.int64), np.bincount(self.player_id, minlength=n),
+                np.bincount(self.player_id, weights=attacks, minlength=n).astype(np.int64))
+
+def readable_wars(paths, failed):
+    # Fehler je Datei melden und weitermachen; eine kaputte Datei kostet nicht die ganze Saison
+    for path in paths:
+        try: yield path, read_war_file(path)
+        except (OSError, ValueError, KeyError) as e: print(f"Fehler in {path}: {e}", file=sys.stderr); failed.append(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Packt Kriegsdateien in Saison-Archive (.cwls) und wertet diese ohne Einlesen aus.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="Kriegsdateien in ein Saison-Archiv schreiben")
+    pack.add_argument("output"); pack.add_argument("inputs", nargs="+", help="Ordner oder Glob-Muster mit Kriegsdateien (CSV/JSON/XLSX)")
+    score = commands.add_parser("score", help="Gesamt-Rangliste über ein oder mehrere Archive")
+    score.add_argument("archives", nargs="+")
+    add_scoring_arguments(score)
+    score.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        paths = sorted(dict.fromkeys(iter_war_files(args.inputs))); failed = []
+        rows = write_season(args.output, readable_wars(paths, failed))
+        print(f"{len(paths) - len(failed)} Kriege, {rows} Zeilen, {len(failed)} fehlerhaft -> {args.output}")
+        return 1 if failed and len(failed) == len(paths) else 0
+    point_system, rules = load_scoring(args.points, args.rules)
+    started = time.perf_counter(); board, rows, wars = {}, 0, 0
+    for path in args.archives:
+        archive = SeasonArchive(path); points, played, attacks = archive.player_totals(point_system, rules)
+        for name, p, w, a in zip(archive.players, points.tolist(), played.tolist(), attacks.tolist()):
+            entry = board.setdefault(name, [0, 0, 0]); entry[0] += p; entry[1] += w; entry[2] += a
+        rows += len(archive); wars += len(archive.wars)
+    print(f"{len(args.archives)} Archive, {wars} Kriege, {rows} Zeilen in {time.perf_counter() - started:.3f}s")
+    for name, (points, played, attacks) in sorted(board.items(), key=lambda item: (-item[1][0], item[0]))[:args.top]:
+        print(f"{name}: {points} Punkte in {played} Kriegen ({attacks} Angriffe)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
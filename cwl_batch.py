@@ -0,0 +1,78 @@
+import argparse
+import csv
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from cwl_engine import DEFAULT_RULE_TABLE, add_scoring_arguments, iter_war_files, load_scoring, read_war_file, score_war
+
+# ----------------------------
+# Headless Batch-Wertung: viele Kriegsdateien -> eine Gesamt-Rangliste
+# ----------------------------
+# Beispiel:
+#   python cwl_batch.py archiv/ "clan2/**/*.xlsx" --points point_system.json --jobs 8 --output rangliste.csv
+
+def score_file(path, point_system, rules=DEFAULT_RULE_TABLE):
+    war_score = score_war(read_war_file(path), point_system, rules)
+    awards = war_score.awards()
+    winners = {key: awards[key]["name"] for key in ("mvp", "goliath") if awards[key]["name"] not in ("N/A", "Niemand")}
+    return path, list(zip(war_score.names.tolist(), war_score.totals.tolist())), winners
+
+def bounded_map(executor, fn, items, window, *args):
+    # Wie executor.map, aber mit höchstens `window` offenen Aufträgen -> konstanter Speicher bei beliebig großen Archiven
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(fn, item, *args)))
+        if len(pending) >= window: yield pending.popleft()
+    yield from pending
+
+class Leaderboard:
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, totals, winners):
+        for name, points in totals:
+            row = self.rows.setdefault(name, {"Name": name, "Punkte": 0, "Kriege": 0, "MVP": 0, "Goliath": 0})
+            row["Punkte"] += points; row["Kriege"] += 1
+        for award, name in winners.items():
+            self.rows[name]["MVP" if award == "mvp" else "Goliath"] += 1
+
+    def to_dataframe(self):
+        table = pd.DataFrame(list(self.rows.values()), columns=["Name", "Punkte", "Kriege", "MVP", "Goliath"])
+        table.insert(3, "Schnitt", (table["Punkte"] / table["Kriege"].where(table["Kriege"] > 0)).round(2))
+        return table.sort_values(by=["Punkte", "Name"], ascending=[False, True]).reset_index(drop=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wertet viele CWL-Kriegsdateien parallel aus und schreibt eine Gesamt-Rangliste.")
+    parser.add_argument("inputs", nargs="+", help="Ordner oder Glob-Muster mit Kriegsdateien (CSV/JSON/XLSX)")
+    add_scoring_arguments(parser)
+    parser.add_argument("--jobs", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--output", default="cwl_rangliste.csv", help="Gesamt-Rangliste (CSV)")
+    parser.add_argument("--per-war", help="Optional: Punkte je Krieg und Spieler als CSV (wird fortlaufend geschrieben)")
+    args = parser.parse_args(argv)
+
+    point_system, rules = load_scoring(args.points, args.rules)
+    jobs = args.jobs or os.cpu_count() or 1
+    leaderboard, scored, failed = Leaderboard(), 0, 0
+    per_war_file = open(args.per_war, 'w', newline='', encoding='utf-8') if args.per_war else None
+    per_war = csv.writer(per_war_file) if per_war_file else None
+    if per_war: per_war.writerow(["Datei", "Name", "Punkte"])
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for source, future in bounded_map(executor, score_file, iter_war_files(args.inputs), 4 * jobs, point_system, rules):
+                try: path, totals, winners = future.result()
+                except (OSError, ValueError, KeyError) as e:
+                    failed += 1; print(f"Fehler in {source}: {e}", file=sys.stderr); continue
+                leaderboard.add(totals, winners); scored += 1
+                if per_war: per_war.writerows((path, name, points) for name, points in totals)
+    finally:
+        if per_war_file: per_war_file.close()
+    leaderboard.to_dataframe().to_csv(args.output, index=False)
+    print(f"{scored} Kriege ausgewertet, {failed} fehlerhaft, {len(leaderboard.rows)} Spieler -> {args.output}")
+    return 1 if failed and not scored else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from cwl_engine import DAYS, DEFAULT_POINTS, WarData, check_grid, score_war
+from cwl_persist import atomic_write_json
+
+# ----------------------------
+# Benchmarks: synthetische Kriege, Ergebnisse als JSON, Regressionsgrenzen und Golden-Check der Wertung
+# ----------------------------
+# Beispiel:
+#   python cwl_bench.py run --output bench_neu.json --baseline bench_alt.json --max-slowdown 1.5
+#   python cwl_bench.py run --quick --only score,export
+#   python cwl_bench.py golden            # Regressionsfälle und Wertung gegen cwl_bench_golden.json prüfen
+#   python cwl_bench.py golden --write    # Referenz neu schreiben (nur bei gewollter Änderung der Wertung)
+SIZES = (15, 50, 1000, 10000, 100000, 1000000)
+QUICK_SIZES = (15, 50, 1000, 10000)
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cwl_bench_golden.json")
+GOLDEN_POINTS = {"mutig": {**DEFAULT_POINTS, "mut_base": 3, "mut_extra": 5, "all_attacks": 4}, "standard": dict(DEFAULT_POINTS)}
+
+def synthetic_war(players, seed=0):
+    # Vektorisierter Generator (auch für 1M Zeilen in Sekundenbruchteilen): ~90% Angriffe, RH-Differenzen -3..+3, einzelne fehlende Gegner
+    rng = np.random.default_rng(seed)
+    own = rng.integers(10, 18, players); opp = np.clip(own[:, None] + rng.integers(-3, 4, (players, DAYS)), 1, 17)
+    stars = rng.choice(np.array([0, 1, 2, 2, 3, 3]), (players, DAYS)); pct = np.where(stars == 3, 100, rng.integers(0, 100, (players, DAYS)))
+    attacked = rng.random((players, DAYS)) < 0.9; opp_known = rng.random((players, DAYS)) < 0.97
+    present = np.ones((players, len(WarData.COLUMNS)), bool)
+    present[:, 1:] = np.stack([opp_known, attacked, attacked], axis=-1).reshape(players, -1)
+    return WarData([f"Spieler {i}" for i in range(players)], own.astype(np.int8), opp.astype(np.int8), stars.astype(np.int8), pct.astype(np.uint8), present)
+
+def measure(fn, min_time=0.3, max_runs=50, min_runs=3):
+    # Ein Aufwärmlauf, dann wiederholen bis min_time erreicht ist; lange Läufe (>2 s) nur einmal
+    start = time.perf_counter(); fn(); first = time.perf_counter() - start
+    if first > 2: return [first]
+    times = []
+    while len(times) < min_runs or (sum(times) < min_time and len(times) < max_runs):
+        start = time.perf_counter(); fn(); times.append(time.perf_counter() - start)
+    return times
+
+def result(times, n=None):
+    entry = {"median_ms": round(statistics.median(times) * 1000, 4), "min_ms": round(min(times) * 1000, 4), "runs": len(times)}
+    if n: entry["players"] = n; entry["us_per_player"] = round(statistics.median(times) * 1e6 / n, 4)
+    return entry
+
+# --- Benchmark-Gruppen: jede liefert {name: ergebnis} ---
+def bench_score(sizes):
+    from cwl_engine import calculate_all_points, calculate_awards
+    results = {}
+    for n in sizes:
+        data = synthetic_war(n, seed=n); df = data.to_dataframe()
+        results[f"score_war/{n}"] = result(measure(lambda: score_war(data, DEFAULT_POINTS)), n)
+        results[f"calculate_all_points/{n}"] = result(measure(lambda: calculate_all_points(df, DEFAULT_POINTS)), n)
+        summary = calculate_all_points(df, DEFAULT_POINTS)
+        results[f"calculate_awards/{n}"] = result(measure(lambda: calculate_awards(df, summary, DEFAULT_POINTS)), n)
+    return results
+
+def bench_validate(sizes):
+    from cwl_import import WarImport
+    results = {}
+    for n in sizes:
+        values = synthetic_war(n, seed=n).matrix()
+        results[f"check_grid/{n}"] = result(measure(lambda: check_grid(values)), n)
+        if n <= 10000:
+            table = "\n".join(["\t".join(["Name"] + WarData.COLUMNS)] + ["\t".join([f"Spieler {r}"] + ["" if np.isnan(v) else str(int(v)) for v in row]) for r, row in enumerate(values)])
+            results[f"import_table/{n}"] = result(measure(lambda: WarImport.parse(table).validate()), n)
+    return results
+
+def bench_settings(sizes):
+    from cwl_store import ClanStore
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        roster = [f"Spieler {i}" for i in range(50)]; roster_file, points_file = os.path.join(directory, "clan_roster.json"), os.path.join(directory, "point_system.json")
+        def save(): atomic_write_json(roster_file, roster); atomic_write_json(points_file, DEFAULT_POINTS)
+        def load():
+            with open(roster_file, 'r') as f: json.load(f)
+            with open(points_file, 'r') as f: json.load(f)
+        save(); results["settings_save"] = result(measure(save)); results["settings_load"] = result(measure(load))
+        store = ClanStore(os.path.join(directory, "clan"), roster); edits = iter(range(10 ** 9))
+        results["clan_store_snapshot/50"] = result(measure(store.snapshot), 50)
+        results["clan_store_edit/50"] = result(measure(lambda: store.edit_cells(store.version, {("Spieler 1", "Tag1_Prozent"): next(edits) % 100})), 50)
+    return results
+
+def bench_export(sizes):
+    from cwl_export import export_sheets, write_csv, write_xlsx
+    results = {}
+    for n in [n for n in sizes if n <= 100000]:
+        data = synthetic_war(n, seed=n); score = score_war(data, DEFAULT_POINTS)
+        results[f"export_sheets/{n}"] = result(measure(lambda: export_sheets(score, data)), n)
+        sheets = export_sheets(score, data)
+        results[f"export_csv/{n}"] = result(measure(lambda: write_csv(io.StringIO(), sheets)), n)
+        results[f"export_xlsx/{n}"] = result(measure(lambda: write_xlsx(io.BytesIO(), sheets), min_runs=1), n)
+    return results
+
+def bench_kivy(sizes):
+    # Eigener Prozess (Kivy öffnet ein Fenster und hält globalen Zustand); fehlt Kivy, wird die Gruppe übersprungen
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1", KIVY_LOG_MODE="PYTHON")
+        sizes = [n for n in sizes if n <= 10000]
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "kivy-worker", ",".join(map(str, sizes))], cwd=directory, env=env, capture_output=True, text=True, timeout=600)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode or not lines: return {"kivy": {"skipped": (proc.stderr.strip().splitlines() or ["kein Ergebnis"])[-1]}}
+    return json.loads(lines[-1])
+
+def kivy_worker(sizes):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import logging; logging.disable(logging.WARNING)
+    import main
+    from kivy.clock import Clock
+    app = main.CWLRechnerApp(); results = {}
+    def run(dt):
+        try:
+            for n in sizes:
+                data = synthetic_war(n, seed=n); app.roster = list(data.names); app.replace_war_data(data)
+                for name in ("step1", "step2"):
+                    screen = app.screen_manager.get_screen(name)
+                    def build(): screen.rebuild_layout(); screen.update_layout()
+                    results[f"kivy_{name}_build/{n}"] = result(measure(build, min_runs=3, max_runs=10), n)
+            print(json.dumps(results))
+        finally: app.stop()
+    Clock.schedule_once(run, 0.5); app.run()
+
+GROUPS = {"score": bench_score, "validate": bench_validate, "settings": bench_settings, "export": bench_export, "kivy": bench_kivy}
+
+def compare(results, baseline, max_slowdown, floor_ms=1.0):
+    # Regression = Median langsamer als baseline * max_slowdown und mindestens floor_ms absolut (Rauschen bei sehr kurzen Läufen)
+    regressions = []
+    for name, entry in results.items():
+        old = baseline.get(name, {})
+        if "median_ms" not in entry or "median_ms" not in old: continue
+        if entry["median_ms"] > old["median_ms"] * max_slowdown and entry["median_ms"] - old["median_ms"] > floor_ms:
+            regressions.append((name, old["median_ms"], entry["median_ms"]))
+    return regressions
+
+# ----------------------------
+# Golden-Check: feste Kriege -> (1) Vergleich mit der ursprünglichen pandas-Wertung, (2) Prüfsumme über alle Wertungsergebnisse
+# ----------------------------
+def reference_points(df, point_system):
+    # Ursprüngliche Tag-für-Tag-Wertung mit pandas (Stand vor der Umstellung auf cwl_engine), unverändert als Referenz
+    import pandas as pd
+    if df.empty: return pd.DataFrame(columns=["Name", "Punkte"]), pd.Series(dtype=float)
+    df_calc = df.copy()
+    total_points = pd.Series(0, index=df_calc.index, dtype=float); goliath_points = pd.Series(0, index=df_calc.index, dtype=float)
+    total_attacks = pd.Series(0, index=df_calc.index, dtype=int)
+    df_calc['Eigenes_Rathaus'] = pd.to_numeric(df_calc['Eigenes_Rathaus'], errors='coerce').fillna(0)
+    for i in range(1, 8):
+        stars, pct, opp_rh = (pd.to_numeric(df_calc.get(c), errors='coerce') for c in [f"Tag{i}_Sterne", f"Tag{i}_Prozent", f"Tag{i}_Rathaus_Gegner"])
+        attack_made = (stars.notna() | pct.notna()) & opp_rh.notna()
+        total_attacks += attack_made.astype(int)
+        stars = stars.fillna(-1); pct = pct.fillna(0)
+        diff = opp_rh - df_calc['Eigenes_Rathaus']
+        ell_conditions = [diff >= 2, diff == 1, diff == 0, diff == -1, diff <= -2]
+        ell_choices = [point_system["ell_gt_2"], point_system["ell_eq_1"], point_system["ell_eq_0"], point_system["ell_eq_-1"], point_system["ell_lt_-2"]]
+        ell_points = np.select(ell_conditions, ell_choices, default=0)
+        attack_conditions = [
+            (stars == 3) & (diff >= 2), (stars == 3) & (diff.between(-1, 1)), (stars == 3) & (diff <= -2),
+            (stars == 2) & (pct >= 90), (stars == 2) & (pct.between(80, 89)), (stars == 2) & (pct.between(50, 79)),
+            (stars == 1) & (pct.between(90, 99)), (stars == 1) & (pct.between(50, 89)),]
+        attack_choices = [
+            point_system["atk_3s_gt_2"], point_system["atk_3s_eq"], point_system["atk_3s_lt_-2"],
+            point_system["atk_2s_ge_90"], point_system["atk_2s_80_89"], point_system["atk_2s_50_79"],
+            point_system["atk_1s_90_99"], point_system["atk_1s_50_89"]]
+        attack_points = np.select(attack_conditions, attack_choices, default=0)
+        aktiv_points = np.where(attack_made, point_system["aktiv"], 0)
+        bonus_100_points = np.where((pct == 100) & (diff >= 0), point_system["bonus_100"], 0)
+        courage_conditions = [(diff >= 3) & (pct.between(30, 49)), (diff >= 3)]
+        courage_choices = [point_system["mut_extra"], point_system["mut_base"]]
+        mut_points = np.select(courage_conditions, courage_choices, default=0)
+        daily_total = ell_points + attack_points + aktiv_points + bonus_100_points + mut_points
+        total_points += np.where(attack_made, daily_total, 0)
+        goliath_points += np.where(attack_made & (diff >= 2), daily_total, 0)
+    total_points += np.where(total_attacks >= 7, point_system["all_attacks"], 0)
+    results = pd.DataFrame({"Name": df_calc["Name"], "Punkte": total_points.astype(int)})
+    return results.sort_values(by=["Punkte", "Name"], ascending=[False, True]).reset_index(drop=True), goliath_points
+
+def reference_awards(df, summary_df, goliath_points):
+    if summary_df.empty: return {"mvp": {"name": "N/A", "score": ""}, "goliath": {"name": "N/A", "score": ""}}
+    mvp = {"name": summary_df.iloc[0]["Name"], "score": f'{summary_df.iloc[0]["Punkte"]} Punkte'}
+    if goliath_points.sum() > 0: goliath = {"name": df.loc[goliath_points.idxmax(), "Name"], "score": f'{int(goliath_points.max())} Punkte gegen höhere RH'}
+    else: goliath = {"name": "Niemand", "score": "Keine Angriffe auf viel höhere RH"}
+    return {"mvp": mvp, "goliath": goliath}
+
+def golden_cases():
+    # Eigener, fester Generator: Änderungen am Lastgenerator der API dürfen die Referenz nicht verschieben
+    cases = {f"krieg_{n}_{seed}": synthetic_war(n, seed=seed) for n, seed in ((15, 1), (50, 2), (1000, 3))}
+    edge = WarData.empty(["leer", "max", "min"]); edge.set(1, "Eigenes_Rathaus", 1)
+    for day in range(1, DAYS + 1):
+        for column, value in (("Rathaus_Gegner", 17), ("Sterne", 3), ("Prozent", 100)): edge.set(1, f"Tag{day}_{column}", value)
+        for column, value in (("Rathaus_Gegner", 1), ("Sterne", 0), ("Prozent", 0)): edge.set(2, f"Tag{day}_{column}", value)
+    cases["grenzfaelle"] = edge
+    return cases
+
+def golden_outputs():
+    # Alles, was die Apps anzeigen oder exportieren: Rangliste, Awards, Tages- und Kategorienpunkte, Bonus, Angriffe
+    # -> ({fall: {sha256, top3}}, [Fälle, die von der pandas-Referenz abweichen])
+    from cwl_engine import calculate_all_points, calculate_awards
+    outputs, mismatches = {}, []
+    for case, data in golden_cases().items():
+        for label, point_system in GOLDEN_POINTS.items():
+            score = score_war(data, point_system); df = data.to_dataframe(); summary = calculate_all_points(df, point_system)
+            reference, goliath_points = reference_points(df.astype({column: float for column in WarData.COLUMNS}), point_system)  # float/NaN wie im alten Editor
+            ranking = [[name, int(points)] for name, points in reference.values.tolist()]
+            if [[name, int(points)] for name, points in score.ranking()] != ranking or score.awards() != reference_awards(df, reference, goliath_points) or summary.values.tolist() != ranking:
+                mismatches.append(f"{case}/{label}")
+            payload = {"ranking": score.ranking(), "awards": score.awards(), "day_points": score.day_points.tolist(), "breakdown": score.breakdown.sum(axis=1).tolist(),
+                       "bonus": score.bonus.tolist(), "attacks": score.attacks.tolist(), "summary": summary.values.tolist(), "calculate_awards": calculate_awards(df, summary, point_system)}
+            encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+            outputs[f"{case}/{label}"] = {"sha256": hashlib.sha256(encoded).hexdigest(), "top3": score.ranking()[:3]}
+    return outputs, mismatches
+
+# --- Regressionsfälle: Eingaben, die früher abstürzten oder anders gewertet wurden; jeder Fall liefert True, wenn alles stimmt ---
+def regression_import_short_row():
+    from cwl_import import WarImport
+    imported = WarImport.parse("Eigenes RH\tName\nabc\n")
+    return imported.names == [""] and [issue[:2] for issue in imported.issues] == [("", "Eigenes_Rathaus")]
+
+def regression_live_negative_goliath():
+    # Negatives Gewicht: Goliath-Punkte zusammen < 0 -> auch live kein Gewinner, obwohl ein Spieler positiv liegt
+    from cwl_live import LiveStandings
+    point_system = {**DEFAULT_POINTS, "atk_1s_50_89": -20}; data = WarData.empty(["David", "Pech"]); live = LiveStandings(point_system)
+    for row, (stars, pct) in enumerate(((3, 100), (1, 60))):
+        for column, value in (("Eigenes_Rathaus", 10), ("Tag1_Rathaus_Gegner", 12), ("Tag1_Sterne", stars), ("Tag1_Prozent", pct)): data.set(row, column, value)
+        live.apply({"name": data.names[row], "day": 1, "own_th": 10, "opp_th": 12, "stars": stars, "pct": pct})
+    awards = score_war(data, point_system).awards()
+    return awards["goliath"]["name"] == "Niemand" and live.awards() == awards
+
+REGRESSIONS = {"import/kurze Zeile": regression_import_short_row, "live/negatives Goliath-Gewicht": regression_live_negative_goliath}
+
+def run_regressions():
+    failed = []
+    for name, check in REGRESSIONS.items():
+        try: ok = check()
+        except Exception as error: ok = False; print(f"FEHLER {name}: {type(error).__name__}: {error}")
+        if not ok: failed.append(name); print(f"ABWEICHUNG {name}")
+    print(f"Regressionsfälle: {len(REGRESSIONS) - len(failed)}/{len(REGRESSIONS)} in Ordnung"); return failed
+
+def run_golden(write):
+    if run_regressions(): return 1
+    outputs, mismatches = golden_outputs()
+    for case in mismatches: print(f"ABWEICHUNG {case}: Rangliste oder Awards weichen von der pandas-Referenzwertung ab")
+    if mismatches: print(f"Referenz-Check: {len(mismatches)} von {len(outputs)} Fällen abweichend"); return 1
+    if write:
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f: json.dump(outputs, f, indent=2, ensure_ascii=False); f.write("\n")
+        print(f"{len(outputs)} Referenzwertungen -> {GOLDEN_FILE}"); return 0
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f: expected = json.load(f)
+    failed = [case for case in expected if outputs.get(case, {}).get("sha256") != expected[case]["sha256"]]
+    for case in failed: print(f"ABWEICHUNG {case}: erwartet {expected[case]['top3']}, jetzt {outputs.get(case, {}).get('top3')}")
+    print(f"Golden-Check: {len(expected) - len(failed)}/{len(expected)} identisch"); return 1 if failed else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks und Golden-Check für Wertung, Prüfung, Import/Export und Kivy-Aufbau.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Benchmarks ausführen")
+    run.add_argument("--output", default="bench_results.json"); run.add_argument("--quick", action="store_true", help=f"Nur bis {QUICK_SIZES[-1]} Spieler")
+    run.add_argument("--only", help=f"Kommagetrennte Gruppen aus {','.join(GROUPS)}")
+    run.add_argument("--baseline", help="Frühere Ergebnisdatei für den Regressionsvergleich"); run.add_argument("--max-slowdown", type=float, default=1.5)
+    golden = commands.add_parser("golden", help="Wertung gegen die gespeicherte Referenz prüfen")
+    golden.add_argument("--write", action="store_true", help="Referenz neu schreiben")
+    worker = commands.add_parser("kivy-worker"); worker.add_argument("sizes")
+    args = parser.parse_args(argv)
+
+    if args.command == "kivy-worker": kivy_worker([int(n) for n in args.sizes.split(",")]); return 0
+    if args.command == "golden": return run_golden(args.write)
+    sizes = QUICK_SIZES if args.quick else SIZES; results = {}
+    for group in (args.only.split(",") if args.only else GROUPS):
+        started = time.perf_counter(); results.update(GROUPS[group](sizes)); print(f"{group}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    golden_status = run_golden(False) if os.path.exists(GOLDEN_FILE) else None
+    report = {"meta": {"created": datetime.now().isoformat(timespec='seconds'), "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                       "platform": platform.platform(), "quick": args.quick, "golden_ok": None if golden_status is None else golden_status == 0},
+              "thresholds": {"max_slowdown": args.max_slowdown, "baseline": args.baseline}, "results": results}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f: regressions = compare(results, json.load(f)["results"], args.max_slowdown)
+        report["regressions"] = [{"name": name, "baseline_ms": old, "median_ms": new} for name, old, new in regressions]
+    atomic_write_json(args.output, report)
+    for name, entry in results.items():
+        print(f"{name:36s} " + (f"{entry['median_ms']:10.3f} ms" + (f"  {entry['us_per_player']:8.3f} us/Spieler" if "us_per_player" in entry else "") if "median_ms" in entry else f"übersprungen: {entry.get('skipped')}"))
+    for name, old, new in regressions: print(f"REGRESSION {name}: {old:.3f} ms -> {new:.3f} ms")
+    return 1 if regressions or golden_status else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
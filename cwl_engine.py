@@ -0,0 +1,536 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from cwl_profile import timed
+
+# ----------------------------
+# War Layout
+# ----------------------------
+DAYS = 7
+FIELDS = ("Rathaus_Gegner", "Sterne", "Prozent")
+OPP, STARS, PCT = range(len(FIELDS))
+MISSING = np.iinfo(np.int16).min  # Sentinel für leere Zellen, erfüllt keine Punkte-Regel
+DAY_COLUMNS = [f"Tag{i}_{field}" for i in range(1, DAYS + 1) for field in FIELDS]
+
+def _encode(values):
+    values = np.asarray(values, dtype=float)
+    clipped = np.clip(np.trunc(np.nan_to_num(values, nan=0.0)), MISSING + 1, np.iinfo(np.int16).max)
+    return np.where(np.isnan(values), MISSING, clipped).astype(np.int16)
+
+class WarData:
+    # Kompakter Kriegsdatensatz: int8 Rathäuser/Sterne, uint8 Prozent und eine Maske für ausgefüllte Zellen
+    COLUMNS = ["Eigenes_Rathaus"] + DAY_COLUMNS
+
+    def __init__(self, names, own_th, opp_th, stars, pct, present):
+        self.names = list(names)
+        self.own_th, self.opp_th, self.stars, self.pct = own_th, opp_th, stars, pct
+        self.present = present  # Spieler x Spalten (COLUMNS-Reihenfolge)
+        self.index = {name: row for row, name in enumerate(self.names)}
+
+    @classmethod
+    def empty(cls, names):
+        n = len(names)
+        return cls(names, np.zeros(n, np.int8), np.zeros((n, DAYS), np.int8), np.zeros((n, DAYS), np.int8),
+                   np.zeros((n, DAYS), np.uint8), np.zeros((n, len(cls.COLUMNS)), bool))
+
+    @classmethod
+    def check_range(cls, values, columns):
+        # Werte, die nicht in die Spalte passen (int8, Prozent uint8), ablehnen statt still zu kappen: aus -5 % würden sonst gültige 0 %
+        # values: Zeilen x columns, NaN/None = leer; ValueError mit der ersten unpassenden Zelle
+        columns = list(columns); values = np.trunc(np.asarray(values, dtype=float).reshape(-1, len(columns)))
+        hi = np.array([255 if column.endswith("_Prozent") else 127 for column in columns]); lo = np.where(hi == 255, 0, -128)
+        bad = np.argwhere((values < lo) | (values > hi))
+        if len(bad): row, c = bad[0]; raise ValueError(f"{columns[c]}: {values[row, c]:g} lässt sich nicht speichern (erlaubt {lo[c]} bis {hi[c]})")
+
+    @classmethod
+    def from_dataframe(cls, df):
+        import pandas as pd
+        raw = df.reindex(columns=cls.COLUMNS).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float); cls.check_range(raw, cls.COLUMNS)
+        present = ~np.isnan(raw); values = np.trunc(np.nan_to_num(raw, nan=0.0))
+        days = values[:, 1:].reshape(len(df), DAYS, len(FIELDS))
+        return cls(df.reindex(columns=["Name"])["Name"].tolist(), values[:, 0].astype(np.int8), days[..., OPP].astype(np.int8), days[..., STARS].astype(np.int8),
+                   days[..., PCT].astype(np.uint8), present)
+
+    def __len__(self): return len(self.names)
+
+    def copy(self):
+        return WarData(self.names, self.own_th.copy(), self.opp_th.copy(), self.stars.copy(), self.pct.copy(), self.present.copy())
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.own_th, self.opp_th, self.stars, self.pct, self.present))
+
+    def _slot(self, column):
+        if column == "Eigenes_Rathaus": return self.own_th, None
+        day, field = column[3:].split("_", 1)
+        return (self.opp_th, self.stars, self.pct)[FIELDS.index(field)], int(day) - 1
+
+    def get(self, row, column):
+        if not self.present[row, self.COLUMNS.index(column)]: return None
+        array, day = self._slot(column)
+        return int(array[row] if day is None else array[row, day])
+
+    def set(self, row, column, value):
+        # value None leert die Zelle; ValueError (ohne Änderung), wenn der Wert nicht in die Spalte passt
+        array, day = self._slot(column)
+        if value is not None: value = int(value); self.check_range([value], [column])
+        self.present[row, self.COLUMNS.index(column)] = value is not None
+        value = 0 if value is None else value
+        if day is None: array[row] = value
+        else: array[row, day] = value
+
+    def text(self, row, column):
+        value = self.get(row, column)
+        return "" if value is None else str(value)
+
+    def reindex(self, names):
+        # Neue Kaderliste: bekannte Spieler behalten ihre Daten, neue Spieler starten leer
+        data = WarData.empty(names)
+        old = [self.index.get(name, -1) for name in names]; keep = np.array([row for row in old if row >= 0], dtype=np.intp)
+        new = np.array([row for row, o in enumerate(old) if o >= 0], dtype=np.intp)
+        for source, target in zip((self.own_th, self.opp_th, self.stars, self.pct, self.present), (data.own_th, data.opp_th, data.stars, data.pct, data.present)):
+            target[new] = source[keep]
+        return data
+
+    def to_dict(self):
+        # JSON-taugliche Form für Snapshots: {"names": [...], "columns": {spalte: [wert oder None]}}
+        columns = {}
+        for c, column in enumerate(self.COLUMNS):
+            array, day = self._slot(column)
+            values = (array if day is None else array[:, day]).tolist()
+            columns[column] = [v if filled else None for v, filled in zip(values, self.present[:, c].tolist())]
+        return {"names": list(self.names), "columns": columns}
+
+    @classmethod
+    def from_dict(cls, payload):
+        data = cls.empty(payload["names"])
+        for c, column in enumerate(cls.COLUMNS):
+            values = payload["columns"].get(column) or [None] * len(data)
+            array, day = data._slot(column); cls.check_range([np.nan if v is None else v for v in values], [column])
+            data.present[:, c] = [v is not None for v in values]
+            numbers = np.array([v or 0 for v in values], dtype=np.int64).astype(array.dtype)
+            if day is None: array[:] = numbers
+            else: array[:, day] = numbers
+        return data
+
+    def tensor(self):
+        # Engine-Layout: int16 mit MISSING-Sentinel für leere Zellen
+        own = np.where(self.present[:, 0], self.own_th, 0).astype(np.int16)
+        war = np.stack([self.opp_th, self.stars, self.pct], axis=-1).astype(np.int16)
+        war[~self.present[:, 1:].reshape(len(self), DAYS, len(FIELDS))] = MISSING
+        return own, war
+
+    def matrix(self):
+        # Spieler x COLUMNS als float, NaN = leer (Eingabe für check_grid)
+        values = np.concatenate([self.own_th[:, None], np.stack([self.opp_th, self.stars, self.pct], axis=-1).reshape(len(self), -1)], axis=1).astype(float)
+        values[~self.present] = np.nan
+        return values
+
+    def to_dataframe(self):
+        # Für Anzeige/Export: nullable Int64-Spalten statt object/None
+        import pandas as pd
+        columns = {"Name": self.names}
+        for c, column in enumerate(self.COLUMNS):
+            array, day = self._slot(column)
+            values = array if day is None else array[:, day]
+            columns[column] = pd.arrays.IntegerArray(values.astype(np.int64), ~self.present[:, c])
+        return pd.DataFrame(columns)
+
+def war_tensor(df):
+    # Stapelt alle Tag{i}_* Spalten einmalig in einen Spieler x Tage x Felder Integer-Tensor
+    if isinstance(df, WarData): return df.tensor()
+    import pandas as pd
+    raw = df.reindex(columns=["Eigenes_Rathaus"] + DAY_COLUMNS).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    return _encode(np.nan_to_num(raw[:, 0], nan=0.0)), _encode(raw[:, 1:]).reshape(len(df), DAYS, len(FIELDS))
+
+def grid_values(df):
+    # DataFrame (auch mit unfertigen Editor-Eingaben) -> Spieler x WarData.COLUMNS float, NaN = leer
+    if isinstance(df, WarData): return df.matrix()
+    import pandas as pd
+    return df.reindex(columns=WarData.COLUMNS).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+# ----------------------------
+# Eingabeprüfung: ein vektorisierter Durchlauf über die ganze Tabelle
+# ----------------------------
+MAX_TH = 17  # höchstes Rathaus-Level im Spiel
+TH_DIFF_LIMIT = 3  # größere Abstände zwischen eigenem und gegnerischem Rathaus sind meist Tippfehler
+
+class GridCheck:
+    # errors/warnings: Masken Spieler x WarData.COLUMNS, idle: Spieler ohne Angriff; issues: [(zeile, spalte, meldung, fehler?)]
+    def __init__(self, errors, warnings, idle, issues):
+        self.errors, self.warnings, self.idle, self.issues = errors, warnings, idle, issues
+
+    @property
+    def error_count(self): return sum(1 for issue in self.issues if issue[3])
+
+    def state(self, row, column):
+        c = WarData.COLUMNS.index(column)
+        return 'error' if self.errors[row, c] else 'warning' if self.warnings[row, c] else None
+
+    def report(self, names, limit=10):
+        errors = self.error_count
+        lines = [f"{errors} Fehler, {len(self.issues) - errors} Hinweise"]
+        lines += [f"{'Fehler' if is_error else 'Hinweis'}: {names[row]} / {column}: {message}" for row, column, message, is_error in self.issues[:limit]]
+        if len(self.issues) > limit: lines.append(f"... und {len(self.issues) - limit} weitere")
+        return "\n".join(lines)
+
+@timed("prüfung/check_grid")
+def check_grid(values):
+    # values: Spieler x WarData.COLUMNS (NaN = leer). Fehler = ungültiger Wert, Hinweis = wahrscheinlich falsch oder wirkungslos
+    values = np.asarray(values, dtype=float); n = len(values)
+    own = values[:, 0]; days = values[:, 1:].reshape(n, DAYS, len(FIELDS)); opp, stars, pct = days[..., OPP], days[..., STARS], days[..., PCT]
+    def cells(own=False, opp=False, stars=False, pct=False):
+        # Masken je Feld (Spieler x Tage) -> Spieler x WarData.COLUMNS
+        block = np.stack(np.broadcast_arrays(opp, stars, pct, np.zeros((n, DAYS), bool))[:3], axis=-1)
+        return np.concatenate([np.broadcast_to(own, (n,))[:, None], block.reshape(n, -1)], axis=1)
+    th_invalid = lambda th: (th < 1) | (th > MAX_TH)
+    attacked = ~np.isnan(stars) | ~np.isnan(pct)
+    rules = [
+        (True, ~np.isnan(values) & (values != np.trunc(values)), "keine ganze Zahl"),
+        (True, cells(own=th_invalid(own), opp=th_invalid(opp)), f"Rathaus-Level außerhalb 1-{MAX_TH}"),
+        (True, cells(stars=(stars < 0) | (stars > 3)), "Sterne außerhalb 0-3"),
+        (True, cells(pct=(pct < 0) | (pct > 100)), "Prozent außerhalb 0-100"),
+        (False, cells(opp=attacked & np.isnan(opp)), "Angriff ohne Gegner-Rathaus, zählt nicht"),
+        (False, cells(own=np.isnan(own) & attacked.any(axis=1)), "Angriffe ohne eigenes Rathaus"),
+        (False, cells(opp=(np.abs(opp - own[:, None]) > TH_DIFF_LIMIT) & ~th_invalid(own)[:, None] & ~th_invalid(opp)), f"Rathaus-Differenz größer als {TH_DIFF_LIMIT}"),
+        (False, cells(pct=~np.isnan(stars) & np.isnan(pct)), "Sterne ohne Prozent"),
+        (False, cells(stars=np.isnan(stars) & ~np.isnan(pct)), "Prozent ohne Sterne"),
+        (False, cells(stars=(stars == 3) & (pct != 100) & ~np.isnan(pct)), "3 Sterne, aber nicht 100%"),
+        (False, cells(pct=(pct == 100) & (stars != 3) & ~np.isnan(stars)), "100%, aber nicht 3 Sterne"),
+    ]
+    errors, warnings, issues = np.zeros(values.shape, bool), np.zeros(values.shape, bool), []
+    for is_error, mask, message in rules:
+        # Jede Zelle wird nur einmal gemeldet; Hinweise nur für Zellen ohne Fehler
+        new = mask & ~errors & ~warnings
+        (errors if is_error else warnings)[new] = True
+        issues += [(r, WarData.COLUMNS[c], f"{message}: {values[r, c]:g}" if is_error else message, is_error) for r, c in zip(*(index.tolist() for index in np.nonzero(new)))]
+    # Spieler ohne gewerteten Angriff, sobald im Clan schon angegriffen wurde
+    made = attacked & ~np.isnan(opp); idle = ~made.any(axis=1) & made.any()
+    issues += [(r, "Name", "keine Angriffe", False) for r in np.flatnonzero(idle).tolist()]
+    return GridCheck(errors, warnings, idle, issues)
+
+# ----------------------------
+# Point System & Rule Hits
+# ----------------------------
+DEFAULT_POINTS = {
+    "ell_gt_2": 3, "ell_eq_1": 2, "ell_eq_0": 1, "ell_eq_-1": 0, "ell_lt_-2": -1,
+    "atk_3s_gt_2": 6, "atk_3s_eq": 4, "atk_3s_lt_-2": 2, "atk_2s_ge_90": 4,
+    "atk_2s_80_89": 3, "atk_2s_50_79": 2, "atk_1s_90_99": 2, "atk_1s_50_89": 1,
+    "aktiv": 1, "bonus_100": 1, "mut_base": 1, "mut_extra": 2, "all_attacks": 2,
+}
+POINT_KEYS = tuple(DEFAULT_POINTS)
+
+def goliath_result(name, points, total):
+    # Eine Goliath-Regel für Endwertung, API und Live-Tabelle: vergeben nur, wenn die Goliath-Punkte aller Spieler zusammen positiv sind
+    if total > 0: return {"name": name, "score": f'{points} Punkte gegen höhere RH'}
+    return {"name": "Niemand", "score": "Keine Angriffe auf viel höhere RH"}
+CATEGORIES = ("ELL", "Angriff", "Aktiv", "100%", "Mut")
+
+# Deklarative Regeltabelle: pro Kategorie gewinnt die erste passende Regel (wie np.select).
+# Bedingungen sind optional und inklusive: sterne, pct_min/pct_max (ganze Prozent), diff_min/diff_max (Gegner-RH minus eigenes RH).
+DEFAULT_RULES = [
+    {"key": "ell_gt_2", "kategorie": "ELL", "diff_min": 2},
+    {"key": "ell_eq_1", "kategorie": "ELL", "diff_min": 1, "diff_max": 1},
+    {"key": "ell_eq_0", "kategorie": "ELL", "diff_min": 0, "diff_max": 0},
+    {"key": "ell_eq_-1", "kategorie": "ELL", "diff_min": -1, "diff_max": -1},
+    {"key": "ell_lt_-2", "kategorie": "ELL", "diff_max": -2},
+    {"key": "atk_3s_gt_2", "kategorie": "Angriff", "sterne": 3, "diff_min": 2},
+    {"key": "atk_3s_eq", "kategorie": "Angriff", "sterne": 3, "diff_min": -1, "diff_max": 1},
+    {"key": "atk_3s_lt_-2", "kategorie": "Angriff", "sterne": 3, "diff_max": -2},
+    {"key": "atk_2s_ge_90", "kategorie": "Angriff", "sterne": 2, "pct_min": 90},
+    {"key": "atk_2s_80_89", "kategorie": "Angriff", "sterne": 2, "pct_min": 80, "pct_max": 89},
+    {"key": "atk_2s_50_79", "kategorie": "Angriff", "sterne": 2, "pct_min": 50, "pct_max": 79},
+    {"key": "atk_1s_90_99", "kategorie": "Angriff", "sterne": 1, "pct_min": 90, "pct_max": 99},
+    {"key": "atk_1s_50_89", "kategorie": "Angriff", "sterne": 1, "pct_min": 50, "pct_max": 89},
+    {"key": "aktiv", "kategorie": "Aktiv"},
+    {"key": "bonus_100", "kategorie": "100%", "pct_min": 100, "pct_max": 100, "diff_min": 0},
+    {"key": "mut_extra", "kategorie": "Mut", "diff_min": 3, "pct_min": 30, "pct_max": 49},
+    {"key": "mut_base", "kategorie": "Mut", "diff_min": 3},
+]
+
+class RuleTable:
+    # Kompiliert die Regeltabelle in eine Nachschlagetabelle [Sterne, Prozent, geklemmte RH-Differenz] -> Regeltreffer
+    STARS_RANGE, PCT_RANGE = (-1, 4), (-1, 101)  # Ränder stehen für "alles darunter/darüber"
+
+    CONDITIONS = ("sterne", "pct_min", "pct_max", "diff_min", "diff_max")
+
+    def __init__(self, rules, warning=None):
+        self.validate(rules); self.warning = warning  # warning: Grund, falls statt einer Regeldatei die Standardregeln gelten
+        self.rules = [dict(rule) for rule in rules]
+        self.fingerprint = hashlib.blake2b(json.dumps(self.rules, sort_keys=True).encode(), digest_size=16).hexdigest()
+        self.keys = tuple(rule["key"] for rule in rules) + ("all_attacks",)
+        self.category = np.array([CATEGORIES.index(rule["kategorie"]) for rule in rules], dtype=np.intp)
+        bounds = [rule[b] for rule in rules for b in ("diff_min", "diff_max") if b in rule] or [0]
+        self.diff_range = (min(bounds) - 1, max(bounds) + 1)
+        stars, pct, diff = np.meshgrid(*(np.arange(lo, hi + 1) for lo, hi in (self.STARS_RANGE, self.PCT_RANGE, self.diff_range)), indexing='ij')
+        self.table = np.zeros(stars.shape + (len(rules),), dtype=bool)
+        taken = np.zeros(stars.shape + (len(CATEGORIES),), dtype=bool)
+        for r, rule in enumerate(rules):
+            match = ~taken[..., self.category[r]]
+            if "sterne" in rule: match &= stars == rule["sterne"]
+            if "pct_min" in rule: match &= pct >= rule["pct_min"]
+            if "pct_max" in rule: match &= pct <= rule["pct_max"]
+            if "diff_min" in rule: match &= diff >= rule["diff_min"]
+            if "diff_max" in rule: match &= diff <= rule["diff_max"]
+            self.table[..., r] = match; taken[..., self.category[r]] |= match
+
+    @classmethod
+    def validate(cls, rules):
+        # Jede Regel vollständig prüfen, bevor etwas kompiliert wird -> ValueError mit der ersten fehlerhaften Regel
+        if not isinstance(rules, list): raise ValueError("Die Regeldatei muss eine Liste von Regeln enthalten.")
+        seen = set()
+        for n, rule in enumerate(rules, start=1):
+            if not isinstance(rule, dict): raise ValueError(f"Regel {n} ist kein Objekt.")
+            key = rule.get("key")
+            if not isinstance(key, str) or not key: raise ValueError(f"Regel {n} hat keinen 'key'.")
+            if key in seen or key == "all_attacks": raise ValueError(f"Regel {n}: 'key' {key} ist doppelt vergeben.")
+            seen.add(key)
+            if rule.get("kategorie") not in CATEGORIES: raise ValueError(f"Unbekannte Kategorie in Regel {key}: {rule.get('kategorie')}")
+            for condition in cls.CONDITIONS:
+                value = rule.get(condition)
+                if condition in rule and (isinstance(value, bool) or not isinstance(value, int) or abs(value) > 1000): raise ValueError(f"Regel {key}: '{condition}' muss eine ganze Zahl sein, nicht {value!r}.")
+
+    def _cells(self, stars, pct, diff):
+        # Fehlende Sterne zählen wie -1, fehlende Prozent wie 0
+        s = np.clip(stars, *self.STARS_RANGE) - self.STARS_RANGE[0]
+        p = np.clip(np.where(pct == MISSING, 0, pct), *self.PCT_RANGE) - self.PCT_RANGE[0]
+        d = np.clip(diff, *self.diff_range) - self.diff_range[0]
+        return s, p, d
+
+    def lookup(self, stars, pct, diff):
+        # Ein Gather pro Angriff
+        return self.table[self._cells(stars, pct, diff)]
+
+    def point_grid(self, point_system):
+        # Regeltreffer bereits mit Punkten verrechnet: [Sterne, Prozent, RH-Differenz] -> Tagespunkte eines Angriffs
+        return self.table.astype(np.int64) @ self.points_vector(point_system)[:-1]
+
+    def day_points(self, grid, stars, pct, diff): return grid[self._cells(stars, pct, diff)]
+
+    def points_vector(self, point_system):
+        return np.array([point_system.get(key, 0) for key in self.keys], dtype=np.int64)
+
+    def points_matrix(self, point_systems):
+        # Beliebig viele Punktesysteme -> K x Regeln Gewichtsmatrix
+        return np.array([[ps.get(key, 0) for key in self.keys] for ps in point_systems], dtype=np.int64).reshape(-1, len(self.keys))
+
+DEFAULT_RULE_TABLE = RuleTable(DEFAULT_RULES)
+
+def load_rules(path):
+    # Fehlende Datei -> Standardregeln; kaputte Datei -> Standardregeln mit warning, damit die Apps trotzdem starten und es anzeigen können
+    try:
+        with open(path, 'r', encoding='utf-8') as f: return RuleTable(json.load(f))
+    except FileNotFoundError: return DEFAULT_RULE_TABLE
+    except (OSError, ValueError) as e: return RuleTable(DEFAULT_RULES, warning=f"Regeldatei {path} ungültig, Standardregeln aktiv: {e}")
+
+def add_scoring_arguments(parser):
+    # --points/--rules für alle Kommandozeilen-Werkzeuge; auswerten mit load_scoring(args.points, args.rules)
+    parser.add_argument("--points", help="Punktesystem (point_system.json), Standard: eingebautes System")
+    parser.add_argument("--rules", help="Regeltabelle (scoring_rules.json), Standard: eingebaute Regeln")
+
+def load_scoring(points_path=None, rules_path=None):
+    # -> (Punktesystem, Regeltabelle); die Punktedatei ergänzt das eingebaute System, eine ungültige Regeldatei wird gemeldet
+    point_system = dict(DEFAULT_POINTS)
+    if points_path:
+        with open(points_path, 'r', encoding='utf-8') as f: point_system.update(json.load(f))
+    rules = load_rules(rules_path) if rules_path else DEFAULT_RULE_TABLE
+    if rules.warning: print(f"WARNUNG: {rules.warning}", file=sys.stderr)
+    return point_system, rules
+
+def rule_hits(own, war, rules=DEFAULT_RULE_TABLE):
+    # Alle 7 Tage in einem Durchlauf -> Spieler x Tage x Regeln Treffermatrix (unabhängig vom Punktesystem)
+    opp, stars, pct = war[..., OPP], war[..., STARS], war[..., PCT]
+    made = ((stars != MISSING) | (pct != MISSING)) & (opp != MISSING)
+    diff = opp.astype(np.int32) - own.astype(np.int32)[:, None]
+    return made, diff, rules.lookup(stars, pct, diff) & made[..., None]
+
+def row_totals(own, opp, stars, pct, point_system, rules=DEFAULT_RULE_TABLE):
+    # Nur Gesamtpunkte je Zeile, direkt auf Spaltenarrays (z.B. memory-mapped): ein Gather ins Punkte-Gitter statt Spieler x Tage x Regeln Treffermatrix
+    made = ((stars != MISSING) | (pct != MISSING)) & (opp != MISSING)
+    diff = opp.astype(np.int32) - own.astype(np.int32)[:, None]
+    points = np.where(made, rules.day_points(rules.point_grid(point_system), stars, pct, diff), 0)
+    attacks = made.sum(axis=1)
+    return points.sum(axis=1) + np.where(attacks >= DAYS, point_system.get("all_attacks", 0), 0), attacks
+
+class WarScore:
+    # Einmal berechnete Treffermatrix; Punkte, Awards und Tagesansichten sind reine Reduktionen darauf
+    def __init__(self, names, made, goliath, hits, point_system, rules=DEFAULT_RULE_TABLE):
+        self.names = np.asarray(names, dtype=object)
+        self.made = made; self.goliath = goliath; self.hits = hits; self.rules = rules
+        self.point_system = dict(point_system)
+        self.weights = rules.points_vector(point_system)
+        self.category_weights = np.zeros((len(rules.category), len(CATEGORIES)), dtype=np.int64)
+        self.category_weights[np.arange(len(rules.category)), rules.category] = self.weights[:-1]
+        self.attacks = made.sum(axis=1)
+        self.breakdown = hits.astype(np.int64) @ self.category_weights
+        self.day_points = self.breakdown.sum(axis=2)
+        self.bonus = np.where(self.attacks >= DAYS, self.weights[-1], 0)
+        self.totals = self.day_points.sum(axis=1) + self.bonus
+        self._summary = None
+
+    def rescore(self, point_system):
+        # Neues Punktesystem ohne erneutes Einlesen der Rohdaten
+        return WarScore(self.names, self.made.copy(), self.goliath.copy(), self.hits.copy(), point_system, self.rules)
+
+    def patch(self, rows, own, war):
+        # Nur die geänderten Spieler neu werten; own/war sind die Tensor-Zeilen dieser Spieler
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.intp))
+        made, diff, hits = rule_hits(own, war, self.rules)
+        self.made[rows] = made; self.goliath[rows] = made & (diff >= 2); self.hits[rows] = hits
+        self.attacks[rows] = made.sum(axis=1)
+        self.breakdown[rows] = hits.astype(np.int64) @ self.category_weights
+        self.day_points[rows] = self.breakdown[rows].sum(axis=2)
+        self.bonus[rows] = np.where(self.attacks[rows] >= DAYS, self.weights[-1], 0)
+        self.totals[rows] = self.day_points[rows].sum(axis=1) + self.bonus[rows]
+        self._summary = None
+
+    def hit_counts(self):
+        # Spieler x Regeln: wie oft jede Regel gefeuert hat; Punkte = hit_counts() @ rules.points_vector(ps)
+        return np.column_stack([self.hits.sum(axis=1), self.attacks >= DAYS]).astype(np.int64)
+
+    def score_many(self, point_systems):
+        # Spieler x K Gesamtpunkte für K Punktesysteme in einer Matrixmultiplikation
+        return self.hit_counts() @ self.rules.points_matrix(point_systems).T
+
+    def standings_many(self, point_systems):
+        # Gesamtpunkte, MVP- und Goliath-Gewinner (Index, -1 = niemand) für K Punktesysteme auf einmal
+        weights = self.rules.points_matrix(point_systems)
+        totals = self.hit_counts() @ weights.T
+        name_rank = np.argsort(np.argsort(self.names.astype(str), kind='stable'), kind='stable')
+        mvp = (totals * len(self.names) - name_rank[:, None]).argmax(axis=0) if len(self.names) else np.full(len(weights), -1)
+        goliath_counts = np.where(self.goliath[..., None], self.hits, False).sum(axis=1)
+        goliath_points = goliath_counts @ weights[:, :-1].T
+        goliath = np.where(goliath_points.sum(axis=0) > 0, goliath_points.argmax(axis=0), -1) if len(self.names) else mvp
+        return totals, mvp, goliath
+
+    def ranking(self):
+        # [(Name, Punkte)] absteigend nach Punkten, bei Gleichstand nach Name; ohne pandas
+        return sorted(zip(self.names.tolist(), self.totals.tolist()), key=lambda row: (-row[1], row[0]))
+
+    def summary(self):
+        if self._summary is None:
+            import pandas as pd
+            self._summary = pd.DataFrame(self.ranking(), columns=["Name", "Punkte"]).astype({"Punkte": np.int64})
+        return self._summary
+
+    def goliath_points(self):
+        return np.where(self.goliath, self.day_points, 0).sum(axis=1)
+
+    def awards(self):
+        if not len(self.names):
+            return {"mvp": {"name": "N/A", "score": ""}, "goliath": {"name": "N/A", "score": ""}}
+        name, points = self.ranking()[0]
+        return {"mvp": {"name": name, "score": f'{points} Punkte'}, "goliath": self.goliath_award()}
+
+    def goliath_award(self):
+        goliath_points = self.goliath_points()
+        if not len(goliath_points): return goliath_result(None, 0, 0)
+        winner = int(goliath_points.argmax()); return goliath_result(self.names[winner], int(goliath_points[winner]), goliath_points.sum())
+
+    def day_table(self):
+        import pandas as pd
+        table = pd.DataFrame(self.day_points, columns=[f"Tag {i}" for i in range(1, DAYS + 1)])
+        table.insert(0, "Name", self.names); table["Bonus"] = self.bonus; table["Punkte"] = self.totals
+        return table.sort_values(by=["Punkte", "Name"], ascending=[False, True]).reset_index(drop=True)
+
+    def category_table(self):
+        import pandas as pd
+        table = pd.DataFrame(self.breakdown.sum(axis=1), columns=list(CATEGORIES))
+        table.insert(0, "Name", self.names); table["Alle 7 Angriffe"] = self.bonus; table["Punkte"] = self.totals
+        return table.sort_values(by=["Punkte", "Name"], ascending=[False, True]).reset_index(drop=True)
+
+# ----------------------------
+# War Files
+# ----------------------------
+WAR_FILE_TYPES = (".csv", ".json", ".xlsx")
+
+def iter_war_files(patterns):
+    # Ordner oder Glob-Muster -> Kriegsdateien, lazy, damit auch riesige Archive nicht vorab gelistet werden
+    for pattern in patterns:
+        if os.path.isdir(pattern): pattern = os.path.join(pattern, "**", "*")
+        yield from (path for path in glob.iglob(pattern, recursive=True) if path.lower().endswith(WAR_FILE_TYPES))
+
+def read_war_file(path):
+    # Kriegsdatei -> DataFrame; ohne Name- und Tag-Spalten wäre die Wertung stillschweigend leer (ValueError mit den fehlenden Spalten)
+    import pandas as pd
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".csv": df = pd.read_csv(path)
+    elif suffix == ".json": df = pd.read_json(path, orient='records')
+    elif suffix == ".xlsx": df = pd.read_excel(path)
+    else: raise ValueError(f"Unbekanntes Dateiformat: {path}")
+    missing = [column for column in ["Name"] + DAY_COLUMNS if column not in df.columns]
+    if missing: raise ValueError(f"{len(missing)} Spalten fehlen ({', '.join(missing[:4])}{', ...' if len(missing) > 4 else ''})")
+    df["Name"] = df["Name"].fillna("").astype(str); return df
+
+@timed("wertung/score_war")
+def score_war(df, point_system, rules=DEFAULT_RULE_TABLE):
+    own, war = war_tensor(df)
+    made, diff, hits = rule_hits(own, war, rules)
+    names = df.names if isinstance(df, WarData) else df.reindex(columns=["Name"])["Name"].to_numpy()
+    return WarScore(names, made, made & (diff >= 2), hits, point_system, rules)
+
+# ----------------------------
+# Result Cache
+# ----------------------------
+def war_fingerprint(data, point_system, rules=DEFAULT_RULE_TABLE):
+    # Günstiger Inhalts-Hash über Kriegsdaten, Punktesystem und Regeltabelle
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(data, WarData):
+        h.update("\x1f".join(map(str, data.names)).encode())
+        for array in (data.own_th, data.opp_th, data.stars, data.pct, data.present): h.update(np.ascontiguousarray(array).tobytes())
+    else:
+        h.update(pickle.dumps((list(data.columns), data.to_numpy(dtype=object).tolist())))
+    h.update(json.dumps(point_system, sort_keys=True).encode()); h.update(rules.fingerprint.encode())
+    return h.hexdigest()
+
+class ScoreCache:
+    # Prozessweiter LRU-Cache für WarScore-Ergebnisse (von allen Sitzungen geteilt). Gecachte Ergebnisse nicht patchen.
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize; self.hits = 0; self.misses = 0
+        self._entries = OrderedDict(); self._lock = threading.Lock()
+
+    def score(self, data, point_system, rules=DEFAULT_RULE_TABLE):
+        key = war_fingerprint(data, point_system, rules)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1; self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+        result = score_war(data, point_system, rules)
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.maxsize: self._entries.popitem(last=False)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "maxsize": self.maxsize}
+
+    def clear(self):
+        with self._lock: self._entries.clear(); self.hits = 0; self.misses = 0
+
+SCORE_CACHE = ScoreCache()
+
+@timed("wertung/cached_score_war")
+def cached_score_war(data, point_system, rules=DEFAULT_RULE_TABLE):
+    return SCORE_CACHE.score(data, point_system, rules)
+
+def calculate_all_points(df, point_system, rules=DEFAULT_RULE_TABLE):
+    if not len(df):
+        import pandas as pd
+        return pd.DataFrame(columns=["Name", "Punkte"])
+    return score_war(df, point_system, rules).summary()
+
+def calculate_awards(df, summary_df, point_system, rules=DEFAULT_RULE_TABLE):
+    if summary_df.empty:
+        return {"mvp": {"name": "N/A", "score": ""}, "goliath": {"name": "N/A", "score": ""}}
+    mvp = {"name": summary_df.iloc[0]["Name"], "score": f'{summary_df.iloc[0]["Punkte"]} Punkte'}
+    return {"mvp": mvp, "goliath": score_war(df, point_system, rules).goliath_award()}
@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from cwl_engine import DEFAULT_RULE_TABLE, add_scoring_arguments, iter_war_files, load_scoring, read_war_file, score_war
+
+# ----------------------------
+# Punktesystem-Explorer: Was-wäre-wenn über archivierte Kriege
+# ----------------------------
+# Beispiel:
+#   python cwl_explorer.py "archiv/**/*.csv" --vary atk_3s_gt_2=4:8 --vary mut_extra=0:3 --samples 500 --jobs 4
+
+def kendall_tau(base, candidates):
+    # Kendall tau-b zwischen einer Basis-Wertung (P,) und K Kandidaten-Wertungen (P x K)
+    i, j = np.triu_indices(len(base), k=1)
+    base_sign = np.sign(base[i] - base[j])
+    cand_sign = np.sign(candidates[i] - candidates[j])
+    denom = np.sqrt(np.count_nonzero(base_sign) * np.count_nonzero(cand_sign, axis=0).astype(float))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denom > 0, (base_sign @ cand_sign) / denom, np.nan)
+
+def evaluate_war(path, point_systems, rules=DEFAULT_RULE_TABLE):
+    # Ein Krieg, alle K Kandidaten: die Treffermatrix wird nur einmal aufgebaut
+    war_score = score_war(read_war_file(path), point_systems[0], rules)
+    totals, mvp, goliath = war_score.standings_many(point_systems)
+    return kendall_tau(totals[:, 0], totals[:, 1:]), mvp[1:] != mvp[0], goliath[1:] != goliath[0]
+
+def try_evaluate_war(path, point_systems, rules=DEFAULT_RULE_TABLE):
+    # Fehlerhafte Dateien werden übersprungen statt den ganzen Durchlauf abzubrechen -> (path, ergebnis, fehler)
+    try: return path, evaluate_war(path, point_systems, rules), None
+    except (OSError, ValueError, KeyError) as e: return path, None, str(e)
+
+def build_candidates(base, ranges, samples, seed=0):
+    keys = list(ranges); shape = [len(ranges[key]) for key in keys]
+    indices = np.arange(int(np.prod(shape)))
+    if samples and samples < len(indices): indices = np.sort(np.random.default_rng(seed).choice(indices, size=samples, replace=False))
+    positions = np.unravel_index(indices, shape) if keys else []
+    return [{**base, **{key: ranges[key][pos[n]] for key, pos in zip(keys, positions)}} for n in range(len(indices))]
+
+def parse_range(text):
+    key, _, span = text.partition("=")
+    lo, hi, step = (list(map(int, span.split(":"))) + [1])[:3]
+    return key, list(range(lo, hi + 1, step))
+
+def explore(paths, base, candidates, jobs=None, rules=DEFAULT_RULE_TABLE):
+    # -> (Bericht je Kandidat, [(path, fehler)] der übersprungenen Dateien)
+    taus, mvp_changes, goliath_changes, failed = [], np.zeros(len(candidates), int), np.zeros(len(candidates), int), []
+    worker = partial(try_evaluate_war, point_systems=[base] + candidates, rules=rules)
+    if jobs == 1: results = list(map(worker, paths))
+    else:
+        chunksize = max(1, len(paths) // (4 * (jobs or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(max_workers=jobs) as executor: results = list(executor.map(worker, paths, chunksize=chunksize))
+    for path, evaluated, error in results:
+        if error is not None: failed.append((path, error)); continue
+        tau, mvp_changed, goliath_changed = evaluated; taus.append(tau); mvp_changes += mvp_changed; goliath_changes += goliath_changed
+    taus = np.array(taus).reshape(len(taus), len(candidates))
+    report = []
+    for k, candidate in enumerate(candidates):
+        column = taus[:, k]; valid = column[~np.isnan(column)]
+        report.append({
+            "changes": {key: value for key, value in candidate.items() if base.get(key) != value},
+            "kendall_tau_mean": float(valid.mean()) if len(valid) else None,
+            "kendall_tau_min": float(valid.min()) if len(valid) else None,
+            "mvp_changes": int(mvp_changes[k]), "goliath_changes": int(goliath_changes[k]), "wars": len(taus),
+        })
+    return report, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Was-wäre-wenn Analyse des Punktesystems über archivierte CWL-Kriege.")
+    parser.add_argument("archive", nargs="+", help="Ordner oder Glob-Muster mit Kriegsdateien (CSV/JSON/XLSX)")
+    add_scoring_arguments(parser)
+    parser.add_argument("--vary", action="append", type=parse_range, default=[], metavar="REGEL=MIN:MAX[:SCHRITT]")
+    parser.add_argument("--samples", type=int, default=0, help="Zufällige Stichprobe aus dem Raster statt kompletter Suche")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--objective", choices=["stabil", "wechsel"], default="stabil", help="Sortierung: stabilste oder stärkste Veränderung zuerst")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", help="Vollständigen Bericht als JSON speichern")
+    args = parser.parse_args(argv)
+
+    base, rules = load_scoring(args.points, args.rules)
+    unknown = [key for key, _ in args.vary if key not in rules.keys]
+    if unknown: parser.error(f"Unbekannte Regel: {', '.join(unknown)}")
+    paths = sorted(dict.fromkeys(iter_war_files(args.archive)))
+    if not paths: parser.error("Keine Kriegsdateien gefunden.")
+    candidates = build_candidates(base, dict(args.vary), args.samples, args.seed)
+    report, failed = explore(paths, base, candidates, args.jobs, rules)
+    for path, error in failed: print(f"Fehler in {path}: {error}", file=sys.stderr)
+    # Kandidaten ohne definierte Rangkorrelation (n/a) stehen in beiden Richtungen am Ende
+    sign = -1 if args.objective == "stabil" else 1
+    report.sort(key=lambda r: (r["kendall_tau_mean"] is None, 0 if r["kendall_tau_mean"] is None else sign * r["kendall_tau_mean"]))
+
+    print(f"{len(paths) - len(failed)} Kriege, {len(failed)} fehlerhaft, {len(candidates)} Punktesysteme")
+    for row in report[:args.top]:
+        tau = "n/a" if row["kendall_tau_mean"] is None else f'{row["kendall_tau_mean"]:.3f} (min {row["kendall_tau_min"]:.3f})'
+        print(f'tau {tau} | MVP-Wechsel {row["mvp_changes"]}/{row["wars"]} | Goliath-Wechsel {row["goliath_changes"]}/{row["wars"]} | {row["changes"] or "aktuelles System"}')
+    if args.json:
+        with open(args.json, 'w') as f: json.dump({"base": base, "wars": [path for path in paths if path not in dict(failed)], "failed": dict(failed), "candidates": report}, f, indent=4)
+    return 1 if len(failed) == len(paths) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
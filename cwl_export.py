@@ -0,0 +1,66 @@
+import csv
+import io
+import threading
+
+from cwl_engine import CATEGORIES, DAYS, WarData
+from cwl_profile import timed
+
+# ----------------------------
+# Gemeinsamer Export für Kivy-App und Streamlit: Zeile für Zeile, ohne pandas
+# ----------------------------
+@timed("export/export_sheets")
+def export_sheets(war_score, data=None, detailed=True):
+    # [(Blattname, Kopfzeile, Zeilen)] in Ranglisten-Reihenfolge; data (WarData oder to_dict()-Snapshot) liefert das Blatt "Eingaben"
+    names, totals = war_score.names.tolist(), war_score.totals.tolist()
+    order = sorted(range(len(names)), key=lambda i: (-totals[i], names[i]))
+    sheets = [("Wertung", ["Name", "Punkte"], [[names[i], totals[i]] for i in order])]
+    if not detailed: return sheets
+    day_points, bonus, categories = war_score.day_points.tolist(), war_score.bonus.tolist(), war_score.breakdown.sum(axis=1).tolist()
+    sheets.append(("Tage", ["Name"] + [f"Tag {d}" for d in range(1, DAYS + 1)] + ["Bonus", "Punkte"], [[names[i]] + day_points[i] + [bonus[i], totals[i]] for i in order]))
+    sheets.append(("Kategorien", ["Name"] + list(CATEGORIES) + ["Alle 7 Angriffe", "Punkte"], [[names[i]] + categories[i] + [bonus[i], totals[i]] for i in order]))
+    if data is not None:
+        snapshot = data.to_dict() if isinstance(data, WarData) else data
+        columns = [snapshot["columns"][column] for column in WarData.COLUMNS]
+        sheets.append(("Eingaben", ["Name"] + WarData.COLUMNS, [[name] + [column[row] for column in columns] for row, name in enumerate(snapshot["names"])]))
+    awards = war_score.awards()
+    sheets.append(("Awards", ["Award", "Name", "Wert"], [["MVP", awards["mvp"]["name"], awards["mvp"]["score"]], ["David gegen Goliath", awards["goliath"]["name"], awards["goliath"]["score"]]]))
+    return sheets
+
+@timed("export/write_xlsx")
+def write_xlsx(target, sheets, progress=None):
+    # constant_memory: jede Zeile wird sofort auf die Platte geschrieben, Speicherbedarf unabhängig von der Größe
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(target, {'constant_memory': True})
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+    for n, (title, header, rows) in enumerate(sheets, start=1):
+        sheet = workbook.add_worksheet(title); sheet.write_row(0, 0, header, header_format); sheet.set_column(0, 0, 20)
+        for row, values in enumerate(rows, start=1): sheet.write_row(row, 0, values)
+        if progress: progress(n, len(sheets), title)
+    workbook.close()
+
+@timed("export/write_csv")
+def write_csv(target, sheets, progress=None):
+    # CSV kennt nur ein Blatt: die Gesamtwertung
+    title, header, rows = sheets[0]
+    writer = csv.writer(target, lineterminator='\n'); writer.writerow(header); writer.writerows(rows)
+    if progress: progress(1, 1, title)
+
+def export_bytes(sheets, file_format="xlsx"):
+    # Für Download-Buttons: fertige Datei als Bytes
+    if file_format == "csv":
+        text = io.StringIO(); write_csv(text, sheets); return text.getvalue().encode('utf-8')
+    output = io.BytesIO(); write_xlsx(output, sheets); return output.getvalue()
+
+def export_in_background(path, sheets, progress=None, done=None):
+    # Schreibt im Arbeits-Thread; progress(n, gesamt, blatt) und done(pfad, fehler) werden dort aufgerufen
+    def run():
+        try:
+            if path.lower().endswith(".csv"):
+                with open(path, 'w', newline='', encoding='utf-8') as f: write_csv(f, sheets, progress)
+            else: write_xlsx(path, sheets, progress)
+        except Exception as e:
+            if done: done(path, e)
+            return
+        if done: done(path, None)
+    thread = threading.Thread(target=run, name="cwl-export", daemon=True); thread.start()
+    return thread
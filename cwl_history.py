@@ -0,0 +1,137 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from cwl_engine import DAYS, MISSING, OPP, PCT, STARS, add_scoring_arguments, iter_war_files, load_scoring, read_war_file, score_war, war_tensor
+
+# ----------------------------
+# Kriegs-Archiv (SQLite): jeder gewertete Krieg mit einer Zeile pro Angriff
+# ----------------------------
+# Beispiel:
+#   python cwl_history.py kriege.sqlite import "archiv/2026-09/*.csv" --season 2026-09
+#   python cwl_history.py kriege.sqlite spieler "Spieler 7" --seasons 12
+#   python cwl_history.py kriege.sqlite rathaus --season 2026-01
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS wars (id INTEGER PRIMARY KEY, season TEXT NOT NULL, label TEXT, created TEXT NOT NULL, point_system TEXT NOT NULL, fingerprint TEXT);
+CREATE TABLE IF NOT EXISTS war_players (
+    war_id INTEGER NOT NULL REFERENCES wars(id) ON DELETE CASCADE, player_id INTEGER NOT NULL REFERENCES players(id),
+    season TEXT NOT NULL, points INTEGER NOT NULL, attacks INTEGER NOT NULL, PRIMARY KEY (war_id, player_id));
+CREATE TABLE IF NOT EXISTS attacks (
+    war_id INTEGER NOT NULL REFERENCES wars(id) ON DELETE CASCADE, player_id INTEGER NOT NULL REFERENCES players(id),
+    season TEXT NOT NULL, day INTEGER NOT NULL, own_th INTEGER, opp_th INTEGER, diff INTEGER, stars INTEGER, pct INTEGER, points INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_wars_season ON wars(season);
+CREATE INDEX IF NOT EXISTS idx_war_players_player ON war_players(player_id, season);
+CREATE INDEX IF NOT EXISTS idx_attacks_player ON attacks(player_id, season, day);
+CREATE INDEX IF NOT EXISTS idx_attacks_season ON attacks(season, day);
+CREATE INDEX IF NOT EXISTS idx_attacks_diff ON attacks(season, diff, stars);
+"""
+
+def current_season(): return datetime.now().strftime("%Y-%m")
+
+class WarHistory:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL"); self.conn.execute("PRAGMA synchronous=NORMAL"); self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        # Ältere Archive ohne Inhalts-Fingerabdruck nachrüsten
+        if "fingerprint" not in {row[1] for row in self.conn.execute("PRAGMA table_info(wars)")}: self.conn.execute("ALTER TABLE wars ADD COLUMN fingerprint TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_wars_fingerprint ON wars(fingerprint)")
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+    def close(self): self.conn.close()
+
+    def player_ids(self, names):
+        self.conn.executemany("INSERT OR IGNORE INTO players(name) VALUES (?)", ((name,) for name in names))
+        ids = {}
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            ids.update(self.conn.execute(f"SELECT name, id FROM players WHERE name IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+        return [ids[name] for name in names]
+
+    def archive(self, data, war_score, season=None, label=None):
+        # data: WarData oder DataFrame des Kriegs, war_score: das zugehörige WarScore-Ergebnis
+        # -> neue war_id, oder None, wenn der Krieg keine Angriffe hat oder schon im Archiv liegt
+        season = season or current_season(); names = [str(name) for name in war_score.names]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates: raise ValueError(f"Doppelte Spielernamen: {', '.join(duplicates[:5])}")
+        if not war_score.made.any(): return None
+        own, war = war_tensor(data)
+        fingerprint = hashlib.blake2b("\x1f".join(names).encode() + own.tobytes() + war.tobytes(), digest_size=16).hexdigest()
+        with self.conn:
+            if self.conn.execute("SELECT 1 FROM wars WHERE fingerprint = ?", (fingerprint,)).fetchone(): return None
+            war_id = self.conn.execute("INSERT INTO wars(season, label, created, point_system, fingerprint) VALUES (?, ?, ?, ?, ?)",
+                                       (season, label, datetime.now().isoformat(timespec='seconds'), json.dumps(war_score.point_system, sort_keys=True), fingerprint)).lastrowid
+            ids = np.array(self.player_ids(names), dtype=np.int64)
+            self.conn.executemany("INSERT INTO war_players VALUES (?, ?, ?, ?, ?)",
+                                  zip([war_id] * len(ids), ids.tolist(), [season] * len(ids), war_score.totals.tolist(), war_score.attacks.tolist()))
+            rows, days = np.nonzero(war_score.made)
+            cells = war[rows, days]; own_th = own[rows].astype(np.int64)
+            nullable = lambda values: [None if v == MISSING else v for v in values.tolist()]
+            self.conn.executemany("INSERT INTO attacks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", zip(
+                [war_id] * len(rows), ids[rows].tolist(), [season] * len(rows), (days + 1).tolist(), own_th.tolist(), cells[:, OPP].tolist(),
+                (cells[:, OPP] - own_th).tolist(), nullable(cells[:, STARS]), nullable(cells[:, PCT]), war_score.day_points[rows, days].tolist()))
+        return war_id
+
+    def seasons(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT season FROM wars ORDER BY season")]
+
+    def player_history(self, name, seasons=12):
+        # Punkte eines Spielers je Saison, neueste zuerst
+        return self.conn.execute("""
+            SELECT wp.season, SUM(wp.points), COUNT(*), SUM(wp.attacks) FROM war_players wp
+            WHERE wp.player_id = (SELECT id FROM players WHERE name = ?)
+            GROUP BY wp.season ORDER BY wp.season DESC LIMIT ?""", (name, seasons)).fetchall()
+
+    def three_star_rate(self, since=None):
+        # Clanweite 3-Sterne-Quote je Rathaus-Differenz (Gegner - eigenes RH)
+        rows = self.conn.execute("""
+            SELECT diff, COUNT(*), SUM(stars = 3) FROM attacks WHERE season >= ? AND diff IS NOT NULL
+            GROUP BY diff ORDER BY diff""", (since or "",)).fetchall()
+        return [(diff, attacks, three, three / attacks) for diff, attacks, three in rows]
+
+    def day_averages(self, season):
+        return self.conn.execute("SELECT day, COUNT(*), AVG(stars), AVG(pct), AVG(points) FROM attacks WHERE season = ? GROUP BY day ORDER BY day", (season,)).fetchall()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archiv gewerteter CWL-Kriege mit Spieler- und Clan-Statistiken.")
+    parser.add_argument("database", help="SQLite-Datei (wird bei Bedarf angelegt)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="Kriegsdateien werten und archivieren")
+    importer.add_argument("inputs", nargs="+", help="Ordner oder Glob-Muster mit Kriegsdateien (CSV/JSON/XLSX)")
+    importer.add_argument("--season", default=None, help="Saison im Format JJJJ-MM (Standard: aktueller Monat)")
+    add_scoring_arguments(importer)
+    player = commands.add_parser("spieler", help="Punkte eines Spielers je Saison")
+    player.add_argument("name"); player.add_argument("--seasons", type=int, default=12)
+    th = commands.add_parser("rathaus", help="3-Sterne-Quote je Rathaus-Differenz")
+    th.add_argument("--season", default=None, help="Nur ab dieser Saison (JJJJ-MM)")
+    args = parser.parse_args(argv)
+
+    with WarHistory(args.database) as history:
+        if args.command == "import":
+            point_system, rules = load_scoring(args.points, args.rules)
+            archived = skipped = failed = 0
+            for path in iter_war_files(args.inputs):
+                # Fehler je Datei melden und weitermachen; eine kaputte Datei bricht den Import nicht ab
+                try: data = read_war_file(path); war_id = history.archive(data, score_war(data, point_system, rules), args.season, label=path)
+                except (OSError, ValueError, KeyError, sqlite3.Error) as e: print(f"Fehler in {path}: {e}", file=sys.stderr); failed += 1; continue
+                if war_id is None: print(f"Übersprungen (leer oder schon archiviert): {path}", file=sys.stderr); skipped += 1
+                else: archived += 1
+            print(f"{archived} Kriege archiviert, {skipped} übersprungen, {failed} fehlerhaft -> {args.database}")
+        elif args.command == "spieler":
+            rows = history.player_history(args.name, args.seasons)
+            if not rows: print(f"Keine Daten für {args.name}"); return 1
+            for season, points, wars, attacks in rows: print(f"{season}: {points} Punkte in {wars} Kriegen ({attacks}/{wars * DAYS} Angriffe)")
+        else:
+            for diff, attacks, three, rate in history.three_star_rate(args.season): print(f"RH {diff:+d}: {rate:6.1%} 3 Sterne ({three}/{attacks})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
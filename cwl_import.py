@@ -0,0 +1,118 @@
+import csv
+import json
+import re
+
+import numpy as np
+
+from cwl_engine import DAYS, WarData, check_grid
+
+# ----------------------------
+# Massen-Import: eingefügte Tabelle, CSV oder JSON-Kriegslog -> Zellen für WarData
+# ----------------------------
+COLUMN_INDEX = {column: c for c, column in enumerate(WarData.COLUMNS)}
+
+def header_key(text): return re.sub(r"[\s_\-.:]+", "", str(text)).casefold()
+def name_key(name): return " ".join(str(name).split()).casefold()
+
+# Spaltennamen aus beiden Apps (Kivy-Tabellenköpfe, Streamlit-Editor) und die internen Namen
+HEADER_ALIASES = {header_key(column): column for column in WarData.COLUMNS}
+HEADER_ALIASES.update({key: "Name" for key in ("name", "spieler", "mitglied")})
+HEADER_ALIASES.update({key: "Eigenes_Rathaus" for key in ("eigenesrh", "rh", "rathaus", "th", "eigenesrathaus")})
+for day in range(1, DAYS + 1):
+    HEADER_ALIASES.update({header_key(alias): f"Tag{day}_Rathaus_Gegner" for alias in (f"Gegner T{day}", f"Tag {day} ERL", f"T{day} RH")})
+    HEADER_ALIASES.update({header_key(alias): f"Tag{day}_Sterne" for alias in (f"T{day} Sterne", f"Tag {day} ⭐", f"T{day} ⭐")})
+    HEADER_ALIASES.update({header_key(alias): f"Tag{day}_Prozent" for alias in (f"T{day} %", f"Tag {day} %", f"T{day} Prozent")})
+
+def objects(parent, key, kind, day):
+    # Feld eines Kriegslog-Eintrags mit erwartetem Typ; Listen dürfen nur Objekte enthalten. Falsche Form -> ValueError statt Absturz
+    value = parent.get(key, kind())
+    if not isinstance(value, kind) or (kind is list and not all(isinstance(item, dict) for item in value)):
+        raise ValueError(f"Tag {day}: '{key}' hat nicht die erwartete Form ({'Liste von Objekten' if kind is list else 'Objekt'}).")
+    return value
+
+def number(value, day):
+    if value is None: return np.nan
+    if isinstance(value, bool) or not isinstance(value, (int, float)): raise ValueError(f"Tag {day}: '{value}' ist keine Zahl.")
+    return value
+
+class WarImport:
+    # Spielernamen + Spieler x WarData.COLUMNS Matrix (NaN = leer); issues: (Name, Spalte, Meldung, Fehler?)
+    def __init__(self, names, values, issues=None):
+        self.names = [str(name) for name in names]
+        self.values = np.asarray(values, dtype=float).reshape(len(self.names), len(WarData.COLUMNS))
+        self.issues = list(issues or [])
+
+    @classmethod
+    def parse(cls, text, clan_tag=None):
+        stripped = text.lstrip("\ufeff \r\n\t")
+        if stripped.startswith(("{", "[")): return cls.from_war_log(json.loads(stripped), clan_tag)
+        return cls.from_table(stripped)
+
+    @classmethod
+    def read(cls, path, clan_tag=None):
+        with open(path, 'r', encoding='utf-8-sig') as f: return cls.parse(f.read(), clan_tag)
+
+    @classmethod
+    def from_table(cls, text):
+        # Tabelle mit Kopfzeile; Trenner Tab (aus Tabellenkalkulationen kopiert), Semikolon oder Komma
+        lines = [line for line in text.splitlines() if line.strip()]
+        if not lines: raise ValueError("Keine Daten gefunden.")
+        delimiter = max(("\t", ";", ","), key=lines[0].count)
+        # Kurze Zeilen (fehlende Zellen am Ende) auf die Breite der Kopfzeile auffüllen
+        rows = list(csv.reader(lines, delimiter=delimiter)); rows = rows[:1] + [row + [""] * (len(rows[0]) - len(row)) for row in rows[1:]]
+        header = [HEADER_ALIASES.get(header_key(cell)) for cell in rows[0]]
+        if "Name" not in header: raise ValueError("Die Kopfzeile braucht eine Spalte 'Name'.")
+        name_col = header.index("Name"); targets = [(i, COLUMN_INDEX[column]) for i, column in enumerate(header) if column not in (None, "Name")]
+        values = np.full((len(rows) - 1, len(WarData.COLUMNS)), np.nan); issues = []
+        for r, row in enumerate(rows[1:]):
+            for i, c in targets:
+                cell = row[i].strip().rstrip("%").replace(",", ".")
+                if not cell: continue
+                try: values[r, c] = float(cell)
+                except ValueError: issues.append((row[name_col], WarData.COLUMNS[c], f"'{row[i]}' ist keine Zahl", True))
+        return cls([row[name_col].strip() for row in rows[1:]], values, issues)
+
+    @classmethod
+    def from_war_log(cls, payload, clan_tag=None):
+        # Clan-War-League-Export: Liste der 7 Tageskriege (oder {"wars": [...]}) mit clan/opponent -> members -> attacks
+        wars = payload.get("wars", payload.get("rounds", [payload])) if isinstance(payload, dict) else payload
+        if not isinstance(wars, list) or not all(isinstance(war, dict) for war in wars): raise ValueError("Der Kriegslog muss eine Liste von Kriegen (Objekten) sein.")
+        if len(wars) > DAYS: raise ValueError(f"Mehr als {DAYS} Kriegstage im Export.")
+        rows, names, values = {}, [], []
+        for day, war in enumerate(wars, start=1):
+            side, other = objects(war, "clan", dict, day), objects(war, "opponent", dict, day)
+            if clan_tag and other.get("tag") == clan_tag: side, other = other, side
+            th_of = {member.get("tag"): number(member.get("townhallLevel"), day) for member in objects(other, "members", list, day)}
+            for member in objects(side, "members", list, day):
+                key = member.get("tag") or member.get("name")
+                if key not in rows: rows[key] = len(names); names.append(str(member.get("name", key))); values.append([np.nan] * len(WarData.COLUMNS))
+                cells = values[rows[key]]
+                if member.get("townhallLevel") is not None: cells[0] = number(member["townhallLevel"], day)
+                for attack in objects(member, "attacks", list, day)[:1]:
+                    opp_th = th_of.get(attack.get("defenderTag"))
+                    cells[COLUMN_INDEX[f"Tag{day}_Rathaus_Gegner"]] = np.nan if opp_th is None else opp_th
+                    cells[COLUMN_INDEX[f"Tag{day}_Sterne"]] = number(attack.get("stars"), day)
+                    cells[COLUMN_INDEX[f"Tag{day}_Prozent"]] = number(attack.get("destructionPercentage"), day)
+        return cls(names, np.array(values, dtype=float).reshape(len(names), len(WarData.COLUMNS)))
+
+    def validate(self):
+        # Gleiche Prüfung wie in den Eingabetabellen; ungültige Werte werden geleert, Hinweise nur gemeldet
+        check = check_grid(self.values)
+        self.issues += [(self.names[row], column, message, is_error) for row, column, message, is_error in check.issues]
+        self.values[check.errors] = np.nan
+        return self
+
+    def edits(self, roster):
+        # Namen per Hash-Index auf den Kader abbilden -> ({(zeile, spalte): wert}, unbekannte Namen)
+        index = {name_key(name): row for row, name in enumerate(roster)}
+        rows = np.array([index.get(name_key(name), -1) for name in self.names], dtype=np.intp)
+        r, c = np.nonzero(~np.isnan(self.values) & (rows >= 0)[:, None])
+        edits = {(int(rows[i]), WarData.COLUMNS[j]): int(self.values[i, j]) for i, j in zip(r.tolist(), c.tolist())}
+        return edits, [name for name, row in zip(self.names, rows.tolist()) if row < 0 and name]
+
+    def report(self, limit=10):
+        errors = sum(1 for issue in self.issues if issue[3])
+        lines = [f"{errors} Fehler, {len(self.issues) - errors} Hinweise"]
+        lines += [f"{'Fehler' if is_error else 'Hinweis'}: {name} / {column}: {message}" for name, column, message, is_error in self.issues[:limit]]
+        if len(self.issues) > limit: lines.append(f"... und {len(self.issues) - limit} weitere")
+        return "\n".join(lines)
@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import random
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from cwl_engine import DAYS, DEFAULT_RULE_TABLE, add_scoring_arguments, goliath_result, load_scoring
+
+# ----------------------------
+# Live-Wertung: einzelne Angriffe während der CWL, laufende Rangliste ohne Neuberechnung der ganzen Tabelle
+# ----------------------------
+# Ein Event ist eine JSON-Zeile: {"name": "Spieler 7", "day": 3, "opp_th": 15, "stars": 2, "pct": 87, "own_th": 15}
+# (own_th optional, sonst das bekannte Rathaus des Spielers). Ein zweites Event für denselben Spieler und Tag ersetzt das erste.
+# Beispiel:
+#   python cwl_live.py serve live_events.jsonl --port 8765      # nimmt Events per TCP an und hängt sie an die Datei
+#   python cwl_live.py simulate --port 8765 --players 15         # lokaler Stellvertreter: schickt zufällige Angriffe
+#   python cwl_live.py board live_events.jsonl                   # Rangliste aus der Datei
+
+def parse_event(event):
+    # -> (name, tag 0-6, gegner_rh, sterne, prozent, eigenes_rh oder None); ValueError bei unvollständigen Events
+    try:
+        day = int(event["day"]) - 1; own = event.get("own_th")
+        parsed = (str(event["name"]), day, int(event["opp_th"]), int(event["stars"]), int(event["pct"]), None if own is None else int(own))
+    except (KeyError, TypeError, ValueError) as e: raise ValueError(f"Ungültiges Event {event!r}: {e}")
+    if not 0 <= day < DAYS: raise ValueError(f"Ungültiger Kriegstag in {event!r}")
+    return parsed
+
+class LiveStandings:
+    # Hält je Spieler Punkte pro Tag, Summen und Angriffe; jedes Event ändert genau eine Zelle und die beiden Award-Führenden -> O(1)
+    def __init__(self, point_system, rules=DEFAULT_RULE_TABLE, own_th=None):
+        self.rules = rules; self.grid = rules.point_grid(point_system).tolist(); self.bonus = point_system.get("all_attacks", 0)
+        self.names, self.row, self.own_th = [], {}, []
+        self.cells, self.points, self.totals, self.attacks, self.goliath = [], [], [], [], []
+        self.mvp = self.best_goliath = None; self.events = self.goliath_total = 0
+        for name, th in (own_th or {}).items(): self.player(name, th)
+
+    def player(self, name, own_th=None):
+        row = self.row.get(name)
+        if row is None:
+            row = self.row[name] = len(self.names); self.names.append(name); self.own_th.append(own_th)
+            self.cells.append([None] * DAYS); self.points.append([0] * DAYS); self.totals.append(0); self.attacks.append(0); self.goliath.append(0)
+        elif own_th is not None: self.own_th[row] = own_th
+        return row
+
+    def attack_points(self, own_th, opp_th, stars, pct):
+        # Tagespunkte eines Angriffs: ein Zugriff ins vorberechnete Punkte-Gitter (wie RuleTable.day_points, ohne Arrays)
+        (s_lo, s_hi), (p_lo, p_hi), (d_lo, d_hi) = self.rules.STARS_RANGE, self.rules.PCT_RANGE, self.rules.diff_range
+        diff = opp_th - (own_th or 0)
+        return self.grid[min(max(stars, s_lo), s_hi) - s_lo][min(max(pct, p_lo), p_hi) - p_lo][min(max(diff, d_lo), d_hi) - d_lo], diff
+
+    def apply(self, event):
+        name, day, opp_th, stars, pct, own_th = parse_event(event)
+        row = self.row.get(name)
+        if row is not None and own_th is not None and own_th != self.own_th[row]:
+            # Geändertes eigenes Rathaus: die (höchstens 7) bisherigen Angriffe des Spielers neu werten
+            self.own_th[row] = own_th
+            for other, cell in enumerate(self.cells[row]):
+                if cell is not None and other != day: self.set_cell(row, other, *cell[:3])
+        row = self.player(name, own_th); self.set_cell(row, day, opp_th, stars, pct); self.events += 1
+        return row
+
+    def set_cell(self, row, day, opp_th, stars, pct):
+        points, diff = self.attack_points(self.own_th[row], opp_th, stars, pct)
+        old = self.cells[row][day]; old_points = self.points[row][day]; old_goliath = old_points if old is not None and old[3] >= 2 else 0
+        self.cells[row][day] = (opp_th, stars, pct, diff); self.points[row][day] = points
+        if old is None: self.attacks[row] += 1
+        total = points - old_points + (self.bonus if old is None and self.attacks[row] == DAYS else 0); goliath = (points if diff >= 2 else 0) - old_goliath
+        self.totals[row] += total; self.goliath[row] += goliath; self.goliath_total += goliath
+        self.update_leaders(row, total < 0, goliath < 0)
+
+    def update_leaders(self, row, total_dropped, goliath_dropped):
+        # Steigt ein Wert, reicht der Vergleich mit dem Führenden; nur wenn der Führende selbst verliert (Korrektur), wird neu gesucht
+        mvp_key = lambda r: (-self.totals[r], self.names[r])
+        if self.mvp is None or (total_dropped and row == self.mvp): self.mvp = min(range(len(self.names)), key=mvp_key)
+        elif mvp_key(row) < mvp_key(self.mvp): self.mvp = row
+        if goliath_dropped and row == self.best_goliath: self.best_goliath = max(range(len(self.names)), key=lambda r: (self.goliath[r], -r))
+        elif self.best_goliath is None or (self.goliath[row], -row) > (self.goliath[self.best_goliath], -self.best_goliath): self.best_goliath = row
+
+    def ranking(self):
+        # [(Name, Punkte, Angriffe)] wie WarScore.ranking(): absteigend nach Punkten, bei Gleichstand nach Name
+        return sorted(zip(self.names, self.totals, self.attacks), key=lambda row: (-row[1], row[0]))
+
+    def awards(self):
+        # Gleiche Form und Gewinner-Regeln wie WarScore.awards() (Goliath über goliath_result, mit der laufenden Summe aller Spieler)
+        if self.mvp is None: return {"mvp": {"name": "N/A", "score": ""}, "goliath": {"name": "N/A", "score": ""}}
+        best = self.best_goliath
+        return {"mvp": {"name": self.names[self.mvp], "score": f'{self.totals[self.mvp]} Punkte'}, "goliath": goliath_result(self.names[best], self.goliath[best], self.goliath_total)}
+
+    def apply_to(self, data):
+        # Live-Angriffe in eine WarData übernehmen (nur Spieler aus deren Kader) -> Anzahl übernommener Angriffe
+        applied = 0
+        for name, row in self.row.items():
+            target = data.index.get(name)
+            if target is None: continue
+            if self.own_th[row] is not None: data.set(target, "Eigenes_Rathaus", self.own_th[row])
+            for day, cell in enumerate(self.cells[row]):
+                if cell is None: continue
+                for field, value in zip(("Rathaus_Gegner", "Sterne", "Prozent"), cell[:3]): data.set(target, f"Tag{day + 1}_{field}", value)
+                applied += 1
+        return applied
+
+def read_events(path, offset=0):
+    # Neue, vollständige Zeilen ab offset -> (Events, neuer offset, Fehler); halb geschriebene letzte Zeilen bleiben für den nächsten Aufruf
+    if not os.path.exists(path): return [], 0, []
+    with open(path, 'rb') as f:
+        f.seek(offset); chunk = f.read()
+    end = chunk.rfind(b"\n") + 1; events, errors = [], []
+    for line in chunk[:end].splitlines():
+        if not line.strip(): continue
+        try: events.append(json.loads(line))
+        except json.JSONDecodeError as e: errors.append(f"Zeile übersprungen: {e}")
+    return events, offset + end, errors
+
+class LiveFeed:
+    # Verfolgt eine Event-Datei (tail -f): jeder Aufruf von poll() wertet nur die seitdem angehängten Events
+    def __init__(self, path, standings):
+        self.path, self.standings, self.offset, self.errors = path, standings, 0, []
+
+    def poll(self):
+        events, self.offset, errors = read_events(self.path, self.offset)
+        for event in events:
+            try: self.standings.apply(event)
+            except ValueError as e: errors.append(str(e))
+        self.errors = (self.errors + errors)[-20:]
+        return len(events)
+
+class EventHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # Eine JSON-Zeile pro Event; geprüft, angehängt und per fsync gesichert, Antwort "ok" oder Fehlermeldung
+        for line in self.rfile:
+            if not line.strip(): continue
+            try: parse_event(json.loads(line))
+            except ValueError as e: self.wfile.write(f"fehler: {e}\n".encode()); continue
+            with self.server.lock:
+                self.server.log.write(line.rstrip(b"\r\n") + b"\n"); self.server.log.flush(); os.fsync(self.server.log.fileno())
+            self.wfile.write(b"ok\n")
+
+class EventServer(socketserver.ThreadingTCPServer):
+    # Lokaler Empfänger: schreibt alle Events in die JSONL-Datei, die Streamlit und "board" verfolgen
+    daemon_threads = True; allow_reuse_address = True
+    def __init__(self, path, host="127.0.0.1", port=8765):
+        super().__init__((host, port), EventHandler); self.lock = threading.Lock(); self.log = open(path, 'ab')
+    def server_close(self): super().server_close(); self.log.close()
+
+def simulate(host, port, players=15, delay=0.5, seed=None):
+    # Stellvertreter für einen echten Kriegs-Feed: jeder Spieler greift an jedem Tag einmal an, in zufälliger Reihenfolge
+    rng = random.Random(seed); own = {f"Spieler {i}": rng.randint(11, 16) for i in range(1, players + 1)}
+    with socket.create_connection((host, port)) as conn, conn.makefile('rwb') as stream:
+        for day in range(1, DAYS + 1):
+            for name in rng.sample(sorted(own), len(own)):
+                stars = rng.choice((0, 1, 2, 2, 3, 3, 3)); pct = 100 if stars == 3 else rng.randint(20 * stars, 99)
+                event = {"name": name, "day": day, "opp_th": max(1, own[name] + rng.randint(-2, 3)), "stars": stars, "pct": pct, "own_th": own[name]}
+                stream.write((json.dumps(event) + "\n").encode()); stream.flush(); print(f"{event} -> {stream.readline().decode().strip()}")
+                time.sleep(delay)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live-Wertung aus einzelnen Angriffs-Events (JSONL-Datei oder lokaler TCP-Port).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Events per TCP annehmen und an die Datei anhängen")
+    serve.add_argument("events"); serve.add_argument("--host", default="127.0.0.1"); serve.add_argument("--port", type=int, default=8765)
+    sim = commands.add_parser("simulate", help="Zufällige Angriffe an einen laufenden Empfänger schicken")
+    sim.add_argument("--host", default="127.0.0.1"); sim.add_argument("--port", type=int, default=8765)
+    sim.add_argument("--players", type=int, default=15); sim.add_argument("--delay", type=float, default=0.5); sim.add_argument("--seed", type=int)
+    board = commands.add_parser("board", help="Rangliste aus einer Event-Datei")
+    board.add_argument("events"); add_scoring_arguments(board)
+    board.add_argument("--follow", action="store_true", help="Datei weiter verfolgen und bei neuen Events neu ausgeben")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        with EventServer(args.events, args.host, args.port) as server:
+            print(f"Empfange Events auf {args.host}:{args.port} -> {args.events}")
+            try: server.serve_forever()
+            except KeyboardInterrupt: pass
+        return 0
+    if args.command == "simulate":
+        simulate(args.host, args.port, args.players, args.delay, args.seed); return 0
+    feed = LiveFeed(args.events, LiveStandings(*load_scoring(args.points, args.rules)))
+    while True:
+        if feed.poll() or not args.follow:
+            standings = feed.standings; awards = standings.awards()
+            for error in feed.errors: print(error, file=sys.stderr)
+            feed.errors = []
+            print(f"{standings.events} Angriffe | MVP: {awards['mvp']['name']} ({awards['mvp']['score']}) | David gegen Goliath: {awards['goliath']['name']}")
+            for rank, (name, points, attacks) in enumerate(standings.ranking(), start=1): print(f"{rank:3d}. {name}: {points} Punkte ({attacks}/{DAYS} Angriffe)")
+        if not args.follow: return 0
+        time.sleep(1)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import json
+import os
+import queue
+import tempfile
+import threading
+from collections import deque
+
+from cwl_engine import WarData
+
+# ----------------------------
+# Crash-Safe Persistence
+# ----------------------------
+def atomic_write(path, data):
+    # Temporäre Datei im Zielordner + fsync + os.replace: die Zieldatei ist immer entweder alt oder neu, nie halb geschrieben
+    directory = os.path.dirname(path) or "."; os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f: f.write(data.encode() if isinstance(data, str) else data); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.unlink(tmp_path)
+        raise
+
+def atomic_write_json(path, payload): atomic_write(path, json.dumps(payload, indent=4))
+
+class WarLog:
+    # Write-Ahead-Log für den laufenden Krieg: Snapshot (JSON) + Append-only Journal (JSONL, eine Zeile je Übernahme).
+    # Geschrieben wird ausschließlich vom Hintergrund-Thread; die Reihenfolge der Warteschlange hält Snapshot und Journal konsistent.
+    # Jeder Snapshot beginnt eine neue Generation, jede Journal-Zeile trägt ihre: stirbt die App zwischen Snapshot und Leeren des
+    # Journals, werden die alten Zeilen beim Wiederherstellen übersprungen statt über den neuen Stand gespielt.
+    def __init__(self, directory, compact_every=500):
+        self.snapshot_path = os.path.join(directory, "war_snapshot.json"); self.journal_path = os.path.join(directory, "war_journal.jsonl")
+        self.compact_every = compact_every; self.logged = 0; self.error = None; self.generation = None
+        self._queue = queue.Queue(); self._thread = None
+
+    def restore(self):
+        # Snapshot laden und Journal darüber abspielen; eine abgerissene letzte Zeile wird ignoriert
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f: payload = json.load(f)
+            data = WarData.from_dict(payload); self.generation = payload.get("generation")
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, AttributeError): data = None
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f: lines = f.readlines()
+        except FileNotFoundError: lines = []
+        for line in lines:
+            try: entry = json.loads(line)
+            except json.JSONDecodeError: break
+            # Ältere Journale ohne Generation bestehen nur aus der Zellenliste
+            generation, cells = (entry.get("generation"), entry.get("cells", [])) if isinstance(entry, dict) else (None, entry)
+            if data is None or generation != self.generation: continue
+            for name, column, value in cells:
+                row = data.index.get(name)
+                if row is not None and column in WarData.COLUMNS: data.set(row, column, value)
+            self.logged += len(cells)
+        return data
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        if self._thread is None: self._thread = threading.Thread(target=self._run, name="cwl-war-log", daemon=True); self._thread.start()
+
+    def append(self, data, cells):
+        # cells: [(zeile, spalte, neuer wert)]; Spielernamen statt Zeilennummern, damit das Journal Kaderänderungen übersteht
+        if not cells: return
+        self._queue.put(("append", json.dumps({"generation": self.generation, "cells": [[data.names[row], column, value] for row, column, value in cells]}) + "\n"))
+        self.logged += len(cells)
+        if self.logged >= self.compact_every: self.snapshot(data)
+
+    def snapshot(self, data):
+        self.generation = os.urandom(8).hex(); self._queue.put(("snapshot", dict(data.to_dict(), generation=self.generation))); self.logged = 0
+
+    def flush(self): self._queue.join()
+
+    def close(self):
+        if self._thread is not None: self._queue.put(None); self._thread.join(); self._thread = None
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while not self._queue.empty(): batch.append(self._queue.get_nowait())
+            # Jeder Fehler landet in self.error (main.py meldet ihn); der Thread muss weiterlaufen, sonst hängt flush()
+            try: running = self._write(batch)
+            except Exception as e: self.error = e; running = None not in batch
+            finally:
+                for _ in batch: self._queue.task_done()
+
+    def _write(self, batch):
+        # Einträge in Reihenfolge abarbeiten; aufeinanderfolgende Journal-Zeilen teilen sich ein fsync (Group Commit)
+        lines = []
+        for entry in batch:
+            if entry is not None and entry[0] == "append": lines.append(entry[1]); continue
+            if lines: self._append(lines); lines = []
+            if entry is None: return False
+            atomic_write_json(self.snapshot_path, entry[1]); atomic_write(self.journal_path, "")
+        if lines: self._append(lines)
+        return True
+
+    def _append(self, lines):
+        with open(self.journal_path, 'a', encoding='utf-8') as f: f.writelines(lines); f.flush(); os.fsync(f.fileno())
+
+# ----------------------------
+# Änderungsprotokoll (Rückgängig/Wiederholen)
+# ----------------------------
+class EditJournal:
+    # Änderungsprotokoll über WarData: ein Schritt = [(zeile, spalte, alt, neu)] nur der wirklich geänderten Zellen
+    def __init__(self, limit=200):
+        self.done = deque(maxlen=limit); self.undone = []
+
+    def commit(self, data, edits):
+        # edits: {(zeile, spalte): wert oder None}; Kosten O(geänderte Zellen). Passt ein Wert nicht (ValueError), bleibt data unverändert
+        changes = []
+        try:
+            for (row, column), value in edits.items():
+                old = data.get(row, column); data.set(row, column, value); new = data.get(row, column)
+                if new != old: changes.append((row, column, old, new))
+        except ValueError:
+            for row, column, old, _ in reversed(changes): data.set(row, column, old)
+            raise
+        if changes: self.done.append(changes); self.undone.clear()
+        return changes
+
+    def undo(self, data):
+        if not self.done: return []
+        changes = self.done.pop()
+        for row, column, old, _ in reversed(changes): data.set(row, column, old)
+        self.undone.append(changes)
+        return changes
+
+    def redo(self, data):
+        if not self.undone: return []
+        changes = self.undone.pop()
+        for row, column, _, new in changes: data.set(row, column, new)
+        self.done.append(changes)
+        return changes
+
+    def clear(self): self.done.clear(); self.undone.clear()
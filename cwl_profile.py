@@ -0,0 +1,134 @@
+import atexit
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+# ----------------------------
+# Mess-Instrumente für die heißen Pfade beider Apps (standardmäßig aus)
+# ----------------------------
+# CWL_PROFILE=1 schaltet die Messung beim Start ein, CWL_PROFILE=mem misst zusätzlich Speicher (tracemalloc),
+# CWL_PROFILE_FILE=pfad schreibt beim Beenden einen JSON-Bericht. Ausgeschaltet kostet ein Messpunkt nur eine Attributabfrage.
+TRACE_LIMIT = 200
+
+class Profiler:
+    def __init__(self, trace_limit=TRACE_LIMIT):
+        self.lock = threading.Lock(); self.trace_limit = trace_limit; self.enabled = False; self.memory = False; self.own_tracing = False
+        self.reset()
+
+    def reset(self):
+        with self.lock: self.stats = {}; self.traces = deque(maxlen=self.trace_limit); self.started = time.time()
+
+    def set_enabled(self, on): self.enabled = bool(on)
+
+    def set_memory(self, on):
+        # tracemalloc verlangsamt jede Allokation deutlich: nur auf ausdrücklichen Wunsch
+        if on and not tracemalloc.is_tracing(): tracemalloc.start(); self.own_tracing = True
+        if not on and self.own_tracing: tracemalloc.stop(); self.own_tracing = False
+        self.memory = bool(on) and tracemalloc.is_tracing()
+
+    def traced_memory(self): return tracemalloc.get_traced_memory()[0] if self.memory else None
+
+    def record(self, name, seconds, alloc=None):
+        # Zähler, Summe, Min/Max, Log2-Histogramm (Mikrosekunden) und die letzten Einzelmessungen
+        with self.lock:
+            entry = self.stats.get(name)
+            if entry is None: entry = self.stats[name] = {"count": 0, "total": 0.0, "min": seconds, "max": seconds, "hist": {}, "alloc": 0}
+            entry["count"] += 1; entry["total"] += seconds; entry["min"] = min(entry["min"], seconds); entry["max"] = max(entry["max"], seconds)
+            bucket = int(seconds * 1e6).bit_length(); entry["hist"][bucket] = entry["hist"].get(bucket, 0) + 1
+            if alloc is not None: entry["alloc"] += alloc
+            self.traces.append((time.time(), name, seconds, alloc, threading.current_thread().name))
+
+    @staticmethod
+    def percentile(entry, q):
+        # Obergrenze des Histogramm-Fachs, in dem das Quantil liegt (höchstens der gemessene Maximalwert)
+        needed, seen = q * entry["count"], 0
+        for bucket in sorted(entry["hist"]):
+            seen += entry["hist"][bucket]
+            if seen >= needed: return min((1 << bucket) / 1e6, entry["max"])
+        return entry["max"]
+
+    def rows(self):
+        # [{name, count, total_ms, mean_ms, p50_ms, p95_ms, max_ms, alloc_kb}] nach Gesamtzeit absteigend
+        with self.lock: stats = {name: dict(entry, hist=dict(entry["hist"])) for name, entry in self.stats.items()}
+        rows = [{"name": name, "count": entry["count"], "total_ms": entry["total"] * 1000, "mean_ms": entry["total"] / entry["count"] * 1000,
+                 "p50_ms": self.percentile(entry, 0.5) * 1000, "p95_ms": self.percentile(entry, 0.95) * 1000, "min_ms": entry["min"] * 1000, "max_ms": entry["max"] * 1000,
+                 "alloc_kb": entry["alloc"] / 1024, "hist_us": {str(1 << bucket): n for bucket, n in sorted(entry["hist"].items())}} for name, entry in stats.items()]
+        return sorted(rows, key=lambda row: -row["total_ms"])
+
+    def recent(self, limit=None):
+        # Letzte Einzelmessungen, neueste zuerst: [{zeit, name, ms, alloc_kb, thread}]
+        with self.lock: traces = list(self.traces)
+        traces = traces[::-1][:limit]
+        return [{"time": datetime.fromtimestamp(stamp).strftime("%H:%M:%S.%f")[:-3], "name": name, "ms": seconds * 1000, "alloc_kb": None if alloc is None else alloc / 1024, "thread": thread} for stamp, name, seconds, alloc, thread in traces]
+
+    def report(self):
+        peak = tracemalloc.get_traced_memory()[1] / 1024 if self.memory else None
+        return {"created": datetime.now().isoformat(timespec='seconds'), "since": datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                "enabled": self.enabled, "memory": self.memory, "peak_kb": peak, "pid": os.getpid(), "spans": self.rows(), "traces": self.recent()}
+
+    def to_json(self): return json.dumps(self.report(), indent=2, ensure_ascii=False)
+
+    def dump(self, path):
+        from cwl_persist import atomic_write
+        atomic_write(path, self.to_json()); return path
+
+    def text(self, limit=20, traces=10):
+        # Kompakter Klartext für Konsole und Kivy-Diagnose
+        rows = self.rows()
+        if not rows: return "Noch keine Messwerte." if self.enabled else "Messung ist ausgeschaltet."
+        lines = [f"{'Messpunkt':<34} {'n':>6} {'Ø ms':>8} {'p95 ms':>8} {'max ms':>8}" + (f" {'KB':>8}" if self.memory else "")]
+        lines += [f"{row['name'][:34]:<34} {row['count']:>6} {row['mean_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['max_ms']:>8.2f}" + (f" {row['alloc_kb']:>8.0f}" if self.memory else "") for row in rows[:limit]]
+        if len(rows) > limit: lines.append(f"... und {len(rows) - limit} weitere")
+        if traces: lines += ["", "Letzte Messungen:"] + [f"  {trace['time']} {trace['name'][:34]:<34} {trace['ms']:8.2f} ms" for trace in self.recent(traces)]
+        return "\n".join(lines)
+
+PROFILER = Profiler()
+
+class Span:
+    # Einzelmessung; als Kontextmanager oder mit start()/stop(), wenn Anfang und Ende weit auseinander liegen
+    __slots__ = ("name", "started", "memory")
+    def __init__(self, name): self.name = name; self.started = None; self.memory = None
+    def start(self): self.memory = PROFILER.traced_memory(); self.started = time.perf_counter(); return self
+    def rename(self, name): self.name = name; return self
+    def stop(self):
+        if self.started is None: return
+        elapsed = time.perf_counter() - self.started; memory = PROFILER.traced_memory()
+        PROFILER.record(self.name, elapsed, None if self.memory is None or memory is None else memory - self.memory); self.started = None
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
+
+class NoSpan:
+    # Platzhalter bei ausgeschalteter Messung: nichts wird gemessen oder angelegt
+    name = None
+    def start(self): return self
+    def rename(self, name): return self
+    def stop(self): pass
+    def __enter__(self): return self
+    def __exit__(self, *exc): pass
+
+NO_SPAN = NoSpan()
+
+def span(name): return Span(name) if PROFILER.enabled else NO_SPAN
+
+def timed(name):
+    # Dekorator für Funktionen auf heißen Pfaden
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled: return function(*args, **kwargs)
+            with Span(name): return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def dump_at_exit():
+    path = os.environ.get("CWL_PROFILE_FILE")
+    if path and PROFILER.stats: PROFILER.dump(path)
+
+_mode = os.environ.get("CWL_PROFILE", "").strip().lower()
+if _mode not in ("", "0", "off"): PROFILER.set_enabled(True); PROFILER.set_memory(_mode == "mem")
+atexit.register(dump_at_exit)
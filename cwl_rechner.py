@@ -4,11 +4,23 @@ import numpy as np
 import io
 import json
 import os
+import sqlite3
+import time
+import uuid
+
+from cwl_engine import DEFAULT_POINTS, SCORE_CACHE, WarData, cached_score_war, check_grid, grid_values, load_rules, score_war, war_fingerprint, war_tensor
+from cwl_export import export_bytes, export_sheets
+from cwl_history import WarHistory
+from cwl_import import WarImport
+from cwl_live import LiveFeed, LiveStandings
+from cwl_profile import PROFILER, span, timed
+from cwl_store import clan_slug, diff_cells, open_store
 
 # ----------------------------
 # Page & Style Setup
 # ----------------------------
 st.set_page_config(page_title="CWL Bonus Rechner", layout="wide")
+rerun_span = span("streamlit/rerun").start()  # endet vor bewusstem Warten (Live-Aktualisierung, Auto-Sync) oder am Skriptende
 
 # De Luxe Dark Mode CSS
 st.markdown(
@@ -148,112 +160,176 @@ st.markdown(
 CONFIG_DIR = ".cwl_rechner_config"
 ROSTER_FILE = os.path.join(CONFIG_DIR, "clan_roster.json")
 POINTS_FILE = os.path.join(CONFIG_DIR, "point_system.json")
+RULES_FILE = os.path.join(CONFIG_DIR, "scoring_rules.json")
+HISTORY_FILE = os.path.join(CONFIG_DIR, "war_history.sqlite")
+LIVE_EVENTS_FILE = os.path.join(CONFIG_DIR, "live_events.jsonl")
 
-def save_settings(roster, points):
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(ROSTER_FILE, 'w') as f: json.dump(roster, f, indent=4)
-    with open(POINTS_FILE, 'w') as f: json.dump(points, f, indent=4)
-
-def load_settings():
-    default_points = {
-        "ell_gt_2": 3, "ell_eq_1": 2, "ell_eq_0": 1, "ell_eq_-1": 0, "ell_lt_-2": -1,
-        "atk_3s_gt_2": 6, "atk_3s_eq": 4, "atk_3s_lt_-2": 2, "atk_2s_ge_90": 4,
-        "atk_2s_80_89": 3, "atk_2s_50_79": 2, "atk_1s_90_99": 2, "atk_1s_50_89": 1,
-        "aktiv": 1, "bonus_100": 1, "mut_base": 1, "mut_extra": 2, "all_attacks": 2,
-    }
-    if 'clan_roster' not in st.session_state:
-        try:
-            with open(ROSTER_FILE, 'r') as f: st.session_state.clan_roster = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError): st.session_state.clan_roster = ["Beispielspieler"]
-    if 'point_system' not in st.session_state:
-        try:
-            with open(POINTS_FILE, 'r') as f: st.session_state.point_system = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError): st.session_state.point_system = default_points
+def legacy_settings():
+    # Startwerte des Standard-Clans aus den bisherigen Einzeldateien (nur beim ersten Öffnen des Clan-Speichers)
+    try:
+        with open(ROSTER_FILE, 'r') as f: roster = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError): roster = ["Beispielspieler"]
+    try:
+        with open(POINTS_FILE, 'r') as f: points = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError): points = dict(DEFAULT_POINTS)
+    return roster, points
+
+# ----------------------------
+# Gemeinsamer Clan-Speicher: alle Sitzungen eines Clans arbeiten auf demselben Stand
+# ----------------------------
+EDITOR_KEYS = ("df_editor_erl", "df_editor_stars", "df_editor_pct")
+
+def clan_store():
+    clan = st.session_state.get('clan', '').strip()
+    if not clan: return open_store(CONFIG_DIR, legacy_settings)
+    return open_store(os.path.join(CONFIG_DIR, "clans", clan_slug(clan)))
+
+def session_author(): return st.session_state.get('officer', '').strip() or f"Sitzung {st.session_state.session_id}"
+
+@timed("streamlit/sync_session")
+def sync_session(store):
+    # Sitzung nur bei neuer Version aus dem Speicher laden; Änderungen anderer Offiziere werden als Hinweis gezeigt
+    version, roster, point_system, war = store.snapshot()
+    directory, seen = st.session_state.get('store_key', (None, None))
+    if (directory, seen) == (store.directory, version): return
+    if directory is None: others = []  # erster Lauf der Sitzung: nichts verpasst
+    elif directory == store.directory: others = [(author, message) for _, author, message in store.changes_since(seen)]
+    else: others = [(None, "Clan gewechselt")]
+    others = [(author, message) for author, message in others if author != session_author()]
+    for author, message in others: st.toast(f"{author or 'Server'}: {message}", icon="🔄")
+    if roster != st.session_state.get('clan_roster'):
+        for key in EDITOR_KEYS: st.session_state.pop(key, None)
+    if others or roster != st.session_state.get('clan_roster'): st.session_state.pop('live_score', None)
+    st.session_state.clan_roster, st.session_state.point_system = roster, point_system
+    st.session_state.data_df = war.to_dataframe(); st.session_state.store_base = war; st.session_state.store_key = (store.directory, version)
+
+@timed("streamlit/push_war")
+def push_war(message=None):
+    # Geänderte Zellen dieser Sitzung (gegenüber dem zuletzt geladenen Stand) übernehmen; fremde Änderungen derselben Zelle gewinnen
+    # Werte, die nicht in eine WarData-Spalte passen, bleiben nur in dieser Sitzung (die Prüfung zeigt sie als Fehler an)
+    store = clan_store()
+    try: edits = diff_cells(st.session_state.store_base, WarData.from_dataframe(st.session_state.data_df))
+    except ValueError as e: st.error(f"Nicht gespeichert: {e}"); return
+    if edits:
+        applied, conflicts = store.edit_cells(st.session_state.store_key[1], edits, session_author(), message)
+        if conflicts: st.warning(f"{len(conflicts)} Zellen wurden inzwischen von jemand anderem geändert und nicht überschrieben: " + ", ".join(f"{name} / {column}" for name, column, _ in conflicts[:5]))
+    sync_session(store)
+
+fragment = getattr(st, "fragment", None) or st.experimental_fragment  # st.fragment ab Streamlit 1.37
+
+def watch_store(store, version):
+    if store.current_version() != version: st.rerun()
+
+def file_size(path):
+    try: return os.path.getsize(path)
+    except OSError: return None
+
+def watch_file(path, size):
+    if file_size(path) != size: st.rerun()
+
+# ----------------------------
+# Step 2: Cell Patches & Live Score
+# ----------------------------
+def _cell_value(value):
+    try: return int(float(value))
+    except (TypeError, ValueError): return None
+
+@timed("streamlit/apply_editor_patch")
+def apply_editor_patch(editor_key):
+    # Übernimmt nur die im data_editor geänderten Zellen, normalisiert den betroffenen Spieler/Tag (3 Sterne <-> 100%)
+    # und wertet nur diese Spieler neu
+    df = st.session_state.data_df; touched = set()
+    for row, cells in st.session_state[editor_key].get("edited_rows", {}).items():
+        for col, value in cells.items():
+            value = _cell_value(value)
+            if _cell_value(df.at[row, col]) == value: continue
+            df.at[row, col] = value; touched.add((row, col.split("_")[0]))
+    for row, day in touched:
+        star_col, pct_col = f"{day}_Sterne", f"{day}_Prozent"
+        if _cell_value(df.at[row, star_col]) == 3: df.at[row, pct_col] = 100
+        if _cell_value(df.at[row, pct_col]) == 100: df.at[row, star_col] = 3
+    rows = sorted({row for row, _ in touched})
+    if rows and 'live_score' in st.session_state:
+        own, war = war_tensor(df.iloc[rows]); st.session_state.live_score.patch(rows, own, war)
+    if rows: push_war()
+
+CHECK_STYLES = {'error': 'background-color: #a62626; color: white', 'warning': 'background-color: #8c6b1a; color: white'}
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def export_files(fingerprint, _war_score, _data):
+    # CSV- und XLSX-Bytes nur einmal je Inhalt bauen (Schlüssel: Fingerabdruck aus Kriegsdaten, Punktesystem und Regeln)
+    sheets = export_sheets(_war_score, _data)
+    return export_bytes(sheets[:1], "csv"), export_bytes(sheets)
+
+@timed("streamlit/show_grid_check")
+def show_grid_check(df, columns):
+    # Prüft die ganze Tabelle (inkl. noch nicht übernommener Editor-Eingaben) und zeigt die betroffenen Zellen markiert an
+    check = check_grid(grid_values(df))
+    if not check.issues: st.caption("✅ Keine Auffälligkeiten"); return check
+    (st.error if check.error_count else st.warning)(check.report(df["Name"].astype(str).tolist(), limit=5).replace("\n", "  \n"))
+    with st.expander("🔍 Markierte Zellen"):
+        styles = pd.DataFrame('', index=df.index, columns=columns)
+        for column in columns:
+            if column == "Name": styles[column] = np.where(check.idle, CHECK_STYLES['warning'], '')
+            else:
+                c = WarData.COLUMNS.index(column)
+                styles[column] = np.where(check.errors[:, c], CHECK_STYLES['error'], np.where(check.warnings[:, c], CHECK_STYLES['warning'], ''))
+        st.dataframe(df[columns].style.apply(lambda _: styles, axis=None), hide_index=True, use_container_width=True)
+    return check
 
 # ----------------------------
-# Helper Functions
+# Versteckte Diagnose-Seite (?debug=1 in der Adresse oder CWL_PROFILE=1)
 # ----------------------------
-def calculate_all_points(df, point_system):
-    if df.empty: return pd.DataFrame(columns=["Name", "Punkte"])
-    df_calc = df.copy()
-    total_points = pd.Series(0, index=df_calc.index, dtype=float)
-    total_attacks = pd.Series(0, index=df_calc.index, dtype=int)
-    df_calc['Eigenes_Rathaus'] = pd.to_numeric(df_calc['Eigenes_Rathaus'], errors='coerce').fillna(0)
-    for i in range(1, 8):
-        stars, pct, opp_rh = (pd.to_numeric(df_calc.get(c), errors='coerce') for c in [f"Tag{i}_Sterne", f"Tag{i}_Prozent", f"Tag{i}_Rathaus_Gegner"])
-        attack_made = (stars.notna() | pct.notna()) & opp_rh.notna()
-        total_attacks += attack_made.astype(int)
-        stars = stars.fillna(-1); pct = pct.fillna(0)
-        diff = opp_rh - df_calc['Eigenes_Rathaus']
-        ell_conditions = [diff >= 2, diff == 1, diff == 0, diff == -1, diff <= -2]
-        ell_choices = [point_system["ell_gt_2"], point_system["ell_eq_1"], point_system["ell_eq_0"], point_system["ell_eq_-1"], point_system["ell_lt_-2"]]
-        ell_points = np.select(ell_conditions, ell_choices, default=0)
-        attack_conditions = [
-            (stars == 3) & (diff >= 2), (stars == 3) & (diff.between(-1, 1)), (stars == 3) & (diff <= -2),
-            (stars == 2) & (pct >= 90), (stars == 2) & (pct.between(80, 89)), (stars == 2) & (pct.between(50, 79)),
-            (stars == 1) & (pct.between(90, 99)), (stars == 1) & (pct.between(50, 89)),]
-        attack_choices = [
-            point_system["atk_3s_gt_2"], point_system["atk_3s_eq"], point_system["atk_3s_lt_-2"],
-            point_system["atk_2s_ge_90"], point_system["atk_2s_80_89"], point_system["atk_2s_50_79"],
-            point_system["atk_1s_90_99"], point_system["atk_1s_50_89"]]
-        attack_points = np.select(attack_conditions, attack_choices, default=0)
-        aktiv_points = np.where(attack_made, point_system["aktiv"], 0)
-        bonus_100_points = np.where((pct == 100) & (diff >= 0), point_system["bonus_100"], 0)
-        courage_conditions = [(diff >= 3) & (pct.between(30, 49)), (diff >= 3)]
-        courage_choices = [point_system["mut_extra"], point_system["mut_base"]]
-        mut_points = np.select(courage_conditions, courage_choices, default=0)
-        daily_total = ell_points + attack_points + aktiv_points + bonus_100_points + mut_points
-        total_points += np.where(attack_made, daily_total, 0)
-    total_points += np.where(total_attacks >= 7, point_system["all_attacks"], 0)
-    results = pd.DataFrame({"Name": df_calc["Name"], "Punkte": total_points.astype(int)})
-    return results.sort_values(by=["Punkte", "Name"], ascending=[False, True]).reset_index(drop=True)
-
-def calculate_awards(df, summary_df, point_system):
-    if summary_df.empty:
-        return {"mvp": {"name": "N/A", "score": ""}, "goliath": {"name": "N/A", "score": ""}}
-    mvp = {"name": summary_df.iloc[0]["Name"], "score": f'{summary_df.iloc[0]["Punkte"]} Punkte'}
-    df_calc = df.copy()
-    goliath_points = pd.Series(0, index=df_calc.index, dtype=float)
-    df_calc['Eigenes_Rathaus'] = pd.to_numeric(df_calc['Eigenes_Rathaus'], errors='coerce').fillna(0)
-    for i in range(1, 8):
-        stars, pct, opp_rh = (pd.to_numeric(df_calc.get(c), errors='coerce') for c in [f"Tag{i}_Sterne", f"Tag{i}_Prozent", f"Tag{i}_Rathaus_Gegner"])
-        attack_made = (stars.notna() | pct.notna()) & opp_rh.notna()
-        is_goliath_attack = (opp_rh - df_calc['Eigenes_Rathaus']) >= 2
-        stars = stars.fillna(-1); pct = pct.fillna(0)
-        diff = opp_rh - df_calc['Eigenes_Rathaus']
-        ell_conditions = [diff >= 2, diff == 1, diff == 0, diff == -1, diff <= -2]
-        ell_choices = [point_system["ell_gt_2"], point_system["ell_eq_1"], point_system["ell_eq_0"], point_system["ell_eq_-1"], point_system["ell_lt_-2"]]
-        ell_points = np.select(ell_conditions, ell_choices, default=0)
-        attack_conditions = [
-            (stars == 3) & (diff >= 2), (stars == 3) & (diff.between(-1, 1)), (stars == 3) & (diff <= -2),
-            (stars == 2) & (pct >= 90), (stars == 2) & (pct.between(80, 89)), (stars == 2) & (pct.between(50, 79)),
-            (stars == 1) & (pct.between(90, 99)), (stars == 1) & (pct.between(50, 89)),]
-        attack_choices = [
-            point_system["atk_3s_gt_2"], point_system["atk_3s_eq"], point_system["atk_3s_lt_-2"],
-            point_system["atk_2s_ge_90"], point_system["atk_2s_80_89"], point_system["atk_2s_50_79"],
-            point_system["atk_1s_90_99"], point_system["atk_1s_50_89"]]
-        attack_points = np.select(attack_conditions, attack_choices, default=0)
-        aktiv_points = np.where(attack_made, point_system["aktiv"], 0)
-        bonus_100_points = np.where((pct == 100) & (diff >= 0), point_system["bonus_100"], 0)
-        courage_conditions = [(diff >= 3) & (pct.between(30, 49)), (diff >= 3)]
-        courage_choices = [point_system["mut_extra"], point_system["mut_base"]]
-        mut_points = np.select(courage_conditions, courage_choices, default=0)
-        daily_total = ell_points + attack_points + aktiv_points + bonus_100_points + mut_points
-        goliath_points += np.where(attack_made & is_goliath_attack, daily_total, 0)
-    if goliath_points.sum() > 0:
-        winner_idx = goliath_points.idxmax()
-        goliath = {"name": df_calc.loc[winner_idx, "Name"], "score": f'{int(goliath_points.max())} Punkte gegen höhere RH'}
+def debug_requested():
+    try: return st.query_params.get("debug") == "1"
+    except AttributeError: return st.experimental_get_query_params().get("debug") == ["1"]
+
+def show_profile_page():
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+    st.header("🛠 Diagnose")
+    st.caption("Die Messung gilt für den ganzen Server-Prozess, also für alle Sitzungen. Ausgeschaltet kostet sie praktisch nichts.")
+    col1, col2, col3 = st.columns(3)
+    with col1: enabled = st.checkbox("Messung aktiv", value=PROFILER.enabled)
+    with col2: memory = st.checkbox("Speicher messen (tracemalloc, langsamer)", value=PROFILER.memory)
+    with col3:
+        if st.button("Zurücksetzen"): PROFILER.reset()
+    if enabled != PROFILER.enabled: PROFILER.set_enabled(enabled)
+    if memory != PROFILER.memory: PROFILER.set_memory(memory)
+    report = PROFILER.report()
+    if not report["spans"]: st.info("Noch keine Messwerte. Messung einschalten und die App benutzen.")
     else:
-        goliath = {"name": "Niemand", "score": "Keine Angriffe auf viel höhere RH"}
-    return {"mvp": mvp, "goliath": goliath}
+        spans = pd.DataFrame(report["spans"]).drop(columns=["hist_us"]).round(3)
+        if not PROFILER.memory: spans = spans.drop(columns=["alloc_kb"])
+        st.subheader("Messpunkte"); st.dataframe(spans, hide_index=True, use_container_width=True)
+        if report["peak_kb"] is not None: st.caption(f"Speicher-Spitze seit Start der Messung: {report['peak_kb']:.0f} KB")
+        name = st.selectbox("Verteilung (Log2-Histogramm, Obergrenze in µs)", [row["name"] for row in report["spans"]])
+        hist = next(row["hist_us"] for row in report["spans"] if row["name"] == name)
+        st.bar_chart(pd.Series(list(hist.values()), index=[f"≤{int(bound):,} µs" for bound in hist], name="Anzahl"))
+        st.subheader("Letzte Messungen"); st.dataframe(pd.DataFrame(report["traces"]).round(3), hide_index=True, use_container_width=True)
+    col1, col2 = st.columns(2)
+    with col1: st.download_button("📥 Bericht herunterladen (.json)", data=PROFILER.to_json().encode('utf-8'), file_name="cwl_profil.json", mime="application/json")
+    with col2:
+        if st.button("💾 Bericht auf dem Server speichern"):
+            path = PROFILER.dump(os.path.join(CONFIG_DIR, f"cwl_profil_{time.strftime('%Y%m%d_%H%M%S')}.json")); st.success(f"Gespeichert: {path}")
+    st.markdown("</div>", unsafe_allow_html=True)
 
 # --- Session State Initialization ---
 if 'step' not in st.session_state: st.session_state.step = "erl_input"
 if 'data_df' not in st.session_state: st.session_state.data_df = pd.DataFrame()
-load_settings()
+if 'session_id' not in st.session_state: st.session_state.session_id = uuid.uuid4().hex[:6]
+if 'scoring_rules' not in st.session_state: st.session_state.scoring_rules = load_rules(RULES_FILE)
+if st.session_state.scoring_rules.warning: st.sidebar.warning(st.session_state.scoring_rules.warning, icon="⚠️")
+st.sidebar.text_input("Clan", key="clan", help="Jeder Clan hat einen eigenen gemeinsamen Stand; leer = Standard-Clan")
+st.sidebar.text_input("Dein Name", key="officer", help="Wird anderen Offizieren bei deinen Änderungen angezeigt")
+store = clan_store(); sync_session(store)
 
 # --- Sidebar Navigation & App Header ---
-page = st.sidebar.radio("Navigation", ["CWL Rechner", "⚙️ Einstellungen", "Credits"])
+page = st.sidebar.radio("Navigation", ["CWL Rechner", "📡 Live-Wertung", "⚙️ Einstellungen", "Credits"] + (["🛠 Diagnose"] if PROFILER.enabled or debug_requested() else []))
+rerun_span.rename(f"streamlit/rerun {page}")
+cache_stats = SCORE_CACHE.stats()
+st.sidebar.caption(f"Gemeinsamer Stand: Version {st.session_state.store_key[1]}")
+auto_sync = st.sidebar.checkbox("Änderungen anderer automatisch laden", key="auto_sync")
+st.sidebar.caption(f"Wertungs-Cache: {cache_stats['hits']} Treffer / {cache_stats['misses']} neu berechnet ({cache_stats['entries']}/{cache_stats['maxsize']})")
 st.markdown('<div style="text-align: center; margin-top: 2rem; margin-bottom: 2rem;"><div class="title-box">CWL Bonus Rechner</div></div>', unsafe_allow_html=True)
 
 # --- SETTINGS PAGE ---
@@ -265,8 +341,7 @@ if page == "⚙️ Einstellungen":
     if st.button("Mitgliederliste speichern", type="primary"):
         new_roster = [name.strip() for name in roster_text.split("\n") if name.strip()]
         unique_roster = list(dict.fromkeys(new_roster))
-        st.session_state.clan_roster = unique_roster
-        save_settings(st.session_state.clan_roster, st.session_state.point_system)
+        store.set_roster(unique_roster, session_author()); sync_session(store)
         st.toast("Mitgliederliste aktualisiert und gespeichert!", icon="👥"); st.rerun()
     st.markdown("<hr>", unsafe_allow_html=True)
     st.subheader("🔢 Punktesystem anpassen")
@@ -282,20 +357,22 @@ if page == "⚙️ Einstellungen":
     st.markdown("<h5>Bonuspunkte</h5>", unsafe_allow_html=True)
     c1,c2,c3,c4,c5=st.columns(5)
     points["aktiv"]=c1.number_input("Aktivität",value=points["aktiv"]);points["bonus_100"]=c2.number_input("100% Bonus",value=points["bonus_100"]);points["mut_base"]=c3.number_input("Mutbonus",value=points["mut_base"]);points["mut_extra"]=c4.number_input("Extra Mut",value=points["mut_extra"]);points["all_attacks"]=c5.number_input("Alle 7 Angriffe",value=points["all_attacks"])
+    if 'war_score' in st.session_state:
+        st.markdown("<h5>Vorschau der aktuellen Wertung</h5>", unsafe_allow_html=True)
+        st.dataframe(st.session_state.war_score.rescore(points).summary(), use_container_width=True, hide_index=True)
     if st.button("Punktesystem speichern",type="primary",use_container_width=True):
-        st.session_state.point_system=points
-        save_settings(st.session_state.clan_roster,st.session_state.point_system)
+        for key in ('war_score', 'live_score'):
+            if key in st.session_state: st.session_state[key] = st.session_state[key].rescore(points)
+        store.set_point_system(points, session_author()); sync_session(store)
         st.toast("Punktesystem aktualisiert!",icon="⚙️")
     st.markdown("</div>", unsafe_allow_html=True)
 
 # --- MAIN APP ---
 elif page == "CWL Rechner":
     if 'data_df' not in st.session_state or st.session_state.data_df.empty:
-        df = pd.DataFrame(st.session_state.clan_roster, columns=["Name"])
-        for i in range(1, 8):
-            df[f"Tag{i}_Rathaus_Gegner"] = None; df[f"Tag{i}_Sterne"] = None; df[f"Tag{i}_Prozent"] = None
-        df["Eigenes_Rathaus"] = None
-        st.session_state.data_df = df
+        st.session_state.data_df = WarData.empty(st.session_state.clan_roster).to_dataframe()
+
+    if st.session_state.step != "summary": st.session_state.pop('war_score', None)
 
     if st.session_state.step == "erl_input":
         st.markdown("<div class='content-card'>", unsafe_allow_html=True)
@@ -306,10 +383,28 @@ elif page == "CWL Rechner":
         for i in range(1, 8):
             column_config[f"Tag{i}_Rathaus_Gegner"] = f"Tag {i} ERL"
         
+        with st.expander("📥 Kriegsdaten importieren (Tabelle, CSV, JSON)"):
+            uploaded = st.file_uploader("CSV- oder JSON-Datei", type=["csv", "txt", "tsv", "json"], key="import_file")
+            pasted = st.text_area("... oder Tabelle mit Kopfzeile einfügen (z.B. aus Excel kopiert)", key="import_text", height=150)
+            if st.button("Importieren"):
+                try:
+                    war_import = (WarImport.parse(uploaded.getvalue().decode('utf-8-sig')) if uploaded else WarImport.parse(pasted)).validate()
+                    data = WarData.from_dataframe(st.session_state.data_df); values, unknown = war_import.edits(data.names)
+                    for (row, column), value in values.items(): data.set(row, column, value)
+                    st.session_state.data_df = data.to_dataframe(); st.session_state.pop('live_score', None); st.session_state.pop('df_editor_erl', None); push_war(f"Import: {len(values)} Zellen")
+                    st.session_state.import_report = (len(values), war_import.report(), unknown); st.rerun()
+                except ValueError as e: st.error(f"Import fehlgeschlagen: {e}")
+            if 'import_report' in st.session_state:
+                cells, report, unknown = st.session_state.import_report
+                st.success(f"{cells} Zellen übernommen"); st.text(report)
+                if unknown: st.warning("Nicht im Kader: " + ", ".join(unknown))
+
         edited_df = st.data_editor(st.session_state.data_df[erl_cols], hide_index=True, key="df_editor_erl", use_container_width=True, column_config=column_config)
+        show_grid_check(st.session_state.data_df.assign(**{column: edited_df[column] for column in erl_cols[1:]}), erl_cols)
         
         if st.button("Weiter zu Sterne & Prozent", type="primary"):
-            st.session_state.data_df.update(edited_df)
+            st.session_state.data_df.update(edited_df); push_war()
+            st.session_state.pop('live_score', None)
             st.session_state.step = "pct_input"
             st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
@@ -319,6 +414,7 @@ elif page == "CWL Rechner":
         st.subheader("Schritt 2: Sterne und Zerstörung (%)")
 
         df = st.session_state.data_df
+        if 'live_score' not in st.session_state: st.session_state.live_score = score_war(df, st.session_state.point_system, st.session_state.scoring_rules)
         star_cols = ["Name"] + [f"Tag{i}_Sterne" for i in range(1, 8)]
         pct_cols = ["Name"] + [f"Tag{i}_Prozent" for i in range(1, 8)]
         
@@ -329,34 +425,21 @@ elif page == "CWL Rechner":
             pct_config[f"Tag{i}_Prozent"] = f"Tag {i} %"
 
         st.markdown("<h5>Sterne</h5>", unsafe_allow_html=True)
-        edited_stars = st.data_editor(df[star_cols], hide_index=True, key="df_editor_stars", use_container_width=True, column_config=star_config)
+        st.data_editor(df[star_cols], hide_index=True, key="df_editor_stars", use_container_width=True, column_config=star_config, on_change=apply_editor_patch, args=("df_editor_stars",))
         st.markdown("<h5>Prozent</h5>", unsafe_allow_html=True)
-        edited_pct = st.data_editor(df[pct_cols], hide_index=True, key="df_editor_pct", use_container_width=True, column_config=pct_config)
+        st.data_editor(df[pct_cols], hide_index=True, key="df_editor_pct", use_container_width=True, column_config=pct_config, on_change=apply_editor_patch, args=("df_editor_pct",))
+        show_grid_check(st.session_state.data_df, star_cols + pct_cols[1:])
 
-        temp_df = df.copy()
-        for i in range(1, 8):
-            star_col = f"Tag{i}_Sterne"; pct_col = f"Tag{i}_Prozent"
-            temp_df[star_col] = pd.to_numeric(edited_stars[star_col], errors='coerce')
-            temp_df[pct_col] = pd.to_numeric(edited_pct[pct_col], errors='coerce')
-            
-            three_star_mask = temp_df[star_col] == 3
-            hundred_pct_mask = temp_df[pct_col] == 100
-            temp_df.loc[three_star_mask, pct_col] = 100.0
-            temp_df.loc[hundred_pct_mask, star_col] = 3.0
-        
-        if not df.equals(temp_df):
-            st.session_state.data_df = temp_df
-            st.rerun()
+        with st.expander("⚡ Live-Vorschau der Wertung"):
+            st.dataframe(st.session_state.live_score.summary(), use_container_width=True, hide_index=True)
 
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Zurück"):
-                st.session_state.data_df = temp_df
                 st.session_state.step = "erl_input"
                 st.rerun()
         with col2:
             if st.button("Berechnen & Auswerten", type="primary"):
-                st.session_state.data_df = temp_df
                 st.session_state.step = "summary"
                 st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
@@ -365,13 +448,18 @@ elif page == "CWL Rechner":
         st.markdown("<div class='content-card'>", unsafe_allow_html=True)
         st.subheader("Endwertung - Gesamtpunkte je Spieler")
         
-        summary_df = calculate_all_points(st.session_state.data_df, st.session_state.point_system)
+        war_score = cached_score_war(st.session_state.data_df, st.session_state.point_system, st.session_state.scoring_rules)
+        st.session_state.war_score = war_score
+        summary_df = war_score.summary()
         st.dataframe(summary_df, use_container_width=True, hide_index=True)
+        with st.expander("📅 Punkte je Tag & Kategorie"):
+            st.dataframe(war_score.day_table(), use_container_width=True, hide_index=True)
+            st.dataframe(war_score.category_table(), use_container_width=True, hide_index=True)
         
         st.markdown("<hr>", unsafe_allow_html=True)
 
         st.subheader("🏆 Clan Awards")
-        awards = calculate_awards(st.session_state.data_df, summary_df, st.session_state.point_system)
+        awards = war_score.awards()
         col1, col2 = st.columns(2)
         with col1:
             st.markdown(f"""<div class="award-card"><div class="award-title">🏅 MVP</div><div class="award-name">{awards['mvp']['name']}</div><div class="award-score">{awards['mvp']['score']}</div></div>""", unsafe_allow_html=True)
@@ -386,12 +474,12 @@ elif page == "CWL Rechner":
 
         st.markdown("<hr>", unsafe_allow_html=True)
         
-        @st.cache_data
-        def convert_df_to_csv(df):
-            return df.to_csv(index=False).encode('utf-8')
-        csv = convert_df_to_csv(summary_df)
-
-        st.download_button(label="📥 Excel-Datei herunterladen (.csv)", data=csv, file_name='cwl_bonus_wertung.csv', mime='text/csv')
+        try: data = WarData.from_dataframe(st.session_state.data_df)
+        except ValueError as e: st.error(f"Export nicht möglich: {e}"); st.stop()
+        csv_bytes, xlsx_bytes = export_files(war_fingerprint(data, st.session_state.point_system, st.session_state.scoring_rules), war_score, data)
+        col1, col2 = st.columns(2)
+        with col1: st.download_button(label="📥 Excel-Datei herunterladen (.csv)", data=csv_bytes, file_name='cwl_bonus_wertung.csv', mime='text/csv')
+        with col2: st.download_button(label="📊 Arbeitsmappe mit Tagen & Kategorien (.xlsx)", data=xlsx_bytes, file_name='cwl_bonus_wertung.xlsx', mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
         st.markdown("<hr>", unsafe_allow_html=True)
         col1, col2 = st.columns(2)
@@ -401,11 +489,54 @@ elif page == "CWL Rechner":
                 st.rerun()
         with col2:
             if st.button("Neuen Durchgang starten", type="primary"):
-                st.session_state.data_df = pd.DataFrame()
+                # Archiv und Ereignisdatei liegen je Clan neben dessen gemeinsamem Stand
+                os.makedirs(store.directory, exist_ok=True)
+                try:
+                    with WarHistory(os.path.join(store.directory, os.path.basename(HISTORY_FILE))) as history: war_id = history.archive(st.session_state.data_df, war_score)
+                    st.toast("Krieg im Archiv gespeichert" if war_id is not None else "Nicht archiviert: keine Angriffe oder schon im Archiv")
+                except (sqlite3.Error, ValueError) as e: st.toast(f"Archivieren fehlgeschlagen: {e}", icon="⚠️")
+                store.replace_war(WarData.empty(st.session_state.clan_roster), session_author()); sync_session(store); st.session_state.pop('live_score', None)
                 st.session_state.step = "erl_input"
                 st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
 
+# --- LIVE PAGE ---
+elif page == "📡 Live-Wertung":
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+    st.header("📡 Live-Wertung")
+    st.caption("Angriffe einzeln aus einer JSONL-Datei (z.B. von `python cwl_live.py serve live_events.jsonl`); nur neue Zeilen werden gewertet.")
+    events_path = st.text_input("Event-Datei", value=os.path.join(store.directory, os.path.basename(LIVE_EVENTS_FILE)))
+    feed_key = (events_path, json.dumps(st.session_state.point_system, sort_keys=True), st.session_state.scoring_rules.fingerprint)
+    if st.session_state.get('live_feed_key') != feed_key:
+        # Neue Datei oder neues Punktesystem: einmal von vorne einlesen, danach nur noch anhängen
+        try: data = WarData.from_dataframe(st.session_state.data_df) if not st.session_state.data_df.empty else WarData.empty(st.session_state.clan_roster)
+        except ValueError as e: st.error(f"Kriegsdaten ungültig: {e}"); st.stop()
+        own_th = {name: data.get(row, "Eigenes_Rathaus") for row, name in enumerate(data.names)}
+        st.session_state.live_feed = LiveFeed(events_path, LiveStandings(st.session_state.point_system, st.session_state.scoring_rules, own_th)); st.session_state.live_feed_key = feed_key
+    feed = st.session_state.live_feed; new_events = feed.poll(); standings = feed.standings
+
+    awards = standings.awards()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Angriffe", standings.events, delta=new_events or None)
+    col2.metric("🏆 MVP", awards["mvp"]["name"], awards["mvp"]["score"], delta_color="off")
+    col3.metric("⚔️ David gegen Goliath", awards["goliath"]["name"], awards["goliath"]["score"], delta_color="off")
+    st.dataframe(pd.DataFrame(standings.ranking(), columns=["Name", "Punkte", "Angriffe"]), use_container_width=True, hide_index=True)
+    for error in feed.errors: st.warning(error)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("In den Rechner übernehmen"):
+            if st.session_state.data_df.empty: st.session_state.data_df = WarData.empty(st.session_state.clan_roster).to_dataframe()
+            try: data = WarData.from_dataframe(st.session_state.data_df); applied = standings.apply_to(data)
+            except ValueError as e: st.error(f"Nicht übernommen: {e}")
+            else:
+                st.session_state.data_df = data.to_dataframe(); push_war(f"{applied} Live-Angriffe übernommen"); st.session_state.pop('live_score', None); st.session_state.step = "pct_input"
+                st.toast(f"{applied} Angriffe übernommen", icon="📡")
+    with col2:
+        auto_refresh = st.checkbox("Automatisch aktualisieren (alle 5 s)", key="live_auto_refresh")
+    st.markdown("</div>", unsafe_allow_html=True)
+    if auto_refresh: fragment(run_every=5)(watch_file)(events_path, file_size(events_path))
+
 # --- CREDITS PAGE ---
 elif page == "Credits":
     st.markdown("<div class='content-card'>", unsafe_allow_html=True)
@@ -415,3 +546,10 @@ elif page == "Credits":
     st.markdown("<p class='credit-text'><strong>Webseite & Code:</strong> AGDNoob ❤️</p>", unsafe_allow_html=True)
     st.markdown("<p class='credit-text'><strong>System:</strong> MagicDragon & AGDNoob</p>", unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
+
+# --- DEBUG PAGE ---
+elif page == "🛠 Diagnose": show_profile_page()
+
+rerun_span.stop()
+# Auf Änderungen anderer Sitzungen achten: ein Fragment prüft alle 2 s nur die Version, die Seite wird erst bei einer Änderung neu aufgebaut
+if auto_sync and page != "📡 Live-Wertung": fragment(run_every=2)(watch_store)(store, st.session_state.store_key[1])
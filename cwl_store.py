@@ -0,0 +1,144 @@
+import json
+import os
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from cwl_engine import DEFAULT_POINTS, WarData
+from cwl_persist import atomic_write_json
+
+try: import fcntl
+except ImportError: fcntl = None  # z.B. Windows: dann nur Sperre innerhalb des Prozesses
+
+# ----------------------------
+# Gemeinsamer Clan-Speicher: ein Zustand pro Clan für alle Sitzungen eines Servers
+# ----------------------------
+# Kader, Punktesystem und laufender Krieg liegen einmal im Speicher; jede Änderung erhöht die Version und wird unter
+# Datei-Sperre atomar in clan_state.json geschrieben. Schreiben andere Prozesse dieselbe Datei, wird sie beim nächsten Zugriff neu geladen.
+# Zelländerungen sind nach (Spieler, Spalte) versioniert: Offiziere, die verschiedene Zellen bearbeiten, überschreiben sich nicht,
+# gleichzeitige Änderungen derselben Zelle werden als Konflikt gemeldet statt still überschrieben.
+STATE_FILE = "clan_state.json"
+LOCK_FILE = ".clan_state.lock"
+
+def diff_cells(old, new):
+    # {(name, spalte): neuer Wert oder None} für alle Zellen gemeinsamer Spieler, die sich zwischen zwei WarData unterscheiden
+    rows = [(old.index[name], row) for row, name in enumerate(new.names) if name in old.index]
+    if not rows: return {}
+    old_rows, new_rows = (np.array(index, dtype=np.intp) for index in zip(*rows))
+    before, after = old.matrix()[old_rows], new.matrix()[new_rows]
+    changed = (before != after) & ~(np.isnan(before) & np.isnan(after))
+    return {(new.names[new_rows[r]], WarData.COLUMNS[c]): new.get(new_rows[r], WarData.COLUMNS[c]) for r, c in zip(*(index.tolist() for index in np.nonzero(changed)))}
+
+class ClanStore:
+    def __init__(self, directory, roster=None, point_system=None):
+        self.directory = directory; self.path = os.path.join(directory, STATE_FILE)
+        self.lock = threading.RLock()
+        self.version = 0; self.roster = list(roster or ["Beispielspieler"]); self.point_system = dict(point_system or DEFAULT_POINTS)
+        self.war = WarData.empty(self.roster); self.cell_versions = {}; self.events = deque(maxlen=200); self.stamp = None
+        with self.lock: self.reload()
+
+    @contextmanager
+    def file_lock(self):
+        # Sperre über Prozessgrenzen hinweg (mehrere Server-Prozesse auf demselben Verzeichnis)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_FILE), 'a') as f:
+            if fcntl: fcntl.flock(f, fcntl.LOCK_EX)
+            try: yield
+            finally:
+                if fcntl: fcntl.flock(f, fcntl.LOCK_UN)
+
+    def reload(self):
+        # Nur lesen, wenn die Datei seit dem letzten Zugriff von jemand anderem geschrieben wurde
+        try: stat = os.stat(self.path)
+        except FileNotFoundError: return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self.stamp: return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: payload = json.load(f)
+        except (OSError, json.JSONDecodeError): return
+        self.stamp = stamp
+        if payload.get("version", 0) == self.version and self.version: return
+        war = WarData.from_dict(payload["war"])
+        # Geänderte Zellen und alle Zellen bisher unbekannter Spieler tragen die neue Version (auch beim ersten Laden)
+        known = self.war.index; stamped = set(diff_cells(self.war, war)) | {(name, column) for name in war.names if name not in known for column in WarData.COLUMNS}
+        for key in stamped: self.cell_versions[key] = payload["version"]
+        self.version, self.roster, self.point_system, self.war = payload["version"], payload["roster"], payload["point_system"], war
+        self.events.append((self.version, None, "Änderung aus einem anderen Server-Prozess"))
+
+    def write(self, author, message):
+        atomic_write_json(self.path, {"version": self.version, "roster": self.roster, "point_system": self.point_system, "war": self.war.to_dict()})
+        stat = os.stat(self.path); self.stamp = (stat.st_mtime_ns, stat.st_size)
+        self.events.append((self.version, author, message))
+
+    @contextmanager
+    def commit(self, author, message):
+        # Der Block ändert Kopien für self.version + 1; scheitert er oder das Schreiben, gilt wieder der alte Stand (Speicher = Datei)
+        before = self.version, self.roster, self.point_system, self.war, self.cell_versions
+        self.version += 1; self.war = self.war.copy(); self.cell_versions = dict(self.cell_versions)
+        try: yield; self.write(author, message)
+        except BaseException: self.version, self.roster, self.point_system, self.war, self.cell_versions = before; raise
+
+    @contextmanager
+    def update(self, author, message):
+        # Lesen-Ändern-Schreiben unter beiden Sperren
+        with self.lock, self.file_lock():
+            self.reload()
+            with self.commit(author, message): yield
+
+    def snapshot(self):
+        # (version, kader, punktesystem, WarData-Kopie): Sitzungen arbeiten auf Kopien, nie auf dem geteilten Zustand
+        with self.lock:
+            self.reload()
+            return self.version, list(self.roster), dict(self.point_system), self.war.copy()
+
+    def current_version(self):
+        # Billige Abfrage für Beobachter: nur Datei-Stempel prüfen, keine Kopie des Kriegs
+        with self.lock: self.reload(); return self.version
+
+    def set_roster(self, roster, author=None):
+        # Bekannte Spieler behalten ihre Kriegsdaten, neue Spieler starten leer
+        with self.update(author, f"Mitgliederliste geändert ({len(roster)} Spieler)"):
+            self.roster = list(roster); self.war = self.war.reindex(self.roster)
+
+    def set_point_system(self, point_system, author=None):
+        with self.update(author, "Punktesystem geändert"): self.point_system = dict(point_system)
+
+    def replace_war(self, war, author=None, message="Neuer Durchgang gestartet"):
+        # Jede Zelle des neuen Kriegs ist neu: Änderungen veralteter Sitzungen am alten Krieg werden zu Konflikten
+        with self.update(author, message):
+            self.war = war.reindex(self.roster); self.cell_versions = {(name, column): self.version for name in self.war.names for column in WarData.COLUMNS}
+
+    def edit_cells(self, base_version, edits, author=None, message=None):
+        # edits: {(name, spalte): wert|None} gegenüber dem Stand base_version -> (übernommene Zellen, Konflikte [(name, spalte, aktueller Wert)])
+        with self.lock, self.file_lock():
+            self.reload(); conflicts, changes = [], []
+            for (name, column), value in edits.items():
+                row = self.war.index.get(name)
+                if row is None: conflicts.append((name, column, None)); continue
+                current = self.war.get(row, column)
+                if current == value: continue
+                if self.cell_versions.get((name, column), 0) > base_version: conflicts.append((name, column, current)); continue
+                changes.append((row, name, column, value))
+            if not changes: return 0, conflicts
+            with self.commit(author, message or f"{len(changes)} Zellen geändert"):
+                for row, name, column, value in changes: self.war.set(row, column, value); self.cell_versions[(name, column)] = self.version
+            return len(changes), conflicts
+
+    def changes_since(self, version):
+        # Änderungsmeldungen [(version, autor, text)] nach version, älteste zuerst
+        with self.lock: return [event for event in self.events if event[0] > version]
+
+STORES = {}
+STORES_LOCK = threading.Lock()
+
+def clan_slug(clan): return re.sub(r"[^0-9A-Za-z_-]+", "_", clan.strip()).strip("_").lower() or "clan"
+
+def open_store(directory, defaults=None):
+    # Ein ClanStore pro Verzeichnis und Prozess; defaults() -> (kader, punktesystem) wird nur beim ersten Öffnen aufgerufen
+    key = os.path.abspath(directory)
+    with STORES_LOCK:
+        if key not in STORES: STORES[key] = ClanStore(directory, *(defaults() if defaults else ()))
+        return STORES[key]
@@ -1,36 +1,53 @@
 import os
 import json
-import pandas as pd
-import numpy as np
-import io
 import time
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+# --- Startup-Profil: Import- und Aufbauzeiten (Ausgabe mit CWL_STARTUP_PROFILE=1) ---
+# Nur bis zum ersten Bild wird aufgezeichnet; spätere Neuaufbauten und Screens landen nicht mehr im Profil
+STARTED = time.perf_counter(); STARTUP_PROFILE = []; STARTUP_DONE = False
+@contextmanager
+def startup_phase(label):
+    start = time.perf_counter()
+    try: yield
+    finally:
+        if not STARTUP_DONE: STARTUP_PROFILE.append((label, time.perf_counter() - start))
 
 # --- Kivy Configuration: Force Portrait Mode ---
-from kivy.config import Config
-Config.set('graphics', 'orientation', 'portrait')
-
-from kivy.app import App
-from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.label import Label
-from kivy.uix.textinput import TextInput
-from kivy.uix.button import Button
-from kivy.core.window import Window
-from kivy.metrics import dp
-from kivy.uix.screenmanager import ScreenManager, Screen, FadeTransition
-from kivy.clock import Clock
-from kivy.graphics import Color, RoundedRectangle
-from kivy.utils import platform
-
-# --- Robust Plyer Imports ---
-try:
-    from plyer import toast, storagepath, permissions
-    PLYER_AVAILABLE = True
-except ImportError:
-    print("WARNING: Plyer components could not be imported. Native features like toast notifications and file saving will be disabled.")
-    PLYER_AVAILABLE = False
+with startup_phase("import kivy.config"):
+    from kivy.config import Config
+    Config.set('graphics', 'orientation', 'portrait')
+
+with startup_phase("import kivy.app + Fenster"):
+    from kivy.app import App
+    from kivy.core.window import Window
+    from kivy.clock import Clock
+    from kivy.metrics import dp
+    from kivy.utils import platform
+with startup_phase("import kivy.uix"):
+    from kivy.uix.boxlayout import BoxLayout
+    from kivy.uix.gridlayout import GridLayout
+    from kivy.uix.scrollview import ScrollView
+    from kivy.uix.recycleview import RecycleView
+    from kivy.uix.recycleview.views import RecycleDataViewBehavior
+    from kivy.uix.recycleboxlayout import RecycleBoxLayout
+    from kivy.uix.label import Label
+    from kivy.uix.textinput import TextInput
+    from kivy.uix.button import Button
+    from kivy.uix.screenmanager import ScreenManager, Screen, FadeTransition
+    from kivy.graphics import Color, RoundedRectangle
+
+with startup_phase("import cwl_engine (numpy)"):
+    from cwl_engine import DEFAULT_POINTS, SCORE_CACHE, WarData, cached_score_war, check_grid, load_rules
+    from cwl_persist import EditJournal, WarLog, atomic_write_json
+    from cwl_profile import PROFILER, span, timed
+
+# --- Robust Plyer Imports (erst bei der ersten Benutzung) ---
+class PlyerFallback:
+    available = False
+    @staticmethod
     def toast(message, **kwargs): pass
     class storagepath:
         @staticmethod
@@ -41,6 +58,20 @@ except ImportError:
         @staticmethod
         def request_permissions(perms, callback=None): pass
 
+_plyer = None
+def plyer():
+    global _plyer
+    if _plyer is None:
+        try:
+            from plyer import toast, storagepath, permissions
+            _plyer = SimpleNamespace(available=True, toast=toast, storagepath=storagepath, permissions=permissions)
+        except ImportError:
+            print("WARNING: Plyer components could not be imported. Native features like toast notifications and file saving will be disabled.")
+            _plyer = PlyerFallback
+    return _plyer
+
+def toast(message, **kwargs): plyer().toast(message, **kwargs)
+
 
 # --- Configuration for Data Persistence ---
 try:
@@ -50,66 +81,24 @@ except AttributeError:
 CONFIG_DIR = os.path.join(user_data_dir, ".cwl_rechner_config")
 ROSTER_FILE = os.path.join(CONFIG_DIR, "clan_roster.json")
 POINTS_FILE = os.path.join(CONFIG_DIR, "point_system.json")
+RULES_FILE = os.path.join(CONFIG_DIR, "scoring_rules.json")
+HISTORY_FILE = os.path.join(CONFIG_DIR, "war_history.sqlite")
 
 def save_settings(roster, points):
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(ROSTER_FILE, 'w') as f: json.dump(roster, f, indent=4)
-    with open(POINTS_FILE, 'w') as f: json.dump(points, f, indent=4)
+    atomic_write_json(ROSTER_FILE, roster); atomic_write_json(POINTS_FILE, points)
 
 def load_settings():
-    default_points = {
-        "ell_gt_2": 3, "ell_eq_1": 2, "ell_eq_0": 1, "ell_eq_-1": 0, "ell_lt_-2": -1,
-        "atk_3s_gt_2": 6, "atk_3s_eq": 4, "atk_3s_lt_-2": 2, "atk_2s_ge_90": 4,
-        "atk_2s_80_89": 3, "atk_2s_50_79": 2, "atk_1s_90_99": 2, "atk_1s_50_89": 1,
-        "aktiv": 1, "bonus_100": 1, "mut_base": 1, "mut_extra": 2, "all_attacks": 2,
-    }
     try:
         with open(ROSTER_FILE, 'r') as f: roster = json.load(f)
     except (FileNotFoundError, json.JSONDecodeError): roster = ["Beispielspieler 1", "Beispielspieler 2"]
     try:
         with open(POINTS_FILE, 'r') as f: points = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError): points = default_points
+    except (FileNotFoundError, json.JSONDecodeError): points = dict(DEFAULT_POINTS)
     return roster, points
 
-def calculate_all_points(df, point_system):
-    if df.empty: return pd.DataFrame(columns=["Name", "Punkte"])
-    df_calc = df.copy()
-    total_points = pd.Series(0, index=df_calc.index, dtype=float)
-    total_attacks = pd.Series(0, index=df_calc.index, dtype=int)
-    df_calc['Eigenes_Rathaus'] = pd.to_numeric(df_calc['Eigenes_Rathaus'], errors='coerce').fillna(0)
-    for i in range(1, 8):
-        stars, pct, opp_rh = (pd.to_numeric(df_calc.get(c), errors='coerce') for c in [f"Tag{i}_Sterne", f"Tag{i}_Prozent", f"Tag{i}_Rathaus_Gegner"])
-        attack_made = (stars.notna() | pct.notna()) & opp_rh.notna()
-        total_attacks += attack_made.astype(int)
-        stars = stars.fillna(-1); pct = pct.fillna(0)
-        diff = opp_rh - df_calc['Eigenes_Rathaus']
-        
-        ell_conditions = [diff >= 2, diff == 1, diff == 0, diff == -1, diff <= -2]
-        ell_choices = [point_system["ell_gt_2"], point_system["ell_eq_1"], point_system["ell_eq_0"], point_system["ell_eq_-1"], point_system["ell_lt_-2"]]
-        ell_points = np.select(ell_conditions, ell_choices, default=0)
-
-        attack_conditions = [
-            (stars == 3) & (diff >= 2), (stars == 3) & (diff.between(-1, 1)), (stars == 3) & (diff <= -2),
-            (stars == 2) & (pct >= 90), (stars == 2) & (pct.between(80, 89)), (stars == 2) & (pct.between(50, 79)),
-            (stars == 1) & (pct.between(90, 99)), (stars == 1) & (pct.between(50, 89)),]
-        attack_choices = [
-            point_system["atk_3s_gt_2"], point_system["atk_3s_eq"], point_system["atk_3s_lt_-2"],
-            point_system["atk_2s_ge_90"], point_system["atk_2s_80_89"], point_system["atk_2s_50_79"],
-            point_system["atk_1s_90_99"], point_system["atk_1s_50_89"]]
-        attack_points = np.select(attack_conditions, attack_choices, default=0)
-
-        aktiv_points = np.where(attack_made, point_system["aktiv"], 0)
-        bonus_100_points = np.where((pct == 100) & (diff >= 0), point_system["bonus_100"], 0)
-        courage_conditions = [(diff >= 3) & (pct.between(30, 49)), (diff >= 3)]
-        courage_choices = [point_system["mut_extra"], point_system["mut_base"]]
-        mut_points = np.select(courage_conditions, courage_choices, default=0)
-        
-        daily_total = ell_points + attack_points + aktiv_points + bonus_100_points + mut_points
-        total_points += np.where(attack_made, daily_total, 0)
-        
-    total_points += np.where(total_attacks >= 7, point_system["all_attacks"], 0)
-    results = pd.DataFrame({"Name": df_calc["Name"], "Punkte": total_points.astype(int)})
-    return results.sort_values(by=["Punkte", "Name"], ascending=[False, True]).reset_index(drop=True)
+def startup_report():
+    lines = ["Startup-Profil:"] + [f"  {label:<32} {seconds * 1000:8.1f} ms" for label, seconds in STARTUP_PROFILE]
+    return "\n".join(lines)
 
 # --- Custom Styled Widgets for "De Luxe" Design ---
 class HeaderLabel(Label):
@@ -127,6 +116,67 @@ class TableHeaderLabel(Label):
 class StyledTextInput(TextInput):
     def __init__(self, **kwargs):
         super().__init__(**kwargs); self.multiline = False; self.input_filter = 'int'; self.halign = 'center'; self.size_hint_y = None; self.height = dp(40); self.background_color = (0.2, 0.2, 0.2, 1); self.foreground_color = (1, 1, 1, 1); self.cursor_color = (1, 1, 1, 1); self.padding = [dp(6), dp(10), dp(6), dp(10)]; self.size_hint_x = None; self.width = dp(100)
+# --- Virtualisierte Tabellen: nur sichtbare Zeilen besitzen Widgets ---
+CELL_COLORS = {None: (0.2, 0.2, 0.2, 1), 'error': (0.65, 0.15, 0.15, 1), 'warning': (0.55, 0.42, 0.1, 1)}
+def set_text(widget, text):
+    if widget.text != text: widget.text = text
+class GridHeaderRow(RecycleDataViewBehavior, BoxLayout):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs); self.orientation = 'horizontal'; self.spacing = dp(2); self.headers = None
+    def refresh_view_attrs(self, rv, index, data):
+        if self.headers == data['headers']: return
+        self.headers = data['headers']; self.clear_widgets()
+        for i, header_text in enumerate(self.headers): self.add_widget(TableHeaderLabel(text=header_text, width=dp(150) if i == 0 else dp(100)))
+class GridRow(RecycleDataViewBehavior, BoxLayout):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs); self.orientation = 'horizontal'; self.spacing = dp(2); self.grid = None; self.row = 0; self.cells = []; self.refreshing = False
+        self.name_label = Label(size_hint_y=None, height=dp(40), size_hint_x=None, width=dp(150)); self.add_widget(self.name_label)
+    def refresh_view_attrs(self, rv, index, data):
+        self.grid = rv; self.row = data['row']; self.name_label.text = data['player']; self.refreshing = True
+        while len(self.cells) < len(rv.columns):
+            cell = StyledTextInput(); cell.bind(text=lambda w, text, column=rv.columns[len(self.cells)]: self.on_cell_text(column, text)); self.cells.append(cell); self.add_widget(cell)
+        for cell in self.cells: cell.focus = False
+        self.refresh_cells()
+    def refresh_cells(self):
+        self.refreshing = True
+        for cell, column in zip(self.cells, self.grid.columns): set_text(cell, self.grid.cell_text(self.row, column))
+        self.refreshing = False; self.refresh_marks()
+    def refresh_marks(self):
+        # Prüfergebnis einfärben: Fehler rot, Hinweise gelb, Spieler ohne Angriff mit gelbem Namen
+        check = self.grid.check
+        for cell, column in zip(self.cells, self.grid.columns):
+            color = CELL_COLORS[check.state(self.row, column) if check is not None and self.row < len(check.idle) else None]
+            if tuple(cell.background_color) != color: cell.background_color = color
+        self.name_label.color = (1, 0.8, 0.3, 1) if check is not None and self.row < len(check.idle) and check.idle[self.row] else (1, 1, 1, 1)
+    def on_cell_text(self, column, text):
+        if not self.refreshing and self.grid is not None: self.grid.edit(self.row, column, text)
+class RecycledGrid(RecycleView):
+    # Tabelle über app.war_data; Eingaben landen bis zum Speichern in self.pending {(zeile, spalte): text}
+    def __init__(self, columns, headers, **kwargs):
+        super().__init__(**kwargs); self.columns = columns; self.headers = headers; self.war_data = None; self.pending = {}; self.check = None; self.on_edit = None
+        self.do_scroll_x = True; self.scroll_type = ['bars']; self.bar_width = dp(10)
+        layout = RecycleBoxLayout(orientation='vertical', spacing=dp(2), key_viewclass='viewclass', default_size=(dp(150) + len(columns) * dp(102), dp(40)), default_size_hint=(None, None), size_hint=(None, None), width=dp(150) + len(columns) * dp(102))
+        layout.bind(minimum_height=layout.setter('height')); self.add_widget(layout)
+    def sync(self, war_data):
+        # Zeilen nur bei geändertem Kader neu anlegen, sonst nur die Texte der sichtbaren Zellen abgleichen
+        if war_data is not self.war_data: self.pending = {}
+        old_names = self.war_data.names if self.war_data is not None else None; self.war_data = war_data
+        if war_data.names != old_names: self.load_rows()
+        else:
+            for view in self.layout_manager.children:
+                if isinstance(view, GridRow): view.refresh_cells()
+    def load_rows(self):
+        war_data = self.war_data
+        self.data = [{'viewclass': 'GridHeaderRow', 'headers': self.headers}] + [{'viewclass': 'GridRow', 'row': index, 'player': name} for index, name in enumerate(war_data.names)]
+    def cell_text(self, row, column): return self.pending.get((row, column), self.war_data.text(row, column))
+    def edit(self, row, column, text):
+        self.pending[(row, column)] = text
+        if self.on_edit: self.on_edit()
+    def show_check(self, check):
+        self.check = check
+        for view in self.layout_manager.children:
+            if isinstance(view, GridRow): view.refresh_marks()
+
 class StyledBigTextInput(TextInput):
     def __init__(self, **kwargs):
         super().__init__(**kwargs); self.size_hint_y=None; self.height=dp(250); self.background_color=(0.15, 0.15, 0.15, 1); self.foreground_color=(1, 1, 1, 1)
@@ -148,94 +198,144 @@ class SecondaryButton(Button):
 # --- Kivy Screen Classes ---
 class BaseScreen(Screen):
     def __init__(self, **kwargs):
-        super().__init__(**kwargs); self.layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10)); self.add_widget(self.layout); self.inputs = {}
-    def rebuild_layout(self): self.layout.clear_widgets(); self.inputs.clear()
+        super().__init__(**kwargs); self.layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10)); self.add_widget(self.layout); self.grids = []; self.built_key = None; self.check_label = None; self.validate_trigger = Clock.create_trigger(self.validate, 0.2)
+    def on_pre_enter(self, *args): self.refresh()
+    def refresh(self):
+        # Widgetbaum nur beim ersten Betreten (oder bei geändertem Aufbau) erzeugen, danach nur Inhalte abgleichen
+        key = self.layout_key()
+        if key != self.built_key:
+            with startup_phase(f"Aufbau {self.name}"), span(f"kivy/aufbau {self.name}"): self.rebuild_layout()
+            self.built_key = key
+        with span(f"kivy/abgleich {self.name}"): self.update_layout()
+    def layout_key(self): return True
+    def rebuild_layout(self): self.layout.clear_widgets(); self.grids = []; self.check_label = None
+    def update_layout(self):
+        for grid in self.grids: grid.sync(App.get_running_app().war_data)
+        self.validate()
+    def add_grid(self, grid): grid.on_edit = self.validate_trigger; self.grids.append(grid); self.layout.add_widget(grid); return grid
+    def add_check_label(self):
+        self.check_label = Label(text="", size_hint_y=None, height=dp(40), halign='left', valign='middle', font_size='13sp'); self.check_label.bind(size=self.check_label.setter('text_size')); self.layout.add_widget(self.check_label)
+    @timed("kivy/validate")
+    def validate(self, *args):
+        # Ganze Tabelle inklusive noch nicht gespeicherter Eingaben prüfen (ein Durchlauf, unter 1 ms bei 50 Spielern)
+        if not self.grids: return
+        app = App.get_running_app(); values = app.war_data.matrix()
+        for grid in self.grids:
+            for (row, column), text in grid.pending.items():
+                try: values[row, WarData.COLUMNS.index(column)] = float(text) if text else float('nan')
+                except ValueError: pass
+        check = check_grid(values)
+        for grid in self.grids: grid.show_check(check)
+        if self.check_label is not None:
+            self.check_label.text = check.report(app.war_data.names, limit=1) if check.issues else "Keine Auffälligkeiten"
+            self.check_label.color = (1, 0.45, 0.45, 1) if check.error_count else (1, 0.8, 0.3, 1) if check.issues else (0.6, 0.6, 0.6, 1)
+    def commit_edits(self, message=None):
+        App.get_running_app().save_from_inputs({key: text for grid in self.grids for key, text in grid.pending.items()}, message)
+        for grid in self.grids: grid.pending.clear()
+    def add_undo_bar(self):
+        undo_bar = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(10)); undo_button = SecondaryButton(text="Rückgängig", height=dp(40)); undo_button.bind(on_press=lambda x: self.step_journal('undo')); redo_button = SecondaryButton(text="Wiederholen", height=dp(40)); redo_button.bind(on_press=lambda x: self.step_journal('redo')); undo_bar.add_widget(undo_button); undo_bar.add_widget(redo_button); self.layout.add_widget(undo_bar); return undo_bar
+    def step_journal(self, action):
+        app = App.get_running_app(); self.commit_edits()
+        changes = getattr(app.journal, action)(app.war_data); self.update_layout()
+        if changes: app.war_score = None
+        app.war_log.append(app.war_data, [(row, column, old if action == 'undo' else new) for row, column, old, new in changes])
+        if plyer().available: toast(f"{len(changes)} Zellen {'zurückgenommen' if action == 'undo' else 'wiederhergestellt'}" if changes else "Nichts zu tun")
 
 class Step1Screen(BaseScreen):
-    def on_pre_enter(self, *args): self.rebuild_layout()
     def rebuild_layout(self):
         super().rebuild_layout(); app = App.get_running_app()
         self.layout.add_widget(HeaderLabel(text="Schritt 1: Rathäuser & Gegner"))
-        self.roster = app.roster
-        if not self.roster:
+        if not app.roster:
             self.layout.add_widget(Label(text="Bitte zuerst Mitglieder in den Einstellungen eintragen."))
             nav_bar = BoxLayout(size_hint_y=None, height=dp(50)); settings_button = GradientButton(text="Zu den Einstellungen"); settings_button.bind(on_press=lambda x: setattr(app.screen_manager, 'current', 'settings')); nav_bar.add_widget(settings_button); self.layout.add_widget(nav_bar)
             return
-        if app.data_df.empty: app.data_df = app.create_new_dataframe()
-        grid = GridLayout(cols=9, spacing=dp(2), size_hint_y=None, size_hint_x=None); grid.bind(minimum_height=grid.setter('height')); grid.bind(minimum_width=grid.setter('width'))
-        for header_text in ["Name", "Eigenes RH"] + [f"Gegner T{i}" for i in range(1, 8)]:
-            lbl = TableHeaderLabel(text=header_text)
-            if header_text == "Name": lbl.width = dp(150)
-            grid.add_widget(lbl)
-        for index, row in app.data_df.iterrows():
-            player_name = row["Name"]; self.inputs[player_name] = {}; name_lbl = Label(text=player_name, size_hint_y=None, height=dp(40), size_hint_x=None, width=dp(150)); grid.add_widget(name_lbl)
-            own_th_val = "" if pd.isna(row.get("Eigenes_Rathaus")) else str(int(row.get("Eigenes_Rathaus")))
-            own_th_input = StyledTextInput(text=own_th_val); self.inputs[player_name]['Eigenes_Rathaus'] = own_th_input; grid.add_widget(own_th_input)
-            for i in range(1, 8):
-                col_name = f'Tag{i}_Rathaus_Gegner'; opp_th_val = "" if pd.isna(row.get(col_name)) else str(int(row.get(col_name)))
-                opp_th_input = StyledTextInput(text=opp_th_val); self.inputs[player_name][col_name] = opp_th_input; grid.add_widget(opp_th_input)
-        scrollview = ScrollView(scroll_type=['bars'], bar_width=dp(10)); scrollview.add_widget(grid); self.layout.add_widget(scrollview)
+        columns = ['Eigenes_Rathaus'] + [f'Tag{i}_Rathaus_Gegner' for i in range(1, 8)]
+        self.add_grid(RecycledGrid(columns, ["Name", "Eigenes RH"] + [f"Gegner T{i}" for i in range(1, 8)]))
+        self.add_check_label()
+        import_button = SecondaryButton(text="📥 Import", height=dp(40)); import_button.bind(on_press=self.open_import); self.add_undo_bar().add_widget(import_button)
         nav_bar = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10)); settings_button = SecondaryButton(text="Einstellungen"); settings_button.bind(on_press=lambda x: setattr(app.screen_manager, 'current', 'settings')); save_button = SecondaryButton(text="💾 Speichern"); save_button.bind(on_press=self.save_data); next_button = GradientButton(text="Weiter"); next_button.bind(on_press=self.go_to_step2); nav_bar.add_widget(settings_button); nav_bar.add_widget(save_button); nav_bar.add_widget(next_button); self.layout.add_widget(nav_bar)
-    def save_data(self, instance): App.get_running_app().save_from_inputs(self.inputs, "Daten gespeichert!")
-    def go_to_step2(self, instance): App.get_running_app().save_from_inputs(self.inputs); App.get_running_app().screen_manager.current = 'step2'
+    def layout_key(self): return bool(App.get_running_app().roster)
+    def update_layout(self):
+        app = App.get_running_app()
+        if app.roster and app.war_data.names != app.roster: app.replace_war_data(app.war_data.reindex(app.roster))
+        super().update_layout()
+    def save_data(self, instance): self.commit_edits("Daten gespeichert!")
+    def open_import(self, instance):
+        # Tabelle (aus der Zwischenablage), CSV- oder JSON-Datei einlesen; alle Zellen landen als ein Rückgängig-Schritt im Journal
+        from kivy.uix.popup import Popup
+        from kivy.core.clipboard import Clipboard
+        try: clipboard = Clipboard.paste() or ""
+        except Exception: clipboard = ""
+        content = BoxLayout(orientation='vertical', spacing=dp(10)); text_input = StyledBigTextInput(text=clipboard, hint_text="Tabelle mit Kopfzeile einfügen (Name, Eigenes RH, Gegner T1 ...) oder JSON-Kriegslog"); path_input = TextInput(hint_text="... oder Pfad zu einer CSV-/JSON-Datei", multiline=False, size_hint_y=None, height=dp(40), background_color=(0.2, 0.2, 0.2, 1), foreground_color=(1, 1, 1, 1)); result_label = Label(text="", size_hint_y=None, height=dp(120), halign='left', valign='top'); result_label.bind(size=result_label.setter('text_size'))
+        buttons = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10)); cancel_button = SecondaryButton(text="Abbrechen"); import_button = GradientButton(text="Importieren"); buttons.add_widget(cancel_button); buttons.add_widget(import_button)
+        for widget in (text_input, path_input, result_label, buttons): content.add_widget(widget)
+        popup = Popup(title="Kriegsdaten importieren", content=content, size_hint=(0.95, 0.9)); cancel_button.bind(on_press=popup.dismiss)
+        import_button.bind(on_press=lambda x: setattr(result_label, 'text', self.run_import(text_input.text, path_input.text.strip()))); popup.open()
+    def run_import(self, text, path):
+        from cwl_import import WarImport
+        app = App.get_running_app(); self.commit_edits()
+        try: war_import = (WarImport.read(path) if path else WarImport.parse(text)).validate()
+        except (OSError, ValueError) as e: return f"Import fehlgeschlagen: {e}"
+        values, unknown = war_import.edits(app.war_data.names)
+        changes = app.apply_values(values); self.update_layout()
+        lines = [f"{len(changes)} Zellen übernommen", war_import.report(limit=4)]
+        if unknown: lines.append(f"Nicht im Kader: {', '.join(unknown[:5])}{' ...' if len(unknown) > 5 else ''}")
+        return "\n".join(lines)
+    def go_to_step2(self, instance): self.commit_edits(); App.get_running_app().screen_manager.current = 'step2'
 
 class Step2Screen(BaseScreen):
-    def on_pre_enter(self, *args): self.rebuild_layout()
     def rebuild_layout(self):
         super().rebuild_layout(); app = App.get_running_app()
         self.layout.add_widget(HeaderLabel(text="Schritt 2: Sterne & Prozent"))
         self.layout.add_widget(SubheaderLabel(text="Sterne"))
-        stars_grid = GridLayout(cols=8, spacing=dp(2), size_hint_y=None, size_hint_x=None); stars_grid.bind(minimum_height=stars_grid.setter('height')); stars_grid.bind(minimum_width=stars_grid.setter('width'))
-        for h in ["Name"] + [f"T{i} Sterne" for i in range(1, 8)]: stars_grid.add_widget(TableHeaderLabel(text=h, width=dp(150) if h == "Name" else dp(100)))
-        for _, row in app.data_df.iterrows():
-            name = row['Name']; self.inputs[name] = {}; stars_grid.add_widget(Label(text=name, size_hint_y=None, height=dp(40), size_hint_x=None, width=dp(150)))
-            for i in range(1, 8):
-                val = "" if pd.isna(row.get(f'Tag{i}_Sterne')) else str(int(row.get(f'Tag{i}_Sterne'))); inp = StyledTextInput(text=val); self.inputs[name][f'Tag{i}_Sterne'] = inp; stars_grid.add_widget(inp)
-        stars_scroll = ScrollView(size_hint_y=0.4, scroll_type=['bars'], bar_width=dp(10)); stars_scroll.add_widget(stars_grid); self.layout.add_widget(stars_scroll)
+        self.add_grid(RecycledGrid([f'Tag{i}_Sterne' for i in range(1, 8)], ["Name"] + [f"T{i} Sterne" for i in range(1, 8)], size_hint_y=0.4))
         self.layout.add_widget(SubheaderLabel(text="Prozent"))
-        pct_grid = GridLayout(cols=8, spacing=dp(2), size_hint_y=None, size_hint_x=None); pct_grid.bind(minimum_height=pct_grid.setter('height')); pct_grid.bind(minimum_width=pct_grid.setter('width'))
-        for h in ["Name"] + [f"T{i} %" for i in range(1, 8)]: pct_grid.add_widget(TableHeaderLabel(text=h, width=dp(150) if h == "Name" else dp(100)))
-        for _, row in app.data_df.iterrows():
-            name = row['Name']; pct_grid.add_widget(Label(text=name, size_hint_y=None, height=dp(40), size_hint_x=None, width=dp(150)))
-            for i in range(1, 8):
-                val = "" if pd.isna(row.get(f'Tag{i}_Prozent')) else str(int(row.get(f'Tag{i}_Prozent'))); inp = StyledTextInput(text=val); self.inputs[name][f'Tag{i}_Prozent'] = inp; pct_grid.add_widget(inp)
-        pct_scroll = ScrollView(size_hint_y=0.4, scroll_type=['bars'], bar_width=dp(10)); pct_scroll.add_widget(pct_grid); self.layout.add_widget(pct_scroll)
+        self.add_grid(RecycledGrid([f'Tag{i}_Prozent' for i in range(1, 8)], ["Name"] + [f"T{i} %" for i in range(1, 8)], size_hint_y=0.4))
+        self.add_check_label(); self.add_undo_bar()
         nav_bar = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10)); back_button = SecondaryButton(text="Zurück"); back_button.bind(on_press=lambda x: setattr(app.screen_manager, 'current', 'step1')); save_button = SecondaryButton(text="💾 Speichern"); save_button.bind(on_press=self.save_data); calc_button = GradientButton(text="Berechnen"); calc_button.bind(on_press=self.go_to_step3); nav_bar.add_widget(back_button); nav_bar.add_widget(save_button); nav_bar.add_widget(calc_button); self.layout.add_widget(nav_bar)
-    def save_data(self, instance): App.get_running_app().save_from_inputs(self.inputs, "Daten gespeichert!")
-    def go_to_step3(self, instance): app = App.get_running_app(); app.save_from_inputs(self.inputs); app.results_df = calculate_all_points(app.data_df, app.point_system); app.screen_manager.current = 'step3'
+    def save_data(self, instance): self.commit_edits("Daten gespeichert!")
+    def go_to_step3(self, instance): app = App.get_running_app(); self.commit_edits(); app.war_score = cached_score_war(app.war_data, app.point_system, app.rules); app.results = app.war_score.ranking(); app.screen_manager.current = 'step3'
 
 class Step3Screen(BaseScreen):
-    def on_pre_enter(self, *args): self.rebuild_layout()
     def rebuild_layout(self):
         super().rebuild_layout(); app = App.get_running_app()
         self.layout.add_widget(HeaderLabel(text="Endwertung"))
-        results_grid = GridLayout(cols=2, spacing=dp(2), size_hint_y=None); results_grid.bind(minimum_height=results_grid.setter('height'))
+        self.results_grid = results_grid = GridLayout(cols=2, spacing=dp(2), size_hint_y=None); results_grid.bind(minimum_height=results_grid.setter('height')); self.result_rows = []
         results_grid.add_widget(TableHeaderLabel(text="Name", width=dp(200))); results_grid.add_widget(TableHeaderLabel(text="Punkte", width=dp(100)))
-        if not app.results_df.empty:
-            for _, row in app.results_df.iterrows():
-                results_grid.add_widget(Label(text=str(row['Name']), size_hint_y=None, height=dp(40))); results_grid.add_widget(Label(text=str(row['Punkte']), size_hint_y=None, height=dp(40)))
         results_scroll = ScrollView(); results_scroll.add_widget(results_grid); self.layout.add_widget(results_scroll)
-        nav_bar = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10)); back_button = SecondaryButton(text="Zurück"); back_button.bind(on_press=lambda x: setattr(app.screen_manager, 'current', 'step2')); excel_button = SecondaryButton(text="📥 Excel"); excel_button.bind(on_press=self.export_excel); reset_button = GradientButton(text="Neuer Durchgang"); reset_button.bind(on_press=self.reset_app); nav_bar.add_widget(back_button); nav_bar.add_widget(excel_button); nav_bar.add_widget(reset_button); self.layout.add_widget(nav_bar)
+        nav_bar = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10)); back_button = SecondaryButton(text="Zurück"); back_button.bind(on_press=lambda x: setattr(app.screen_manager, 'current', 'step2')); self.excel_button = excel_button = SecondaryButton(text="📥 Excel"); excel_button.bind(on_press=self.export_excel); reset_button = GradientButton(text="Neuer Durchgang"); reset_button.bind(on_press=self.reset_app); nav_bar.add_widget(back_button); nav_bar.add_widget(excel_button); nav_bar.add_widget(reset_button); self.layout.add_widget(nav_bar)
+    def update_layout(self):
+        rows = [(str(name), str(points)) for name, points in App.get_running_app().results]
+        while len(self.result_rows) < len(rows):
+            labels = (Label(size_hint_y=None, height=dp(40)), Label(size_hint_y=None, height=dp(40))); self.result_rows.append(labels)
+            for lbl in labels: self.results_grid.add_widget(lbl)
+        while len(self.result_rows) > len(rows):
+            for lbl in self.result_rows.pop(): self.results_grid.remove_widget(lbl)
+        for (name_label, points_label), (name, points) in zip(self.result_rows, rows): set_text(name_label, name); set_text(points_label, points)
     def export_excel(self, instance):
+        # Export im Arbeits-Thread; Fortschritt und Ergebnis kommen per Clock zurück in den UI-Thread
+        from cwl_export import export_in_background, export_sheets
         app = App.get_running_app()
-        if app.results_df.empty: toast("Keine Daten zum Exportieren vorhanden."); return
-        try:
-            download_dir = storagepath.get_downloads_dir(); path = os.path.join(download_dir, 'cwl_bonus_wertung.xlsx')
-            app.results_df.to_excel(path, index=False, engine='xlsxwriter'); toast(f"Excel-Datei gespeichert: {path}")
-        except Exception as e: toast(f"Fehler beim Speichern: {e}")
+        if app.war_score is None or not app.results: toast("Keine Daten zum Exportieren vorhanden."); return
+        path = os.path.join(plyer().storagepath.get_downloads_dir(), 'cwl_bonus_wertung.xlsx')
+        self.excel_button.disabled = True; toast("Export läuft ...")
+        progress = lambda n, total, title: Clock.schedule_once(lambda dt: toast(f"Export: {title} ({n}/{total})"))
+        export_in_background(path, export_sheets(app.war_score, app.war_data.to_dict()), progress, lambda path, error: Clock.schedule_once(lambda dt: self.export_done(path, error)))
+    def export_done(self, path, error):
+        self.excel_button.disabled = False
+        toast(f"Fehler beim Speichern: {error}" if error else f"Excel-Datei gespeichert: {path}")
     def reset_app(self, instance): app = App.get_running_app(); app.reset_data()
 
 class SettingsScreen(BaseScreen):
-    def on_pre_enter(self, *args): self.rebuild_layout()
     def rebuild_layout(self):
         super().rebuild_layout(); app = App.get_running_app()
-        self.layout.add_widget(HeaderLabel(text="Einstellungen"))
+        header = HeaderLabel(text="Einstellungen"); header.bind(on_touch_down=self.header_tapped); self.layout.add_widget(header); self.header_taps = 0
         
         scroll_content = BoxLayout(orientation='vertical', spacing=dp(20), size_hint_y=None)
         scroll_content.bind(minimum_height=scroll_content.setter('height'))
 
         scroll_content.add_widget(SubheaderLabel(text="Clan-Mitglieder (ein Name pro Zeile)"))
-        self.roster_input = StyledBigTextInput(text="\n".join(app.roster)); scroll_content.add_widget(self.roster_input)
+        self.roster_input = StyledBigTextInput(); scroll_content.add_widget(self.roster_input)
 
         scroll_content.add_widget(SubheaderLabel(text="Punktesystem"))
         
@@ -243,42 +343,41 @@ class SettingsScreen(BaseScreen):
         points_layout.bind(minimum_height=points_layout.setter('height'))
         
         self.point_inputs = {}
-        points = app.point_system
 
         points_layout.add_widget(Label(text="Punkte für Rathaus-Level Differenz", bold=True))
         ell_grid = GridLayout(cols=5, spacing=dp(5), size_hint_y=None, height=dp(80));
         ell_grid.add_widget(Label(text="RH+2")); ell_grid.add_widget(Label(text="RH+1")); ell_grid.add_widget(Label(text="RH=0")); ell_grid.add_widget(Label(text="RH-1")); ell_grid.add_widget(Label(text="RH-2"))
-        self.point_inputs["ell_gt_2"] = StyledTextInput(text=str(points["ell_gt_2"])); ell_grid.add_widget(self.point_inputs["ell_gt_2"])
-        self.point_inputs["ell_eq_1"] = StyledTextInput(text=str(points["ell_eq_1"])); ell_grid.add_widget(self.point_inputs["ell_eq_1"])
-        self.point_inputs["ell_eq_0"] = StyledTextInput(text=str(points["ell_eq_0"])); ell_grid.add_widget(self.point_inputs["ell_eq_0"])
-        self.point_inputs["ell_eq_-1"] = StyledTextInput(text=str(points["ell_eq_-1"])); ell_grid.add_widget(self.point_inputs["ell_eq_-1"])
-        self.point_inputs["ell_lt_-2"] = StyledTextInput(text=str(points["ell_lt_-2"])); ell_grid.add_widget(self.point_inputs["ell_lt_-2"])
+        self.point_inputs["ell_gt_2"] = StyledTextInput(); ell_grid.add_widget(self.point_inputs["ell_gt_2"])
+        self.point_inputs["ell_eq_1"] = StyledTextInput(); ell_grid.add_widget(self.point_inputs["ell_eq_1"])
+        self.point_inputs["ell_eq_0"] = StyledTextInput(); ell_grid.add_widget(self.point_inputs["ell_eq_0"])
+        self.point_inputs["ell_eq_-1"] = StyledTextInput(); ell_grid.add_widget(self.point_inputs["ell_eq_-1"])
+        self.point_inputs["ell_lt_-2"] = StyledTextInput(); ell_grid.add_widget(self.point_inputs["ell_lt_-2"])
         points_layout.add_widget(ell_grid)
 
         points_layout.add_widget(Label(text="Punkte für Angriffe", bold=True, padding=(0, dp(10))))
         atk_grid = GridLayout(cols=3, spacing=dp(10), size_hint_y=None, height=dp(200))
         col1 = BoxLayout(orientation='vertical', spacing=dp(5)); col1.add_widget(Label(text="3 Sterne", bold=True));
-        col1.add_widget(Label(text="vs RH+2")); self.point_inputs["atk_3s_gt_2"] = StyledTextInput(text=str(points["atk_3s_gt_2"])); col1.add_widget(self.point_inputs["atk_3s_gt_2"])
-        col1.add_widget(Label(text="vs RH=0")); self.point_inputs["atk_3s_eq"] = StyledTextInput(text=str(points["atk_3s_eq"])); col1.add_widget(self.point_inputs["atk_3s_eq"])
-        col1.add_widget(Label(text="vs RH-2")); self.point_inputs["atk_3s_lt_-2"] = StyledTextInput(text=str(points["atk_3s_lt_-2"])); col1.add_widget(self.point_inputs["atk_3s_lt_-2"])
+        col1.add_widget(Label(text="vs RH+2")); self.point_inputs["atk_3s_gt_2"] = StyledTextInput(); col1.add_widget(self.point_inputs["atk_3s_gt_2"])
+        col1.add_widget(Label(text="vs RH=0")); self.point_inputs["atk_3s_eq"] = StyledTextInput(); col1.add_widget(self.point_inputs["atk_3s_eq"])
+        col1.add_widget(Label(text="vs RH-2")); self.point_inputs["atk_3s_lt_-2"] = StyledTextInput(); col1.add_widget(self.point_inputs["atk_3s_lt_-2"])
         col2 = BoxLayout(orientation='vertical', spacing=dp(5)); col2.add_widget(Label(text="2 Sterne", bold=True));
-        col2.add_widget(Label(text="90%+")); self.point_inputs["atk_2s_ge_90"] = StyledTextInput(text=str(points["atk_2s_ge_90"])); col2.add_widget(self.point_inputs["atk_2s_ge_90"])
-        col2.add_widget(Label(text="80-89%")); self.point_inputs["atk_2s_80_89"] = StyledTextInput(text=str(points["atk_2s_80_89"])); col2.add_widget(self.point_inputs["atk_2s_80_89"])
-        col2.add_widget(Label(text="50-79%")); self.point_inputs["atk_2s_50_79"] = StyledTextInput(text=str(points["atk_2s_50_79"])); col2.add_widget(self.point_inputs["atk_2s_50_79"])
+        col2.add_widget(Label(text="90%+")); self.point_inputs["atk_2s_ge_90"] = StyledTextInput(); col2.add_widget(self.point_inputs["atk_2s_ge_90"])
+        col2.add_widget(Label(text="80-89%")); self.point_inputs["atk_2s_80_89"] = StyledTextInput(); col2.add_widget(self.point_inputs["atk_2s_80_89"])
+        col2.add_widget(Label(text="50-79%")); self.point_inputs["atk_2s_50_79"] = StyledTextInput(); col2.add_widget(self.point_inputs["atk_2s_50_79"])
         col3 = BoxLayout(orientation='vertical', spacing=dp(5)); col3.add_widget(Label(text="1 Stern", bold=True));
-        col3.add_widget(Label(text="90-99%")); self.point_inputs["atk_1s_90_99"] = StyledTextInput(text=str(points["atk_1s_90_99"])); col3.add_widget(self.point_inputs["atk_1s_90_99"])
-        col3.add_widget(Label(text="50-89%")); self.point_inputs["atk_1s_50_89"] = StyledTextInput(text=str(points["atk_1s_50_89"])); col3.add_widget(self.point_inputs["atk_1s_50_89"])
+        col3.add_widget(Label(text="90-99%")); self.point_inputs["atk_1s_90_99"] = StyledTextInput(); col3.add_widget(self.point_inputs["atk_1s_90_99"])
+        col3.add_widget(Label(text="50-89%")); self.point_inputs["atk_1s_50_89"] = StyledTextInput(); col3.add_widget(self.point_inputs["atk_1s_50_89"])
         atk_grid.add_widget(col1); atk_grid.add_widget(col2); atk_grid.add_widget(col3)
         points_layout.add_widget(atk_grid)
 
         points_layout.add_widget(Label(text="Bonuspunkte", bold=True, padding=(0, dp(10))))
         bonus_grid = GridLayout(cols=5, spacing=dp(5), size_hint_y=None, height=dp(80))
         bonus_grid.add_widget(Label(text="Aktivität")); bonus_grid.add_widget(Label(text="100%")); bonus_grid.add_widget(Label(text="Mut")); bonus_grid.add_widget(Label(text="Extra Mut")); bonus_grid.add_widget(Label(text="7 Angriffe"))
-        self.point_inputs["aktiv"] = StyledTextInput(text=str(points["aktiv"])); bonus_grid.add_widget(self.point_inputs["aktiv"])
-        self.point_inputs["bonus_100"] = StyledTextInput(text=str(points["bonus_100"])); bonus_grid.add_widget(self.point_inputs["bonus_100"])
-        self.point_inputs["mut_base"] = StyledTextInput(text=str(points["mut_base"])); bonus_grid.add_widget(self.point_inputs["mut_base"])
-        self.point_inputs["mut_extra"] = StyledTextInput(text=str(points["mut_extra"])); bonus_grid.add_widget(self.point_inputs["mut_extra"])
-        self.point_inputs["all_attacks"] = StyledTextInput(text=str(points["all_attacks"])); bonus_grid.add_widget(self.point_inputs["all_attacks"])
+        self.point_inputs["aktiv"] = StyledTextInput(); bonus_grid.add_widget(self.point_inputs["aktiv"])
+        self.point_inputs["bonus_100"] = StyledTextInput(); bonus_grid.add_widget(self.point_inputs["bonus_100"])
+        self.point_inputs["mut_base"] = StyledTextInput(); bonus_grid.add_widget(self.point_inputs["mut_base"])
+        self.point_inputs["mut_extra"] = StyledTextInput(); bonus_grid.add_widget(self.point_inputs["mut_extra"])
+        self.point_inputs["all_attacks"] = StyledTextInput(); bonus_grid.add_widget(self.point_inputs["all_attacks"])
         points_layout.add_widget(bonus_grid)
 
         scroll_content.add_widget(points_layout)
@@ -286,64 +385,149 @@ class SettingsScreen(BaseScreen):
         scrollview = ScrollView(); scrollview.add_widget(scroll_content)
         self.layout.add_widget(scrollview)
 
+        self.cache_label = Label(size_hint_y=None, height=dp(20), font_size='12sp', color=(0.6, 0.6, 0.6, 1)); self.layout.add_widget(self.cache_label)
         save_button = GradientButton(text="Speichern & Schließen", size_hint_y=None, height=dp(50)); save_button.bind(on_press=self.save_and_close); self.layout.add_widget(save_button)
+    def update_layout(self):
+        app = App.get_running_app(); set_text(self.roster_input, "\n".join(app.roster))
+        for key, widget in self.point_inputs.items(): set_text(widget, str(app.point_system[key]))
+        cache_stats = SCORE_CACHE.stats(); self.cache_label.text = f"Wertungs-Cache: {cache_stats['hits']} Treffer / {cache_stats['misses']} neu berechnet"
     def save_and_close(self, instance):
         app = App.get_running_app()
         new_roster = [name.strip() for name in self.roster_input.text.split("\n") if name.strip()]; app.roster = list(dict.fromkeys(new_roster))
         for key, widget in self.point_inputs.items():
             try: app.point_system[key] = int(widget.text)
             except ValueError: pass
-        save_settings(app.roster, app.point_system); app.screen_manager.current = 'step1'
+        save_settings(app.roster, app.point_system)
+        # Mit vorhandener Wertung direkt die neu berechnete Rangliste zeigen, sonst zurück zur Eingabe
+        if app.war_score is not None: app.war_score = app.war_score.rescore(app.point_system); app.results = app.war_score.ranking()
+        app.screen_manager.current = 'step3' if app.war_score is not None else 'step1'
+    def header_tapped(self, widget, touch):
+        # Verstecktes Diagnose-Menü: fünfmal auf die Überschrift tippen
+        if not widget.collide_point(*touch.pos): return
+        self.header_taps += 1
+        if self.header_taps >= 5: self.header_taps = 0; App.get_running_app().screen_manager.current = 'debug'
+
+class DebugScreen(BaseScreen):
+    # Messwerte der heißen Pfade (cwl_profile) und das Startup-Profil; Messung lässt sich hier ein- und ausschalten
+    def rebuild_layout(self):
+        super().rebuild_layout(); app = App.get_running_app()
+        self.layout.add_widget(HeaderLabel(text="Diagnose"))
+        switches = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        self.enable_button = SecondaryButton(); self.enable_button.bind(on_press=lambda x: self.toggle(PROFILER.set_enabled, not PROFILER.enabled))
+        self.memory_button = SecondaryButton(); self.memory_button.bind(on_press=lambda x: self.toggle(PROFILER.set_memory, not PROFILER.memory))
+        clear_button = SecondaryButton(text="Zurücksetzen"); clear_button.bind(on_press=lambda x: self.toggle(lambda on: PROFILER.reset(), None))
+        switches.add_widget(self.enable_button); switches.add_widget(self.memory_button); switches.add_widget(clear_button); self.layout.add_widget(switches)
+        self.report_label = Label(size_hint_y=None, halign='left', valign='top', font_name='RobotoMono-Regular', font_size='11sp')
+        self.report_label.bind(width=lambda label, width: setattr(label, 'text_size', (width, None)), texture_size=lambda label, size: setattr(label, 'height', size[1]))
+        scrollview = ScrollView(); scrollview.add_widget(self.report_label); self.layout.add_widget(scrollview)
+        nav_bar = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        back_button = SecondaryButton(text="Zurück"); back_button.bind(on_press=lambda x: setattr(app.screen_manager, 'current', 'settings'))
+        refresh_button = SecondaryButton(text="Aktualisieren"); refresh_button.bind(on_press=lambda x: self.update_layout())
+        dump_button = GradientButton(text="Bericht speichern"); dump_button.bind(on_press=self.dump_report)
+        nav_bar.add_widget(back_button); nav_bar.add_widget(refresh_button); nav_bar.add_widget(dump_button); self.layout.add_widget(nav_bar)
+    def update_layout(self):
+        set_text(self.enable_button, f"Messung: {'an' if PROFILER.enabled else 'aus'}"); set_text(self.memory_button, f"Speicher: {'an' if PROFILER.memory else 'aus'}")
+        set_text(self.report_label, PROFILER.text() + "\n\n" + startup_report())
+    def toggle(self, setter, value): setter(value); self.update_layout()
+    def dump_report(self, instance):
+        path = os.path.join(plyer().storagepath.get_downloads_dir(), f"cwl_profil_{datetime.now():%Y%m%d_%H%M%S}.json")
+        try: PROFILER.dump(path)
+        except OSError as e: toast(f"Fehler beim Speichern: {e}"); return
+        toast(f"Bericht gespeichert: {path}")
+
+class LazyScreenManager(ScreenManager):
+    # Screens entstehen erst beim ersten Aufruf; bis dahin ist nur Name -> Klasse bekannt
+    def __init__(self, screen_classes, **kwargs):
+        super().__init__(**kwargs); self.screen_classes = dict(screen_classes)
+    def get_screen(self, name):
+        if name in self.screen_classes and not self.has_screen(name):
+            with startup_phase(f"Screen {name}"): self.add_widget(self.screen_classes.pop(name)(name=name))
+        return super().get_screen(name)
 
 class CWLRechnerApp(App):
     def build(self):
         Window.clearcolor = (0.12, 0.12, 0.12, 1) # Anthracite
-        self.roster, self.point_system = load_settings()
-        self.data_df = pd.DataFrame()
-        self.results_df = pd.DataFrame()
-        self.last_save_time = datetime.now()
-
-        self.screen_manager = ScreenManager(transition=FadeTransition())
-        self.screen_manager.add_widget(Step1Screen(name='step1'))
-        self.screen_manager.add_widget(Step2Screen(name='step2'))
-        self.screen_manager.add_widget(Step3Screen(name='step3'))
-        self.screen_manager.add_widget(SettingsScreen(name='settings'))
+        with startup_phase("Einstellungen laden"): self.roster, self.point_system = load_settings(); self.rules = load_rules(RULES_FILE)
+        with startup_phase("Krieg wiederherstellen"): self.war_log = WarLog(CONFIG_DIR); restored = self.war_log.restore(); self.war_log.start()
+        self.war_data = restored if restored is not None else WarData.empty(self.roster); self.journal = EditJournal()
+        if restored is None: self.war_log.snapshot(self.war_data)
+        self.results = []
+        self.war_score = None
+
+        self.screen_manager = LazyScreenManager({'step1': Step1Screen, 'step2': Step2Screen, 'step3': Step3Screen, 'settings': SettingsScreen, 'debug': DebugScreen}, transition=FadeTransition())
+        self.screen_manager.current = 'step1'
         
-        Clock.schedule_interval(self.autosave_check, 60)
+        Clock.schedule_interval(self.autosave_check, 10)
         return self.screen_manager
 
     def on_start(self):
+        Clock.schedule_once(self.first_frame, 0)
         if platform == 'android':
             from android.permissions import request_permissions, Permission
             request_permissions([Permission.WRITE_EXTERNAL_STORAGE, Permission.READ_EXTERNAL_STORAGE])
 
-    def create_new_dataframe(self):
-        df = pd.DataFrame(self.roster, columns=["Name"])
-        df["Eigenes_Rathaus"] = None
-        for i in range(1, 8):
-            df[f"Tag{i}_Rathaus_Gegner"] = None; df[f"Tag{i}_Sterne"] = None; df[f"Tag{i}_Prozent"] = None
-        return df
+    def first_frame(self, dt):
+        global STARTUP_DONE
+        STARTUP_DONE = True; STARTUP_PROFILE.append(("bis zum ersten Bild", time.perf_counter() - STARTED))
+        if os.environ.get("CWL_STARTUP_PROFILE"): print(startup_report())
+        if self.rules.warning: print(f"WARNING: {self.rules.warning}"); toast(self.rules.warning)
+
+    def on_pause(self):
+        # Android beendet Apps im Hintergrund oft ohne Vorwarnung: offene Eingaben übernehmen und auf den Datenträger bringen
+        self.autosave_check(0); self.war_log.snapshot(self.war_data); self.war_log.flush()
+        return True
+
+    def on_stop(self): self.autosave_check(0); self.war_log.snapshot(self.war_data); self.war_log.close()
+
+    def replace_war_data(self, war_data):
+        self.war_data = war_data; self.journal.clear(); self.war_log.snapshot(war_data)
 
     def reset_data(self):
-        self.data_df = self.create_new_dataframe(); self.results_df = pd.DataFrame()
-        self.screen_manager.get_screen('step1').rebuild_layout()
+        if self.war_score is not None:
+            import sqlite3
+            from cwl_history import WarHistory
+            try:
+                with WarHistory(HISTORY_FILE) as history: war_id = history.archive(self.war_data, self.war_score)
+                toast("Krieg im Archiv gespeichert" if war_id is not None else "Nicht archiviert: keine Angriffe oder schon im Archiv")
+            except (sqlite3.Error, ValueError) as e: toast(f"Archivieren fehlgeschlagen: {e}")
+        self.replace_war_data(WarData.empty(self.roster)); self.results = []; self.war_score = None
         self.screen_manager.current = 'step1'
 
-    def save_from_inputs(self, inputs_dict, message=None):
-        if self.data_df.empty: self.data_df = self.create_new_dataframe()
-        changes_data = [{'Name': name, **{key: w.text if w.text else None for key, w in data.items()}} for name, data in inputs_dict.items()]
-        changes_df = pd.DataFrame(changes_data)
-        main_df = self.data_df.set_index("Name"); changes_df = changes_df.set_index("Name")
-        main_df.update(changes_df); self.data_df = main_df.reset_index()
-        self.last_save_time = datetime.now()
-        if message and PLYER_AVAILABLE: toast(message)
+    @timed("kivy/save_from_inputs")
+    def save_from_inputs(self, edits, message=None):
+        # Nur die seit dem letzten Speichern geänderten Zellen übernehmen, als ein Schritt im Änderungsprotokoll
+        # Werte, die nicht in die Spalte passen (z.B. -5 %), werden nicht übernommen und gemeldet statt still gekappt
+        values, rejected = {}, []
+        for key, text in edits.items():
+            try: value = int(text) if text else None
+            except ValueError: continue
+            try: WarData.check_range([value], [key[1]]); values[key] = value
+            except ValueError as e: rejected.append(str(e))
+        self.apply_values(values)
+        if rejected: toast(f"Nicht übernommen: {rejected[0]}" + (f" (+{len(rejected) - 1} weitere)" if len(rejected) > 1 else ""))
+        elif message and plyer().available: toast(message)
+
+    def apply_values(self, values):
+        # {(zeile, spalte): wert|None} als ein Journal-Schritt übernehmen und ins Änderungslog schreiben
+        # Geänderte Zellen machen die letzte Wertung ungültig (Einstellungen rechnen sonst eine veraltete Rangliste neu)
+        changes = self.journal.commit(self.war_data, values)
+        if changes: self.war_score = None
+        self.war_log.append(self.war_data, [(row, column, new) for row, column, _, new in changes])
+        return changes
 
+    @timed("kivy/autosave_check")
     def autosave_check(self, dt):
-        time_since_save = datetime.now() - self.last_save_time
-        if time_since_save > timedelta(minutes=6):
-            current_screen = self.screen_manager.current_screen
-            if hasattr(current_screen, 'inputs') and current_screen.inputs:
-                self.save_from_inputs(current_screen.inputs, "Auto-Speichern...")
+        # Nur offene Zellen ins Journal übernehmen; geschrieben wird im Hintergrund-Thread
+        current_screen = self.screen_manager.current_screen
+        if any(grid.pending for grid in getattr(current_screen, 'grids', [])): current_screen.commit_edits()
+        self.check_war_log()
+
+    def check_war_log(self):
+        # Fehler des Schreib-Threads sichtbar machen; ein neuer Snapshot schreibt danach den vollständigen Stand erneut
+        error, self.war_log.error = self.war_log.error, None
+        if error is None: return
+        message = f"Automatisches Speichern fehlgeschlagen: {error}"; print(f"WARNING: {message}"); toast(message)
+        self.war_log.snapshot(self.war_data)
 
 if __name__ == '__main__':
     CWLRechnerApp().run()
\ No newline at end of file